@@ -1,7 +1,17 @@
+import os
+
 import dash
-from dash import html, dcc, Input, Output, callback
-import dash_bootstrap_components as dbc
-import pandas as pd
+from dash import html, dcc
+from islamic_library.cards import CardCache, CardRenderer
+from islamic_library.clientside import catalog_stores
+from islamic_library.controls import register_category_options, register_search_gate, search_gate
+from islamic_library.grid import PAGE_SIZES, register_book_grid, use_clientside_grid
+from islamic_library.metrics import publish, register_stats_route
+from islamic_library.repository import open_catalog
+from islamic_library.suggest import register_suggest_route, suggest_components
+from islamic_library.warmup import register_warmup
+
+from books import books_data
 
 # Initialize Dash App with CDN stylesheets
 app = dash.Dash(__name__,
@@ -12,45 +22,13 @@ app = dash.Dash(__name__,
     ]
 )
 
-# Islamic Books Dataset with Icons
-books_data = [
-    {
-        "id": 1,
-        "title": "The Noble Quran",
-        "author": "Allah (Revealed to Prophet Muhammad)",
-        "category": "Holy Book",
-        "description": "The central religious text of Islam",
-        "icon": "fas fa-book-quran",
-        "text_color": "text-green-600",
-        "bg_color": "bg-green-100",
-        "rating": 5.0
-    },
-    {
-        "id": 2,
-        "title": "Sahih Al-Bukhari",
-        "author": "Imam Al-Bukhari",
-        "category": "Hadith",
-        "description": "Most authentic hadith collection",
-        "icon": "fas fa-scroll",
-        "text_color": "text-blue-600",
-        "bg_color": "bg-blue-100",
-        "rating": 4.9
-    },
-    {
-        "id": 3,
-        "title": "Riyad us-Saliheen",
-        "author": "Imam An-Nawawi",
-        "category": "Islamic Teachings",
-        "description": "Gardens of the Righteous",
-        "icon": "fas fa-mosque",
-        "text_color": "text-red-600",
-        "bg_color": "bg-red-100",
-        "rating": 4.7
-    }
-]
+# Shared catalog: held in memory, or read from the SQLite database named by
+# CATALOG_DATABASE (seeded from books_data when empty)
+catalog = open_catalog(books_data, search_fields=("title", "author"))
 
-# Create DataFrame
-df_books = pd.DataFrame(books_data)
+# Clientside filtering for small catalogs: the browser filters and pages a
+# shipped copy of the catalog
+CLIENTSIDE_GRID = use_clientside_grid(catalog, mode="stepped")
 
 # Navbar Component
 def create_navbar():
@@ -145,6 +123,11 @@ def create_book_card(book):
         ]
     )
 
+# Batch renderer compiled once from the card template above, with rendered
+# cards cached per book id and content fingerprint
+CARD_CACHE_SIZE = int(os.environ.get("CARD_CACHE_SIZE", "4096"))
+card_renderer = CardRenderer(create_book_card, cache=CardCache(CARD_CACHE_SIZE))
+
 # App Layout
 app.layout = html.Div(
     className="min-h-screen bg-green-50",
@@ -182,10 +165,14 @@ app.layout = html.Div(
                                 ),
                                 dcc.Input(
                                     id="search-input",
+                                    list="search-suggestions",
                                     type="text",
                                     placeholder="Search...",
                                     className="input input-bordered border-green-500 w-full max-w-xs"
-                                )
+                                ),
+                                *search_gate(),
+                                *suggest_components(app),
+                                *catalog_stores(app, CLIENTSIDE_GRID)
                             ]
                         ),
                         html.Div(
@@ -200,12 +187,6 @@ app.layout = html.Div(
                                 ),
                                 dcc.Dropdown(
                                     id="category-select",
-                                    options=[
-                                        {"label": "All Categories", "value": "All"},
-                                        {"label": "Holy Book", "value": "Holy Book"},
-                                        {"label": "Hadith", "value": "Hadith"},
-                                        {"label": "Islamic Teachings", "value": "Islamic Teachings"}
-                                    ],
                                     placeholder="Select Category",
                                     className="w-full max-w-xs"
                                 )
@@ -218,38 +199,56 @@ app.layout = html.Div(
                 html.Div(
                     id="books-grid",
                     className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 justify-items-center"
+                ),
+
+                # Pagination and Result Count
+                html.Div(
+                    className="flex flex-wrap justify-center items-center gap-4 mt-8",
+                    children=[
+                        html.Span(id="books-count", className="text-green-600"),
+                        html.Div(
+                            className="join",
+                            children=[
+                                html.Button("«", id="page-prev", className="join-item btn btn-sm"),
+                                html.Button(id="page-label", className="join-item btn btn-sm btn-active"),
+                                html.Button("»", id="page-next", className="join-item btn btn-sm")
+                            ]
+                        ),
+                        dcc.Dropdown(
+                            id="page-size-select",
+                            options=[{"label": f"{size} per page", "value": size} for size in PAGE_SIZES],
+                            value=PAGE_SIZES[0],
+                            clearable=False,
+                            className="w-40"
+                        ),
+                        dcc.Store(id="books-page", data=1)
+                    ]
                 )
             ]
         )
     ] )
 
-# Callback for Dynamic Book Filtering
-@app.callback(
-    Output("books-grid", "children"),
-    [Input("search-input", "value"),
-     Input("category-select", "value")]
-)
-def update_book_grid(search_term, category):
-    filtered_books = df_books.copy()
+# Grid callbacks: a page per previous/next step, with rendered pages cached
+# per normalized query and catalog generation (RESULT_CACHE)
+register_book_grid(app, catalog, card_renderer, mode="stepped", clientside=CLIENTSIDE_GRID, namespace=__file__)
 
-    # Filter by search term
-    if search_term:
-        filtered_books = filtered_books[
-            filtered_books['title'].str.contains(search_term, case=False) |
-            filtered_books['author'].str.contains(search_term, case=False)
-        ]
+# Search input gate: debounce/throttle/submit handled in the browser
+register_search_gate(app)
 
-    # Filter by category
-    if category and category != "All":
-        filtered_books = filtered_books[filtered_books['category'] == category]
+# Category options with the book count of each over the current search,
+# counted in the browser when it filters the catalog itself
+register_category_options(app, catalog, clientside=CLIENTSIDE_GRID)
 
-    # Create book cards
-    book_cards = [
-        create_book_card(book.to_dict())
-        for _, book in filtered_books.iterrows()
-    ]
+# Title and author suggestions for the search box, served outside the Dash callbacks
+suggestions = register_suggest_route(app, catalog)
+if suggestions is not None:
+    publish("suggestions", suggestions.stats)
+
+# Worker warm-up, run by gunicorn.conf.py before a worker accepts requests
+register_warmup(app, catalog, suggestions)
 
-    return book_cards
+# Statistics route for this worker's catalog and caches
+register_stats_route(app)
 
 # Server configuration
 if __name__ == '__main__':
@@ -0,0 +1,36 @@
+# Islamic Books Dataset with Icons
+books_data = [
+    {
+        "id": 1,
+        "title": "The Noble Quran",
+        "author": "Allah (Revealed to Prophet Muhammad)",
+        "category": "Holy Book",
+        "description": "The central religious text of Islam",
+        "icon": "fas fa-book-quran",
+        "text_color": "text-green-600",
+        "bg_color": "bg-green-100",
+        "rating": 5.0
+    },
+    {
+        "id": 2,
+        "title": "Sahih Al-Bukhari",
+        "author": "Imam Al-Bukhari",
+        "category": "Hadith",
+        "description": "Most authentic hadith collection",
+        "icon": "fas fa-scroll",
+        "text_color": "text-blue-600",
+        "bg_color": "bg-blue-100",
+        "rating": 4.9
+    },
+    {
+        "id": 3,
+        "title": "Riyad us-Saliheen",
+        "author": "Imam An-Nawawi",
+        "category": "Islamic Teachings",
+        "description": "Gardens of the Righteous",
+        "icon": "fas fa-mosque",
+        "text_color": "text-red-600",
+        "bg_color": "bg-red-100",
+        "rating": 4.7
+    }
+]
@@ -1,7 +1,18 @@
+import os
+
 import dash
-from dash import html, dcc, Input, Output, callback
-import pandas as pd
+from dash import html, dcc
 import dash_bootstrap_components as dbc
+from islamic_library.cards import CardCache, CardRenderer
+from islamic_library.clientside import catalog_stores
+from islamic_library.controls import register_category_options, register_search_gate, search_gate
+from islamic_library.grid import pagination_bar, register_book_grid, use_clientside_grid
+from islamic_library.metrics import publish, register_stats_route
+from islamic_library.repository import open_catalog
+from islamic_library.suggest import register_suggest_route, suggest_components
+from islamic_library.warmup import register_warmup
+
+from books import books_data
 
 # Initialize Dash App
 app = dash.Dash(__name__,
@@ -12,48 +23,13 @@ app = dash.Dash(__name__,
     ]
 )
 
-# Books Dataset with Enhanced Metadata
-books_data = [
-    {
-        "id": 1,
-        "title": "The Noble Quran",
-        "author": "Divine Revelation",
-        "category": "Holy Book",
-        "description": "The foundational text of Islam, providing guidance for humanity",
-        "icon": "quran",
-        "cover_color": "bg-primary",
-        "text_color": "text-primary",
-        "pages": 604,
-        "language": "Arabic",
-        "rating": 5.0
-    },
-    {
-        "id": 2,
-        "title": "Sahih Al-Bukhari",
-        "author": "Imam Al-Bukhari",
-        "category": "Hadith",
-        "description": "A collection of sayings and actions of Prophet Muhammad",
-        "icon": "scroll",
-        "cover_color": "bg-success",
-        "text_color": "text-success",
-        "pages": 432,
-        "language": "Arabic",
-        "rating": 4.9
-    },
-    {
-        "id": 3,
-        "title": "Riyad us-Saliheen",
-        "author": "Imam An-Nawawi",
-        "category": "Islamic Teachings",
-        "description": "A comprehensive guide to Islamic ethics and morality",
-        "icon": "mosque",
-        "cover_color": "bg-info",
-        "text_color": "text-info",
-        "pages": 512,
-        "language": "Arabic",
-        "rating": 4.7
-    }
-]
+# Shared catalog: held in memory, or read from the SQLite database named by
+# CATALOG_DATABASE (seeded from books_data when empty)
+catalog = open_catalog(books_data, search_fields=("title", "author"))
+
+# Clientside filtering for small catalogs: the browser filters and pages a
+# shipped copy of the catalog
+CLIENTSIDE_GRID = use_clientside_grid(catalog)
 
 # App Layout with Modern Design
 app.layout = html.Div([
@@ -83,28 +59,29 @@ app.layout = html.Div([
                     dbc.InputGroupText(html.I(className="fas fa-search")),
                     dcc.Input(
                         id="search-input",
+                        list="search-suggestions",
                         type="text",
                         placeholder="Search books...",
                         className="form-control"
-                    )
+                    ),
+                    *search_gate(),
+                    *suggest_components(app),
+                    *catalog_stores(app, CLIENTSIDE_GRID)
                 ], className="mb-3")
             ], width=6),
             dbc.Col([
                 dbc.Select(
                     id="category-select",
-                    options=[
-                        {"label": "All Categories", "value": "All"},
-                        {"label": "Holy Book", "value": "Holy Book"},
-                        {"label": "Hadith", "value": "Hadith"},
-                        {"label": "Islamic Teachings", "value": "Islamic Teachings"}
-                    ],
                     className="mb-3"
                 )
             ], width=6)
         ], className="mt-4 mb-4"),
 
         # Books Grid
-        html.Div(id="books-grid", className="row g-4")
+        html.Div(id="books-grid", className="row g-4"),
+
+        # Pagination and Result Count
+        pagination_bar()
     ], fluid=True)
 ])
 
@@ -172,36 +149,32 @@ def create_book_card(book):
         lg=4, md=6, sm=12
     )
 
-# Callback for Dynamic Book Filtering
-@app.callback(
-    Output("books-grid", "children"),
-    [Input("search-input", "value"),
-     Input("category-select", "value")]
-)
-def update_book_grid(search_term, category):
-    import pandas as pd
-
-    # Convert books to DataFrame
-    df_books = pd.DataFrame(books_data)
-
-    # Filter by search term
-    if search_term:
-        df_books = df_books[
-            df_books['title'].str.contains(search_term, case=False, na=False) |
-            df_books['author'].str.contains(search_term, case=False, na=False)
-        ]
-
-    # Filter by category
-    if category and category != "All":
-        df_books = df_books[df_books['category'] == category]
-
-    # Create book cards
-    book_cards = [
-        create_book_card(book.to_dict())
-        for _, book in df_books.iterrows()
-    ]
+# Batch renderer compiled once from the card template above, with rendered
+# cards cached per book id and content fingerprint
+CARD_CACHE_SIZE = int(os.environ.get("CARD_CACHE_SIZE", "4096"))
+card_renderer = CardRenderer(create_book_card, cache=CardCache(CARD_CACHE_SIZE))
+
+# Grid callbacks, with rendered pages cached per normalized query and
+# catalog generation (RESULT_CACHE)
+register_book_grid(app, catalog, card_renderer, mode="paged", clientside=CLIENTSIDE_GRID, namespace=__file__)
+
+# Search input gate: debounce/throttle/submit handled in the browser
+register_search_gate(app)
+
+# Category options with the book count of each over the current search,
+# counted in the browser when it filters the catalog itself
+register_category_options(app, catalog, clientside=CLIENTSIDE_GRID)
+
+# Title and author suggestions for the search box, served outside the Dash callbacks
+suggestions = register_suggest_route(app, catalog)
+if suggestions is not None:
+    publish("suggestions", suggestions.stats)
+
+# Worker warm-up, run by gunicorn.conf.py before a worker accepts requests
+register_warmup(app, catalog, suggestions)
 
-    return book_cards
+# Statistics route for this worker's catalog and caches
+register_stats_route(app)
 
 # Server configuration
 if __name__ == '__main__':
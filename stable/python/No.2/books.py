@@ -0,0 +1,42 @@
+# Books Dataset with Enhanced Metadata
+books_data = [
+    {
+        "id": 1,
+        "title": "The Noble Quran",
+        "author": "Divine Revelation",
+        "category": "Holy Book",
+        "description": "The foundational text of Islam, providing guidance for humanity",
+        "icon": "quran",
+        "cover_color": "bg-primary",
+        "text_color": "text-primary",
+        "pages": 604,
+        "language": "Arabic",
+        "rating": 5.0
+    },
+    {
+        "id": 2,
+        "title": "Sahih Al-Bukhari",
+        "author": "Imam Al-Bukhari",
+        "category": "Hadith",
+        "description": "A collection of sayings and actions of Prophet Muhammad",
+        "icon": "scroll",
+        "cover_color": "bg-success",
+        "text_color": "text-success",
+        "pages": 432,
+        "language": "Arabic",
+        "rating": 4.9
+    },
+    {
+        "id": 3,
+        "title": "Riyad us-Saliheen",
+        "author": "Imam An-Nawawi",
+        "category": "Islamic Teachings",
+        "description": "A comprehensive guide to Islamic ethics and morality",
+        "icon": "mosque",
+        "cover_color": "bg-info",
+        "text_color": "text-info",
+        "pages": 512,
+        "language": "Arabic",
+        "rating": 4.7
+    }
+]
@@ -0,0 +1,2 @@
+# Settings and hooks shared by the templates (see islamic_library/gunicorn_conf.py)
+from islamic_library.gunicorn_conf import *  # noqa: F401,F403
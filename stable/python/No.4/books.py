@@ -0,0 +1,39 @@
+# Books Dataset with Enhanced Metadata
+books_data = [
+    {
+        "id": 1,
+        "title": "The Noble Quran",
+        "author": "Divine Revelation",
+        "category": "Holy Book",
+        "description": "The foundational sacred text of Islam, providing comprehensive guidance.",
+        "tags": ["Spiritual", "Guidance", "Divine"],
+        "published": 610,
+        "languages": ["Arabic", "Translations"],
+        "icon": "book-quran",
+        "color": "primary"
+    },
+    {
+        "id": 2,
+        "title": "Sahih Al-Bukhari",
+        "author": "Imam Al-Bukhari",
+        "category": "Hadith",
+        "description": "Comprehensive collection of authenticated sayings of Prophet Muhammad.",
+        "tags": ["Prophetic", "Authentic", "Tradition"],
+        "published": 870,
+        "languages": ["Arabic", "Translations"],
+        "icon": "scroll",
+        "color": "success"
+    },
+    {
+        "id": 3,
+        "title": "Riyad us-Saliheen",
+        "author": "Imam An-Nawawi",
+        "category": "Islamic Teachings",
+        "description": "A profound compilation of ethical and moral teachings in Islam.",
+        "tags": ["Ethics", "Morality", "Guidance"],
+        "published": 1277,
+        "languages": ["Arabic", "Translations"],
+        "icon": "mosque",
+        "color": "info"
+    }
+]
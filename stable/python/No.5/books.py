@@ -0,0 +1,36 @@
+# Books Dataset
+books_data = [
+    {
+        "id": 1,
+        "title": "The Noble Quran",
+        "author": "Divine Revelation",
+        "category": "Holy Book",
+        "description": "The foundational text of Islam, providing divine guidance.",
+        "icon": "book-quran",
+        "primary_color": "primary",
+        "rating": 5.0,
+        "difficulty": "Advanced"
+    },
+    {
+        "id": 2,
+        "title": "Sahih Al-Bukhari",
+        "author": "Imam Al-Bukhari",
+        "category": "Hadith",
+        "description": "Authentic collection of Prophet Muhammad's sayings.",
+        "icon": "scroll",
+        "primary_color": "success",
+        "rating": 4.9,
+        "difficulty": "Intermediate"
+    },
+    {
+        "id": 3,
+        "title": "Riyad us-Saliheen",
+        "author": "Imam An-Nawawi",
+        "category": "Islamic Teachings",
+        "description": "A comprehensive guide to Islamic ethics and morality.",
+        "icon": "mosque",
+        "primary_color": "danger",
+        "rating": 4.7,
+        "difficulty": "Beginner"
+    }
+]
@@ -0,0 +1,42 @@
+# Enhanced Books Dataset with Yellow-Themed Colors
+books_data = [
+    {
+        "id": 1,
+        "title": "The Noble Quran",
+        "author": "Divine Revelation",
+        "category": "Holy Book",
+        "description": "The ultimate source of divine guidance, providing comprehensive wisdom for humanity.",
+        "language": "Arabic & Translations",
+        "complexity": "Advanced",
+        "spiritual_focus": ["Guidance", "Wisdom", "Spiritual Growth"],
+        "icon": "book-quran",
+        "accent_color": "#FFD700",  # Golden Yellow
+        "text_color": "#333"
+    },
+    {
+        "id": 2,
+        "title": "Sahih Al-Bukhari",
+        "author": "Imam Al-Bukhari",
+        "category": "Hadith",
+        "description": "A comprehensive collection of authenticated sayings and practices of Prophet Muhammad.",
+        "language": "Arabic & Translations",
+        "complexity": "Intermediate",
+        "spiritual_focus": ["Prophetic Traditions", "Historical Context", "Authentic Practices"],
+        "icon": "scroll",
+        "accent_color": "#FFC107",  # Amber
+        "text_color": "#333"
+    },
+    {
+        "id": 3,
+        "title": "Riyad us-Saliheen",
+        "author": "Imam An-Nawawi",
+        "category": "Islamic Teachings",
+        "description": "A profound compilation of ethical principles and moral teachings in Islam.",
+        "language": "Arabic & Translations",
+        "complexity": "Beginner",
+        "spiritual_focus": ["Ethical Living", "Moral Development", "Practical Guidance"],
+        "icon": "mosque",
+        "accent_color": "#FFEB3B",  # Bright Yellow
+        "text_color": "#333"
+    }
+]
@@ -1,7 +1,18 @@
+import os
+
 import dash
-from dash import html, dcc, Input, Output, callback
-import pandas as pd
+from dash import html, dcc
 import dash_bootstrap_components as dbc
+from islamic_library.cards import CardCache, CardRenderer
+from islamic_library.clientside import catalog_stores
+from islamic_library.controls import register_category_options, register_search_gate, search_gate
+from islamic_library.grid import books_section, register_book_grid, use_clientside_grid
+from islamic_library.metrics import publish, register_stats_route
+from islamic_library.repository import open_catalog
+from islamic_library.suggest import register_suggest_route, suggest_components
+from islamic_library.warmup import register_warmup
+
+from books import books_data
 
 # Initialize Dash App
 app = dash.Dash(__name__,
@@ -12,74 +23,13 @@ app = dash.Dash(__name__,
     ]
 )
 
-# Enhanced Books Dataset with Multi-Color Palette
-books_data = [
-    {
-        "id": 1,
-        "title": "The Noble Quran",
-        "author": "Divine Revelation",
-        "category": "Holy Book",
-        "description": "The ultimate source of divine guidance, providing comprehensive wisdom for humanity.",
-        "language": "Arabic & Translations",
-        "complexity": "Advanced",
-        "spiritual_focus": ["Guidance", "Wisdom", "Spiritual Growth"],
-        "icon": "book-quran",
-        "accent_color": "#3498db",  # Blue
-        "text_color": "#ffffff"
-    },
-    {
-        "id": 2,
-        "title": "Sahih Al-Bukhari",
-        "author": "Imam Al-Bukhari",
-        "category": "Hadith",
-        "description": "A comprehensive collection of authenticated sayings and practices of Prophet Muhammad.",
-        "language": "Arabic & Translations",
-        "complexity": "Intermediate",
-        "spiritual_focus": ["Prophetic Traditions", "Historical Context", "Authentic Practices"],
-        "icon": "scroll",
-        "accent_color": "#e74c3c",  # Red
-        "text_color": "#ffffff"
-    },
-    {
-        "id": 3,
-        "title": "Riyad us-Saliheen",
-        "author": "Imam An-Nawawi",
-        "category": "Islamic Teachings",
-        "description": "A profound compilation of ethical principles and moral teachings in Islam.",
-        "language": "Arabic & Translations",
-        "complexity": "Beginner",
-        "spiritual_focus": ["Ethical Living", "Moral Development", "Practical Guidance"],
-        "icon": "mosque",
-        "accent_color": "#2ecc71",  # Green
-        "text_color": "#ffffff"
-    },
-    {
-        "id": 4,
-        "title": "Tafsir Ibn Kathir",
-        "author": "Ibn Kathir",
-        "category": "Quranic Interpretation",
-        "description": "Comprehensive Quranic exegesis providing deep insights into Quranic verses.",
-        "language": "Arabic & Translations",
-        "complexity": "Advanced",
-        "spiritual_focus": ["Interpretation", "Scholarly Analysis", "Detailed Explanation"],
-        "icon": "book-open",
-        "accent_color": "#f39c12",  # Orange
-        "text_color": "#ffffff"
-    },
-    {
-        "id": 5,
-        "title": "Muwatta Malik",
-        "author": "Imam Malik",
-        "category": "Hadith",
-        "description": "A foundational text of Islamic jurisprudence and prophetic traditions.",
-        "language": "Arabic & Translations",
-        "complexity": "Intermediate",
-        "spiritual_focus": ["Jurisprudence", "Legal Principles", "Prophetic Guidance"],
-        "icon": "scroll",
-        "accent_color": "#FFD700",  # Yellow
-        "text_color": "#333"
-    }
-]
+# Shared catalog: held in memory, or read from the SQLite database named by
+# CATALOG_DATABASE (seeded from books_data when empty)
+catalog = open_catalog(books_data, search_fields=("title", "author"))
+
+# Grid mode (GRID_MODE): one page per request, or infinite scroll. Small
+# catalogs can be filtered and paged in the browser (paged grid only)
+CLIENTSIDE_GRID = use_clientside_grid(catalog)
 
 # App Layout with Multi-Color Design
 app.layout = dbc.Container([
@@ -104,6 +54,7 @@ app.layout = dbc.Container([
             dbc.InputGroup([
                 dbc.Input(
                     id="search-input",
+                    list="search-suggestions",
                     placeholder="Search books by title or author...",
                     type="text",
                     className="form-control-lg"
@@ -113,18 +64,14 @@ app.layout = dbc.Container([
                     id="search-button",
                     color="primary",
                     className="btn-lg"
-                )
+                ),
+                *search_gate(),
+                *suggest_components(app),
+                *catalog_stores(app, CLIENTSIDE_GRID)
             ], className="mb-3"),
 
             dcc.Dropdown(
                 id="category-select",
-                options=[
-                    {"label": "All Categories", "value": "All"},
-                    {"label": "Holy Book", "value": "Holy Book"},
-                    {"label": "Hadith", "value": "Hadith"},
-                    {"label": "Islamic Teachings", "value": "Islamic Teachings"},
-                    {"label": "Quranic Interpretation", "value": "Quranic Interpretation"}
-                ],
                 placeholder="Filter by Category",
                 className="mb-3"
             )
@@ -132,7 +79,7 @@ app.layout = dbc.Container([
     ]),
 
     # Books Grid
-    html.Div(id="books-grid", className="row g-4")
+    books_section()
 ], fluid=True, className="p-0")
 
 # Book Card Component with Multi-Color Theme
@@ -221,34 +168,32 @@ def create_book_card(book):
         lg=4, md=6, sm=12
     )
 
-# Callback for Dynamic Book Filtering
-@app.callback(
-    Output("books-grid", "children"),
-    [Input("search-button", "n_clicks"),
-     Input("search-input", "value"),
-     Input("category-select", "value")]
-)
-def update_book_grid(n_clicks, search_term, category):
-    df_books = pd.DataFrame(books_data)
-
-    # Filter by search term
-    if search_term:
-        df_books = df_books[
-            df_books['title'].str.contains(search_term, case=False, na=False) |
-            df_books['author'].str.contains(search_term, case=False, na=False)
-        ]
-
-    # Filter by category
-    if category and category != "All":
-        df_books = df_books[df_books['category'] == category]
-
-    # Create book cards
-    book_cards = [
-        create_book_card(book.to_dict())
-        for _, book in df_books.iterrows()
-    ]
+# Batch renderer compiled once from the card template above, with rendered
+# cards cached per book id and content fingerprint
+CARD_CACHE_SIZE = int(os.environ.get("CARD_CACHE_SIZE", "4096"))
+card_renderer = CardRenderer(create_book_card, cache=CardCache(CARD_CACHE_SIZE))
+
+# Grid callbacks for GRID_MODE, with rendered pages cached per normalized
+# query and catalog generation (RESULT_CACHE)
+register_book_grid(app, catalog, card_renderer, clientside=CLIENTSIDE_GRID, namespace=__file__)
+
+# Search input gate: debounce/throttle/submit handled in the browser
+register_search_gate(app)
+
+# Category options with the book count of each over the current search,
+# counted in the browser when it filters the catalog itself
+register_category_options(app, catalog, clientside=CLIENTSIDE_GRID)
+
+# Title and author suggestions for the search box, served outside the Dash callbacks
+suggestions = register_suggest_route(app, catalog)
+if suggestions is not None:
+    publish("suggestions", suggestions.stats)
+
+# Worker warm-up, run by gunicorn.conf.py before a worker accepts requests
+register_warmup(app, catalog, suggestions)
 
-    return book_cards
+# Statistics route for this worker's catalog and caches
+register_stats_route(app)
 
 # Server configuration
 if __name__ == '__main__':
@@ -0,0 +1,68 @@
+# Enhanced Books Dataset with Multi-Color Palette
+books_data = [
+    {
+        "id": 1,
+        "title": "The Noble Quran",
+        "author": "Divine Revelation",
+        "category": "Holy Book",
+        "description": "The ultimate source of divine guidance, providing comprehensive wisdom for humanity.",
+        "language": "Arabic & Translations",
+        "complexity": "Advanced",
+        "spiritual_focus": ["Guidance", "Wisdom", "Spiritual Growth"],
+        "icon": "book-quran",
+        "accent_color": "#3498db",  # Blue
+        "text_color": "#ffffff"
+    },
+    {
+        "id": 2,
+        "title": "Sahih Al-Bukhari",
+        "author": "Imam Al-Bukhari",
+        "category": "Hadith",
+        "description": "A comprehensive collection of authenticated sayings and practices of Prophet Muhammad.",
+        "language": "Arabic & Translations",
+        "complexity": "Intermediate",
+        "spiritual_focus": ["Prophetic Traditions", "Historical Context", "Authentic Practices"],
+        "icon": "scroll",
+        "accent_color": "#e74c3c",  # Red
+        "text_color": "#ffffff"
+    },
+    {
+        "id": 3,
+        "title": "Riyad us-Saliheen",
+        "author": "Imam An-Nawawi",
+        "category": "Islamic Teachings",
+        "description": "A profound compilation of ethical principles and moral teachings in Islam.",
+        "language": "Arabic & Translations",
+        "complexity": "Beginner",
+        "spiritual_focus": ["Ethical Living", "Moral Development", "Practical Guidance"],
+        "icon": "mosque",
+        "accent_color": "#2ecc71",  # Green
+        "text_color": "#ffffff"
+    },
+    {
+        "id": 4,
+        "title": "Tafsir Ibn Kathir",
+        "author": "Ibn Kathir",
+        "category": "Quranic Interpretation",
+        "description": "Comprehensive Quranic exegesis providing deep insights into Quranic verses.",
+        "language": "Arabic & Translations",
+        "complexity": "Advanced",
+        "spiritual_focus": ["Interpretation", "Scholarly Analysis", "Detailed Explanation"],
+        "icon": "book-open",
+        "accent_color": "#f39c12",  # Orange
+        "text_color": "#ffffff"
+    },
+    {
+        "id": 5,
+        "title": "Muwatta Malik",
+        "author": "Imam Malik",
+        "category": "Hadith",
+        "description": "A foundational text of Islamic jurisprudence and prophetic traditions.",
+        "language": "Arabic & Translations",
+        "complexity": "Intermediate",
+        "spiritual_focus": ["Jurisprudence", "Legal Principles", "Prophetic Guidance"],
+        "icon": "scroll",
+        "accent_color": "#FFD700",  # Yellow
+        "text_color": "#333"
+    }
+]
@@ -0,0 +1,33 @@
+# Enhanced Books Dataset
+books_data = [
+    {
+        "id": 1,
+        "title": "The Noble Quran",
+        "author": "Divine Revelation",
+        "category": "Holy Book",
+        "description": "The ultimate source of divine guidance for humanity.",
+        "tags": ["Spiritual", "Wisdom", "Universal"],
+        "difficulty": "Advanced",
+        "cover_color": "#3498db"
+    },
+    {
+        "id": 2,
+        "title": "Sahih Al-Bukhari",
+        "author": "Imam Al-Bukhari",
+        "category": "Hadith",
+        "description": "Comprehensive collection of Prophetic traditions.",
+        "tags": ["Authentic", "Historical", "Prophetic"],
+        "difficulty": "Intermediate",
+        "cover_color": "#e74c3c"
+    },
+    {
+        "id": 3,
+        "title": "Riyad us-Saliheen",
+        "author": "Imam An-Nawawi",
+        "category": "Islamic Teachings",
+        "description": "Profound compilation of ethical and moral teachings.",
+        "tags": ["Ethics", "Moral", "Guidance"],
+        "difficulty": "Beginner",
+        "cover_color": "#2ecc71"
+    }
+]
@@ -0,0 +1,8 @@
+"""Catalog, search and caching engine shared by the library templates.
+
+Each template (stable/python/No.1 ... No.8) keeps its own layout, cards and
+sample books in app.py and books.py, and imports everything else from here.
+"""
+
+# Also the version Dash puts in the URLs of the package's scripts
+__version__ = "0.1.0"
@@ -0,0 +1,107 @@
+import re
+import unicodedata
+
+# Search keys: a spelling-tolerant, script-independent form of a text, so
+# "Bukhari", "Al-Bukhari", "bukhaari", "Bukhārī" and "البخاري" all read
+# "bukhari". Keys are computed once when a catalog is indexed, and once per
+# query.
+#
+#   1. Diacritics (Latin accents, Arabic harakat, shadda, tatweel) are dropped
+#   2. Arabic letter forms are normalized: hamza and madda alefs and alef
+#      wasla read as alef, alef maqsura and hamza on ya as ya, ta marbuta
+#      as ha
+#   3. Articles are dropped: "al-", "el-", assimilated "an-N", "as-S", ...
+#      and Arabic "ال". Assimilated ones read the same spaced as hyphenated
+#      ("us Salihin", "an Nawawi"), except "as" and "at", which spaced are
+#      too often English ("as soon", "at the")
+#   4. Latin transliteration variants are folded: apostrophes and half rings
+#      (hamza, ayn) go, long vowels written twice ("aa", "ee", "oo") read as
+#      one, and a final "ah" (ta marbuta) as "a"
+#   5. Words with a known spelling in the other script or in another
+#      transliteration (TRANSLITERATIONS) read as that spelling
+#
+# Vowels are kept, so a key only ever stands for spellings of the same words.
+# Bump ANALYSIS_VERSION whenever the keys change: stored keys (the SQLite
+# catalog's search text) are recomputed when it moves.
+ANALYSIS_VERSION = 3
+
+# Known spellings of names and terms common in the catalog, written as any
+# variant; each reads as the key of its transliteration
+TRANSLITERATIONS = {
+    "الله": "allah",
+    "ابن": "ibn",
+    "اسلام": "islam",
+    "بخاري": "bukhari",
+    "تفسير": "tafsir",
+    "تيميه": "taymiyyah",
+    "حديث": "hadith",
+    "رياض": "riyad",
+    "riyadh": "riyad",
+    "سنه": "sunnah",
+    "سيره": "sirah",
+    "صالحين": "salihin",
+    "صحيح": "sahih",
+    "غزالي": "ghazali",
+    "فقه": "fiqh",
+    "قران": "quran",
+    "koran": "quran",
+    "كثير": "kathir",
+    "مالك": "malik",
+    "محمد": "muhammad",
+    "mohammed": "muhammad",
+    "mohammad": "muhammad",
+    "muhammed": "muhammad",
+    "مسلم": "muslim",
+    "موطا": "muwatta",
+    "نووي": "nawawi",
+}
+
+# Combining marks, plus the Arabic tatweel that only stretches a word
+_MARKS = {code: None for code in range(0x10000) if unicodedata.category(chr(code)) == "Mn"}
+_MARKS[0x0640] = None
+
+_ARABIC = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه"})
+
+# "ال" starts "الله" rather than being its article
+_ARTICLE = re.compile(r"(?<!\w)(?:ال(?!له(?!\w))(?=\w\w)|[aeu]l[-\s](?=\w)|[aeu]([dnrstz])-(?=\1)"
+                      r"|[eu]([dnrstz])\s(?=\2)|a([dnrz])\s(?=\3))")
+
+# Apostrophes and half rings stand for hamza and ayn in transliterations;
+# they are dropped rather than split a word
+_APOSTROPHES = "'`‘’ʼʾʿ"
+_SEPARATORS = re.compile(rf"[^\w{_APOSTROPHES}]+")
+_LATIN = [
+    (re.compile(f"[{_APOSTROPHES}]"), ""),
+    (re.compile("aa+"), "a"),
+    (re.compile("(?:ee|ii)+"), "i"),
+    (re.compile("(?:oo|uu)+"), "u"),
+    (re.compile(r"(?<=\w\w)ah\b"), "a"),
+]
+
+
+def _variants(word):
+    for pattern, replacement in _LATIN:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+def _normalize(text):
+    # Steps 1-4 (see above)
+    text = unicodedata.normalize("NFKD", text)
+    if not text.isascii():
+        text = text.translate(_MARKS).translate(_ARABIC)
+    text = _ARTICLE.sub("", text.casefold())
+    return [_variants(word) for word in _SEPARATORS.sub(" ", text).split()]
+
+
+# TRANSLITERATIONS as normalized words and their keys; js/catalog_filter.js
+# receives it with the clientside catalog
+KNOWN_WORDS = {word: " ".join(_normalize(spelling))
+               for variant, spelling in TRANSLITERATIONS.items() for word in _normalize(variant)}
+
+
+def search_key(value):
+    """Search key of ``value`` (see above); empty for None."""
+    if value is None:
+        return ""
+    return " ".join(KNOWN_WORDS.get(word, word) for word in _normalize(str(value)))
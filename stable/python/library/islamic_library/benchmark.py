@@ -0,0 +1,253 @@
+import argparse
+import importlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+import tracemalloc
+from types import MappingProxyType
+
+import pandas as pd
+import plotly
+
+from .cards import CardCache, CardRenderer
+from .catalog import compact_record, encode_columns, record_fingerprint
+from .controls import SEARCH_INPUT_DELAY_MS, SEARCH_INPUT_MODES
+from .scripts import SCRIPTS_DIR
+
+
+def template_app():
+    # The app of the template in the working directory: run from its folder
+    return importlib.import_module("app")
+
+
+def synthetic_books(rows):
+    books_data = template_app().books_data
+    return [dict(books_data[i % len(books_data)], id=i + 1) for i in range(rows)]
+
+
+def best_of(repeat, run):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def encode(cards):
+    return json.dumps(cards, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def bench_cards(args):
+    app = template_app()
+    create_book_card, card_renderer = app.create_book_card, app.card_renderer
+    books = synthetic_books(args.rows)
+
+    def component_path():
+        df_books = pd.DataFrame(books)
+        return encode([create_book_card(book.to_dict()) for _, book in df_books.iterrows()])
+
+    def batch_path():
+        return encode(card_renderer.render(books))
+
+    # Warm card cache: every card was rendered by an earlier search
+    keys = [(book["id"], record_fingerprint(book)) for book in books]
+    cached_renderer = CardRenderer(create_book_card, cache=CardCache(args.rows))
+    cached_renderer.render(books, keys=keys)
+
+    def cached_path():
+        return encode(cached_renderer.render(books, keys=keys))
+
+    print(f"Rendering {args.rows} cards (best of {args.repeat}, including JSON encoding)")
+    baseline = None
+    paths = [
+        ("iterrows + create_book_card", component_path),
+        ("CardRenderer.render", batch_path),
+        ("CardRenderer + warm cache", cached_path),
+    ]
+    for name, run in paths:
+        elapsed = best_of(args.repeat, run)
+        baseline = baseline or elapsed
+        print(f"  {name:<28} {elapsed * 1000:9.1f} ms  {args.rows / elapsed:11,.0f} cards/s  x{baseline / elapsed:.1f}")
+
+
+# Queries typed by the scripted user in the typing benchmark
+TYPING_SCRIPT = [
+    "sahih al-bukhari",
+    "riyad us-saliheen",
+    "tafsir ibn kathir",
+    "muwatta malik",
+    "the noble quran",
+]
+
+
+def typing_session(queries, seed):
+    # (time in ms, event, text): one "input" per keystroke, Enter after each query
+    rng = random.Random(seed)
+    now, events = 0.0, []
+    for query in queries:
+        for length in range(1, len(query) + 1):
+            # Roughly 110 ms between keystrokes, longer at word boundaries
+            now += rng.gauss(110, 35) + (180 if query[length - 1] == " " else 0)
+            events.append((max(now, 0.0), "input", query[:length]))
+        now += 400
+        events.append((now, "enter", None))
+        # Read the results, then clear the field for the next query
+        now += 2000
+        events.append((now, "input", ""))
+        now += 500
+    return events
+
+
+# Runs js/search_input.js under node against a stubbed page and fake clock:
+# replays the typing events (read as JSON from stdin) and prints the time and
+# text of every search-query update the gate makes, each a grid callback POST
+GATE_HARNESS = """
+const fs = require("fs");
+const vm = require("vm");
+const [script, mode, delay] = process.argv.slice(1);
+let now = 0, nextTimer = 1;
+const timers = new Map(), sends = [];
+function element() {
+    const listeners = {};
+    return {
+        value: "",
+        addEventListener: (type, listener) => (listeners[type] = listeners[type] || []).push(listener),
+        dispatch: (type, event) => (listeners[type] || []).forEach((listener) => listener(event || {}))
+    };
+}
+const input = element(), button = element();
+const window = {
+    setTimeout: (callback, wait) => (timers.set(nextTimer, [now + Math.max(0, wait || 0), callback]), nextTimer++),
+    clearTimeout: (id) => timers.delete(id),
+    dash_clientside: {no_update: null, set_props: (id, props) => sends.push([now, props.data])}
+};
+const document = {getElementById: (id) => ({"search-input": input, "search-button": button})[id] || null};
+const context = {window, document, Date: {now: () => now}};
+vm.runInNewContext(fs.readFileSync(script, "utf8"), context);
+
+function runTimers(until) {
+    for (;;) {
+        let due = null;
+        for (const [id, [at]] of timers) {
+            if (at <= until && (due === null || at < timers.get(due)[0])) {
+                due = id;
+            }
+        }
+        if (due === null) {
+            break;
+        }
+        const [at, callback] = timers.get(due);
+        timers.delete(due);
+        now = at;
+        callback();
+    }
+    now = until;
+}
+
+window.dash_clientside.librarySearch.attach({mode: mode, delay: Number(delay)});
+for (const [time, event, text] of JSON.parse(fs.readFileSync(0, "utf8"))) {
+    runTimers(time);
+    if (event === "enter") {
+        input.dispatch("keydown", {key: "Enter"});
+    } else {
+        input.value = text;
+        input.dispatch("input");
+    }
+}
+runTimers(Infinity);
+console.log(JSON.stringify(sends));
+"""
+
+
+def run_gate(events, mode, delay):
+    """``(time in ms, text)`` of each request js/search_input.js sends for the typing ``events``.
+
+    The script itself runs under node, with a stubbed page and a fake clock
+    driving its timers.
+    """
+    script = os.path.join(SCRIPTS_DIR, "search_input.js")
+    result = subprocess.run(["node", "-e", GATE_HARNESS, script, mode, str(delay)], check=True,
+                            capture_output=True, input=json.dumps(events), text=True)
+    return [tuple(send) for send in json.loads(result.stdout)]
+
+
+def superseded(sends, latency):
+    """Requests still in flight when the next one is sent, with ``latency`` ms per request.
+
+    Their responses are out of date on arrival: js/search_input.js aborts
+    them and drops whatever still arrives, but the server may already have
+    filtered and rendered the grid for them.
+    """
+    return sum(later < sent + latency for (sent, _), (later, _) in zip(sends, sends[1:]))
+
+
+def bench_typing(args):
+    if shutil.which("node") is None:
+        raise SystemExit("the typing benchmark runs js/search_input.js under node, which is not installed")
+    events = typing_session(TYPING_SCRIPT, args.seed)
+    keystrokes = sum(event == "input" for _, event, _ in events)
+    print(f"Typing {len(TYPING_SCRIPT)} queries ({keystrokes} keystrokes), delay {args.delay} ms,"
+          f" {args.latency} ms per request (js/search_input.js under node)")
+    live = len(run_gate(events, "live", args.delay))
+    for mode in SEARCH_INPUT_MODES:
+        sends = run_gate(events, mode, args.delay)
+        print(f"  {mode:<9} {len(sends):4d} grid callbacks  {100 * (1 - len(sends) / live):5.1f}% fewer than live"
+              f"  {superseded(sends, args.latency):4d} superseded in flight")
+
+
+def bench_memory(args):
+    # Rows as stored in a JSONL export or the database, one author per ten books
+    lines = [json.dumps(dict(book, title=f"{book['title']} {book['id']}",
+                             author=f"{book['author']} {book['id'] % max(1, args.rows // 10)}"))
+             for book in synthetic_books(args.rows)]
+
+    def measure(build):
+        tracemalloc.start()
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, size
+
+    def plain():
+        return tuple(MappingProxyType(json.loads(line)) for line in lines)
+
+    def compact():
+        records = tuple(compact_record(json.loads(line)) for line in lines)
+        return records, encode_columns(records)
+
+    print(f"Catalog records for {args.rows} books (excluding the search index)")
+    _, baseline = measure(plain)
+    (_, columns), size = measure(compact)
+    print(f"  {'one object per value':<28} {baseline / 2 ** 20:8.1f} MB  {baseline / args.rows:6.0f} B/row")
+    print(f"  {'interned + encoded columns':<28} {size / 2 ** 20:8.1f} MB  {size / args.rows:6.0f} B/row"
+          f"  {100 * (1 - size / baseline):5.1f}% less")
+    for field, column in columns.items():
+        print(f"    {field:<24} {len(column.values):7d} values  {column.nbytes / args.rows:5.1f} B/row of codes")
+
+
+if __name__ == '__main__':
+    # python -m islamic_library.benchmark, from a template's folder
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the library template")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cards = commands.add_parser("cards", help="card rendering throughput")
+    cards.add_argument("--rows", type=int, default=10000)
+    cards.add_argument("--repeat", type=int, default=3)
+    cards.set_defaults(run=bench_cards)
+
+    typing = commands.add_parser("typing", help="grid callbacks the search gate sends for a scripted typing session")
+    typing.add_argument("--delay", type=int, default=SEARCH_INPUT_DELAY_MS)
+    typing.add_argument("--latency", type=int, default=150, help="server time per grid callback, in ms")
+    typing.add_argument("--seed", type=int, default=7)
+    typing.set_defaults(run=bench_typing)
+
+    memory = commands.add_parser("memory", help="memory held by the catalog records")
+    memory.add_argument("--rows", type=int, default=100000)
+    memory.set_defaults(run=bench_memory)
+
+    args = parser.parse_args()
+    args.run(args)
@@ -0,0 +1,136 @@
+import math
+import os
+
+import numpy as np
+
+from .search import _SHIFT, _trigram_code, fold, trigrams
+
+# Negative fast path: a Bloom filter over the trigrams of the searched text
+# rejects most search terms that match no book (typos, junk) without asking
+# the database. SEARCH_FILTER_FPR is the false-positive rate the filter is
+# sized for; 0 turns it off.
+SEARCH_FILTER_FPR = float(os.environ.get("SEARCH_FILTER_FPR", "0.01"))
+
+# Keys added since the filter was sized may push its estimated false-positive
+# rate up to this many times the target before it is rebuilt
+REBUILD_FACTOR = 2.0
+
+_BIGRAM = ~np.uint64((1 << _SHIFT) - 1)
+_UNIGRAM = ~np.uint64((1 << (2 * _SHIFT)) - 1)
+
+
+def use_search_filter():
+    return SEARCH_FILTER_FPR > 0
+
+
+def _mix(keys):
+    # splitmix64 finalizer: codes differing in one character differ in every bit
+    keys = keys ^ (keys >> np.uint64(30))
+    keys = keys * np.uint64(0xBF58476D1CE4E5B9)
+    keys = keys ^ (keys >> np.uint64(27))
+    keys = keys * np.uint64(0x94D049BB133111EB)
+    return keys ^ (keys >> np.uint64(31))
+
+
+class BloomFilter:
+    """Bloom filter over uint64 keys, sized for ``capacity`` keys at ``rate`` false positives.
+
+    The bit count is a power of two; the ``hashes`` probe positions of a key
+    come from the two halves of one 64-bit mix of it (double hashing).
+    """
+
+    def __init__(self, capacity, rate):
+        self.rate = rate
+        bits = max(64, -capacity * math.log(rate) / math.log(2) ** 2)
+        self.bits = 1 << math.ceil(math.log2(bits))
+        self.hashes = max(1, round(self.bits / max(capacity, 1) * math.log(2)))
+        self.count = 0
+        self._words = np.zeros(self.bits // 64, dtype=np.uint64)
+
+    def _positions(self, keys):
+        mixed = _mix(np.asarray(keys, dtype=np.uint64))
+        first, step = mixed & np.uint64(0xFFFFFFFF), (mixed >> np.uint64(32)) | np.uint64(1)
+        probes = np.arange(self.hashes, dtype=np.uint64)
+        return (first[:, None] + probes * step[:, None]) & np.uint64(self.bits - 1)
+
+    def add(self, keys):
+        positions = self._positions(keys).ravel()
+        np.bitwise_or.at(self._words, positions >> np.uint64(6), np.uint64(1) << (positions & np.uint64(63)))
+        self.count += len(keys)
+
+    def contains(self, keys):
+        """Boolean array: False where a key was certainly never added."""
+        positions = self._positions(keys)
+        bits = (self._words[positions >> np.uint64(6)] >> (positions & np.uint64(63))) & np.uint64(1)
+        return bits.all(axis=1)
+
+    @property
+    def fill(self):
+        return int(np.unpackbits(self._words.view(np.uint8)).sum()) / self.bits
+
+    @property
+    def estimated_rate(self):
+        """False-positive rate now: the chance all of a key's probes hit set bits."""
+        return self.fill ** self.hashes
+
+    @property
+    def nbytes(self):
+        return self._words.nbytes
+
+
+def _term_codes(term):
+    # Codes a text must hold to contain ``term``: its trigrams, or for
+    # shorter terms the prefix codes of the trigrams they begin
+    points = [ord(char) for char in fold(term)]
+    if len(points) >= 3:
+        return np.unique(np.array([_trigram_code(*points[i:i + 3]) for i in range(len(points) - 2)],
+                                  dtype=np.uint64))
+    return np.array([_trigram_code(*(points + [0, 0])[:3])], dtype=np.uint64)
+
+
+class TermFilter:
+    """Answers "might any of these texts contain this term?" with no false negatives.
+
+    Holds every trigram of the case-folded texts, and the one- and
+    two-character prefixes of each, in a Bloom filter. A term lacking any
+    of its codes matches nothing; one holding them all may still match
+    nothing (a false positive at the filter's rate, or trigrams spread over
+    different texts), and is looked up as usual.
+    """
+
+    def __init__(self, texts, rate=SEARCH_FILTER_FPR, capacity=None):
+        codes = self._codes(texts)
+        self.bloom = BloomFilter(capacity or len(codes), rate)
+        self.bloom.add(codes)
+        self.checked = self.rejected = 0
+
+    @staticmethod
+    def _codes(texts):
+        codes = np.unique(trigrams([fold(text) for text in texts])[0])
+        return np.unique(np.concatenate([codes, codes & _BIGRAM, codes & _UNIGRAM]))
+
+    def add(self, texts):
+        """Take in more texts (texts removed since stay in; they only cost false positives)."""
+        self.bloom.add(self._codes(texts))
+
+    @property
+    def saturated(self):
+        return self.bloom.estimated_rate > self.bloom.rate * REBUILD_FACTOR
+
+    def might_contain(self, term):
+        self.checked += 1
+        if self.bloom.contains(_term_codes(term)).all():
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self):
+        return {
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "keys": self.bloom.count,
+            "bytes": self.bloom.nbytes,
+            "hashes": self.bloom.hashes,
+            "target_fpr": self.bloom.rate,
+            "estimated_fpr": self.bloom.estimated_rate,
+        }
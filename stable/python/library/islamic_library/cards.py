@@ -0,0 +1,281 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Placeholders substituted for record fields while the card template is traced.
+# Iterating a placeholder yields two numbered elements, which marks the list a
+# comprehension produced: the one holding both copies of the repeated element.
+_FIELD = "\x1f{}\x1f"
+_ITEM = "\x1e{}#{}\x1e"
+_TOKEN = re.compile("\x1f([^\x1f]*)\x1f|\x1e([^\x1e]*)#([01])\x1e")
+
+
+class _Placeholder(str):
+    # Stands in for a field value while create_card is traced
+    def __new__(cls, key):
+        placeholder = super().__new__(cls, _FIELD.format(key))
+        placeholder.key = key
+        return placeholder
+
+    def __iter__(self):
+        return iter([_ITEM.format(self.key, 0), _ITEM.format(self.key, 1)])
+
+
+class _Probe(dict):
+    def __getitem__(self, key):
+        return _Placeholder(key)
+
+    def get(self, key, default=None):
+        return _Placeholder(key)
+
+
+def component_json(node):
+    """Serialize a Dash component tree to the JSON the renderer consumes."""
+    if hasattr(node, "to_plotly_json"):
+        data = dict(node.to_plotly_json())
+        data["props"] = {key: component_json(value) for key, value in data["props"].items()}
+        return data
+    if isinstance(node, (list, tuple)):
+        return [component_json(value) for value in node]
+    if isinstance(node, dict):
+        return {key: component_json(value) for key, value in node.items()}
+    return node
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _compile_string(node):
+    parts = _TOKEN.split(node)
+    if len(parts) == 1:
+        return None, set()
+
+    # re.split with three groups yields [text, field, item, copy, text, ..., text]
+    ops, loops = [], set()
+    for position in range(0, len(parts) - 1, 4):
+        text, field, item, copy = parts[position:position + 4]
+        if text:
+            ops.append((0, text))
+        if field is not None:
+            ops.append((1, field))
+        else:
+            ops.append((2, item))
+            loops.add((item, int(copy)))
+    if parts[-1]:
+        ops.append((0, parts[-1]))
+
+    if len(ops) == 1 and ops[0][0] == 1:
+        key = ops[0][1]
+        return (lambda record, items: _plain(record[key])), loops
+    if len(ops) == 1:
+        key = ops[0][1]
+        return (lambda record, items: _plain(items[key])), loops
+
+    def fill(record, items):
+        return "".join(
+            value if kind == 0 else str(_plain(record[value] if kind == 1 else items[value]))
+            for kind, value in ops
+        )
+    return fill, loops
+
+
+def _compile_list(node):
+    compiled = [(value,) + _compile(value) for value in node]
+    first = {field for _, _, used in compiled for field, copy in used if copy == 0}
+    second = {field for _, _, used in compiled for field, copy in used if copy == 1}
+    repeated = first & second
+
+    ops, loops, is_dynamic = [], set(), False
+    for value, fill, used in compiled:
+        fields = {field for field, _ in used} & repeated
+        if len(fields) > 1:
+            raise ValueError("card element iterates over several list fields")
+        if fields:
+            # One traced copy of an element produced by a comprehension
+            field = fields.pop()
+            if (field, 0) not in used:
+                continue
+            if ops and ops[-1][0] == 2 and ops[-1][1] == field:
+                ops[-1][2].append((value, fill))
+            else:
+                ops.append((2, field, [(value, fill)]))
+            is_dynamic = True
+            loops |= {(name, copy) for name, copy in used if name != field}
+            continue
+        loops |= used
+        if fill is None:
+            ops.append((0, value, None))
+        else:
+            ops.append((1, None, fill))
+            is_dynamic = True
+    if not is_dynamic:
+        return None, loops
+
+    def fill_list(record, items):
+        result = []
+        for kind, value, fill in ops:
+            if kind == 0:
+                result.append(value)
+            elif kind == 1:
+                result.append(fill(record, items))
+            else:
+                for item in record[value] or ():
+                    bound = dict(items)
+                    bound[value] = _plain(item)
+                    result.extend(
+                        constant if element is None else element(record, bound)
+                        for constant, element in fill
+                    )
+        return result
+    return fill_list, loops
+
+
+def _compile(node):
+    """Compile a traced JSON node into ``fill(record, items)``.
+
+    Returns ``(fill, loops)``: ``fill`` is None when the node is constant and
+    ``loops`` holds the (list field, traced copy) pairs the node refers to.
+    """
+    if isinstance(node, str):
+        return _compile_string(node)
+
+    if isinstance(node, list):
+        return _compile_list(node)
+
+    if isinstance(node, dict):
+        constant, dynamic, loops = {}, [], set()
+        for key, value in node.items():
+            fill, used = _compile(value)
+            loops |= used
+            if fill is None:
+                constant[key] = value
+            else:
+                dynamic.append((key, fill))
+        if not dynamic:
+            return None, loops
+
+        def fill_dict(record, items):
+            result = dict(constant)
+            for key, fill in dynamic:
+                result[key] = fill(record, items)
+            return result
+        return fill_dict, loops
+
+    return None, set()
+
+
+def _rows(books):
+    # Accept a sequence of records or a mapping of equally long column arrays
+    if isinstance(books, dict):
+        names = list(books.keys())
+        return (dict(zip(names, values)) for values in zip(*(books[name] for name in names)))
+    return books
+
+
+class CardCache:
+    """Bounded LRU of rendered cards keyed by ``(book id, content fingerprint)``.
+
+    A record whose content changes gets a new fingerprint, and storing its
+    new card drops the stale one for the same book id.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._cards = OrderedDict()
+        self._keys_by_id = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cards)
+
+    def get(self, key):
+        with self._lock:
+            card = self._cards.get(key)
+            if card is None:
+                self.misses += 1
+                return None
+            self._cards.move_to_end(key)
+            self.hits += 1
+            return card
+
+    def put(self, key, card):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if key[0] is not None:
+                stale = self._keys_by_id.get(key[0])
+                if stale is not None and stale != key and self._cards.pop(stale, None) is not None:
+                    self.invalidations += 1
+                self._keys_by_id[key[0]] = key
+            self._cards[key] = card
+            self._cards.move_to_end(key)
+            while len(self._cards) > self.maxsize:
+                evicted, _ = self._cards.popitem(last=False)
+                if self._keys_by_id.get(evicted[0]) == evicted:
+                    del self._keys_by_id[evicted[0]]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._cards.clear()
+            self._keys_by_id.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cards),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class CardRenderer:
+    """Batch renderer emitting card component JSON straight from book records.
+
+    ``create_card`` is traced once with placeholder values and compiled into
+    a filler that copies each record's fields into the serialized component
+    tree, so no Dash components are instantiated per book. ``create_card``
+    must only format and iterate record fields, not branch on them; cards the
+    tracer cannot handle fall back to calling ``create_card`` for every record.
+    """
+
+    def __init__(self, create_card, cache=None):
+        self.create_card = create_card
+        self.cache = cache
+        try:
+            tree = component_json(create_card(_Probe()))
+            fill, loops = _compile(tree)
+            if loops:
+                raise ValueError("card iterates over a list field outside of a list")
+            if fill is None:
+                self._fill = lambda record: tree
+            else:
+                self._fill = lambda record: fill(record, {})
+        except (ValueError, TypeError, KeyError):
+            self._fill = self.render_one
+
+    def render_one(self, book):
+        return component_json(self.create_card(book))
+
+    def render(self, books, keys=None):
+        """Render ``books``; with a cache, ``keys`` names each book's cached card."""
+        fill = self._fill
+        if self.cache is None or keys is None:
+            return [fill(book) for book in _rows(books)]
+
+        cards = []
+        for key, book in zip(keys, _rows(books)):
+            card = self.cache.get(key)
+            if card is None:
+                card = fill(book)
+                self.cache.put(key, card)
+            cards.append(card)
+        return cards
@@ -0,0 +1,628 @@
+import copy
+import hashlib
+import json
+import sys
+import threading
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from .facets import FACETS, Bitmap, FacetIndex, facet_selection
+from .fuzzy import FuzzyIndex, use_fuzzy
+from .ranking import RankIndex, bm25_scores, tokenize, top_rows, use_ranking
+from .search import SearchIndex
+
+
+def record_fingerprint(record):
+    """Stable digest of a record's content, used to key rendered cards."""
+    payload = json.dumps(dict(record), sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+# Deltas are folded into a full rebuild once they hold this share of the rows
+COMPACT_RATIO = 0.25
+COMPACT_SEGMENTS = 16
+
+# Fields repeating a handful of values across the catalog: held as int32 codes
+# into a dictionary of their distinct values, and filtered by code
+ENCODED_FIELDS = ("category", "author", "language", "difficulty", "complexity", "published")
+LIST_FIELDS = ("tags", "spiritual_focus", "languages")
+
+
+def encode_values(values, dictionary=()):
+    """Dictionary-encode ``values`` as int32 codes into ``dictionary``, extended as needed.
+
+    Returns ``(codes, dictionary)``; the dictionary keeps existing codes stable.
+    """
+    lookup = {value: code for code, value in enumerate(dictionary)}
+    codes = np.fromiter((lookup.setdefault(value, len(lookup)) for value in values),
+                        dtype=np.int32, count=len(values))
+    return codes, tuple(lookup)
+
+
+def _items(value):
+    return value if isinstance(value, (list, tuple)) else ()
+
+
+class EncodedColumn:
+    """One field of every row as int32 codes into ``values``, its distinct values.
+
+    List fields hold one code per item, and row ``i`` owns the items from
+    ``offsets[i]`` to ``offsets[i + 1]``. Rows without the field hold None.
+    """
+
+    def __init__(self, codes, values, offsets=None):
+        self.codes = codes
+        self.values = values
+        self.offsets = offsets
+        self._lookup = None
+
+    @classmethod
+    def encode(cls, column, dictionary=(), listed=False):
+        if not listed:
+            return cls(*encode_values(column, dictionary))
+        items = [_items(value) for value in column]
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in items], out=offsets[1:])
+        codes, values = encode_values([item for value in items for item in value], dictionary)
+        return cls(codes, values, offsets)
+
+    @property
+    def listed(self):
+        return self.offsets is not None
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.offsets.nbytes if self.listed else 0)
+
+    def __len__(self):
+        return len(self.offsets) - 1 if self.listed else len(self.codes)
+
+    def extend(self, column):
+        """Column with ``column``'s values appended, keeping the existing codes."""
+        added = EncodedColumn.encode(column, self.values, self.listed)
+        if not self.listed:
+            return EncodedColumn(np.concatenate([self.codes, added.codes]), added.values)
+        offsets = np.concatenate([self.offsets, added.offsets[1:] + self.offsets[-1]])
+        return EncodedColumn(np.concatenate([self.codes, added.codes]), added.values, offsets)
+
+    def code(self, value):
+        """Code of ``value``, or -1 when no row has it."""
+        if self._lookup is None:
+            self._lookup = {item: code for code, item in enumerate(self.values)}
+        return self._lookup.get(value, -1)
+
+    def matches(self, rows, value):
+        """Boolean mask of the ``rows`` holding ``value`` (among their items, for lists)."""
+        code = self.code(value)
+        if code < 0:
+            return np.zeros(len(rows), dtype=bool)
+        if not self.listed:
+            return self.codes[rows] == code
+        # Owners of the matching items, found from their positions
+        owners = np.searchsorted(self.offsets, np.flatnonzero(self.codes == code), side="right") - 1
+        return np.isin(rows, owners)
+
+
+def compact_record(record):
+    """Read-only copy of ``record`` sharing one string object per distinct key and encoded value."""
+    compact = {}
+    for key, value in record.items():
+        if key in ENCODED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        elif key in LIST_FIELDS and isinstance(value, (list, tuple)):
+            value = tuple(sys.intern(item) if isinstance(item, str) else item for item in value)
+        compact[sys.intern(key) if isinstance(key, str) else key] = value
+    return MappingProxyType(compact)
+
+
+def encode_columns(records, columns=None, offset=0):
+    """Encoded columns of ``records``, appended to ``columns`` (of ``offset`` rows) if given.
+
+    Columns for the encoded fields a delta introduces hold None for the rows before it.
+    """
+    columns = dict(columns or {})
+    for field in ENCODED_FIELDS + LIST_FIELDS:
+        if field not in columns and not any(field in record for record in records):
+            continue
+        values = [record.get(field) for record in records]
+        listed = field in LIST_FIELDS
+        if field not in columns:
+            columns[field] = EncodedColumn.encode([None] * offset, listed=listed)
+        columns[field] = columns[field].extend(values)
+    return columns
+
+
+class _Chain:
+    """Read-only concatenation of row sequences, without copying them."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.starts = np.cumsum([0] + [len(part) for part in parts])
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def _locate(self, row):
+        part = int(np.searchsorted(self.starts, row, side="right")) - 1
+        return self.parts[part], row - int(self.starts[part])
+
+    def __getitem__(self, row):
+        part, row = self._locate(row)
+        return part[row]
+
+    def __setitem__(self, row, value):
+        part, row = self._locate(row)
+        part[row] = value
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+
+    def __add__(self, other):
+        return _Chain(self.parts + [other])
+
+
+def _chained(rows, added):
+    return (rows if isinstance(rows, _Chain) else _Chain([rows])) + added
+
+
+class CatalogState:
+    """One immutable generation of the catalog: records, columns and index.
+
+    Deltas are appended as extra index segments over the new records, with
+    replaced and deleted rows masked out, so a small change never rebuilds
+    the index of the whole catalog. ``order`` holds each row's sort key
+    (its position in the source), which keeps results in source order.
+    Repetitive fields are also held as encoded columns (see ENCODED_FIELDS),
+    which the filters compare as integers; the records share one string per
+    distinct value of those fields.
+    """
+
+    def __init__(self, records, version, search_fields, order=None):
+        records = tuple(compact_record(record) for record in records)
+        self._setup(records, version, search_fields, SearchIndex(records, fields=search_fields),
+                    encode_columns(records), order, [None] * len(records))
+
+    @classmethod
+    def restore(cls, records, version, search_fields, index, columns, order, fingerprints):
+        """State over prebuilt columns, such as arrays mapped from a snapshot."""
+        state = cls.__new__(cls)
+        state._setup(records, version, search_fields, index, columns, order, fingerprints)
+        return state
+
+    def _setup(self, records, version, search_fields, index, columns, order, fingerprints):
+        self.records = records
+        self.version = version
+        self.search_fields = search_fields
+        self.segments = [(0, index)]
+        self.columns = columns
+        if order is None:
+            self.order = np.arange(len(records), dtype=np.int64)
+        else:
+            self.order = np.asarray(order, dtype=np.int64)
+        self.live = None
+        self.dead = 0
+        self._positions = None
+        self._fingerprints = fingerprints
+        self._facets = None
+        self._counts = {}
+        self._rankers = {}
+        self._fuzzy = {}
+        self._frame = None
+
+    def value_counts(self, field):
+        """Live rows holding each code of the encoded scalar ``field``."""
+        counts = self._counts.get(field)
+        if counts is None:
+            column = self.columns.get(field)
+            if column is None:
+                return np.zeros(0, dtype=np.int64)
+            if column.listed:
+                raise ValueError(f"cannot count the list field {field!r}")
+            codes = column.codes if self.live is None else column.codes[self.live]
+            counts = self._counts[field] = np.bincount(codes, minlength=len(column.values))
+        return counts
+
+    @property
+    def facets(self):
+        # Facet bitmaps of this generation, built per facet on first use
+        if self._facets is None:
+            self._facets = FacetIndex(self)
+        return self._facets
+
+    def matches(self, rows, field, value):
+        """Boolean mask of the ``rows`` whose ``field`` holds ``value``."""
+        if field not in ENCODED_FIELDS + LIST_FIELDS:
+            raise ValueError(f"cannot filter on {field!r}")
+        column = self.columns.get(field)
+        if column is None:
+            return np.zeros(len(rows), dtype=bool)
+        return column.matches(rows, value)
+
+    def positions(self):
+        """Map each live row's sort key to its row position."""
+        if self._positions is None:
+            rows = self.live_rows()
+            self._positions = dict(zip(self.order[rows].tolist(), rows.tolist()))
+        return self._positions
+
+    def live_rows(self):
+        if self.live is None:
+            return np.arange(len(self.records), dtype=np.int32)
+        return np.flatnonzero(self.live).astype(np.int32)
+
+    def extend(self, records, order, dead, version):
+        """Next generation with ``records`` appended and the rows in ``dead`` dropped."""
+        state = copy.copy(self)
+        offset = len(self.records)
+        added = tuple(compact_record(record) for record in records)
+        state.version = version
+        state.records = _chained(self.records, added)
+        state.segments = self.segments + [(offset, SearchIndex(added, fields=self.search_fields))]
+        state.columns = encode_columns(added, self.columns, offset)
+        state.order = np.concatenate([self.order, np.asarray(order, dtype=np.int64)])
+        state.live = np.ones(len(state.records), dtype=bool)
+        if self.live is not None:
+            state.live[:offset] = self.live
+        dead = np.unique(np.asarray(list(dead), dtype=np.int64))
+        state.live[dead] = False
+        state.dead = len(state.records) - int(state.live.sum())
+        state._positions = None
+        if self._positions is not None:
+            # Carry the key map over instead of rebuilding it from every row
+            positions = state._positions = dict(self._positions)
+            for row in dead:
+                positions.pop(int(self.order[row]), None)
+            positions.update(zip(state.order[offset:].tolist(), range(offset, len(state.records))))
+        state._fingerprints = _chained(self._fingerprints, [None] * len(added))
+        state._facets = None
+        state._rankers = dict(self._rankers)
+        state._fuzzy = dict(self._fuzzy)
+        # Counts already taken move by the delta instead of being recounted
+        state._counts = {}
+        for field, counts in self._counts.items():
+            codes = state.columns[field].codes
+            updated = np.zeros(len(state.columns[field].values), dtype=np.int64)
+            updated[:len(counts)] = counts
+            np.add.at(updated, codes[offset:], 1)
+            np.subtract.at(updated, codes[dead], 1)
+            state._counts[field] = updated
+        state._frame = None
+        return state
+
+    def compacted(self):
+        """Rebuild as a single segment holding only the live rows, in order."""
+        rows = self.live_rows()
+        rows = rows[np.argsort(self.order[rows], kind="stable")]
+        return CatalogState([self.records[row] for row in rows.tolist()], self.version,
+                            self.search_fields, order=self.order[rows])
+
+    def needs_compaction(self):
+        added = len(self.records) - self.segments[0][1].size
+        return (len(self.segments) > COMPACT_SEGMENTS
+                or added + self.dead > COMPACT_RATIO * max(1, len(self.records) - self.dead))
+
+    def search(self, term=None):
+        """Sorted (by source order) live row positions matching ``term``."""
+        if term:
+            parts = [index.search(term) + np.int32(offset) for offset, index in self.segments]
+            rows = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        else:
+            rows = np.arange(len(self.records), dtype=np.int32)
+        return self._ordered(rows)
+
+    def fuzzy(self, term):
+        """Sorted live rows holding a close spelling of every word of ``term``.
+
+        Each segment gets its fuzzy index on the first lookup; later
+        generations reuse the indexes of the segments they share.
+        """
+        words = tokenize(term)
+        if not words:
+            return self.search(term)
+        parts = [index.search(words) + np.int32(offset)
+                 for (offset, _), index in zip(self.segments, self._fuzzy_indexes())]
+        return self._ordered(np.concatenate(parts))
+
+    def _parts(self):
+        # Records of each segment
+        return self.records.parts if isinstance(self.records, _Chain) else [self.records]
+
+    def _segment_indexes(self, built, build):
+        # One index per segment, built from its records on first use and
+        # kept in ``built`` under the segment's offset
+        indexes = []
+        for (offset, _), part in zip(self.segments, self._parts()):
+            if offset not in built:
+                built[offset] = build(part)
+            indexes.append(built[offset])
+        return indexes
+
+    def _fuzzy_indexes(self):
+        return self._segment_indexes(self._fuzzy, lambda part: FuzzyIndex(part, fields=self.search_fields))
+
+    def warm(self, ranked=True, fuzzy=True):
+        """Build the lazy per-generation indexes now instead of on the first queries needing them."""
+        if ranked:
+            self._segment_indexes(self._rankers, RankIndex)
+        if fuzzy:
+            self._fuzzy_indexes()
+
+    def _ordered(self, rows):
+        # Live ``rows`` in source order
+        if self.live is not None:
+            rows = rows[self.live[rows]]
+        if len(self.segments) > 1:
+            rows = rows[np.argsort(self.order[rows], kind="stable")]
+        return rows
+
+    def rank(self, term):
+        """``(rows, scores)`` of the live rows holding every word of ``term``, or None.
+
+        Each segment gets its word index on the first ranked query; later
+        generations reuse the indexes of the segments they share.
+        """
+        scores = bm25_scores(self._segment_indexes(self._rankers, RankIndex), term)
+        if scores is None:
+            return None
+        scores = np.concatenate(scores)
+        matched = scores > 0
+        if self.live is not None:
+            matched &= self.live
+        rows = np.flatnonzero(matched).astype(np.int32)
+        return rows, scores[rows]
+
+    def card_key(self, row):
+        # Fingerprints are computed lazily, the first time a row is rendered
+        fingerprint = self._fingerprints[row]
+        if fingerprint is None:
+            fingerprint = self._fingerprints[row] = record_fingerprint(self.records[row])
+        return self.records[row].get("id"), fingerprint
+
+    @property
+    def frame(self):
+        # Built on first use only; the callbacks never need it
+        if self._frame is None:
+            frame = pd.DataFrame([dict(record) for record in self.records])
+            for field, column in self.columns.items():
+                if not column.listed and field in frame:
+                    frame[field] = frame[field].astype("category")
+            self._frame = frame
+        return self._frame
+
+    def __len__(self):
+        return len(self.records) - self.dead
+
+
+class CatalogView:
+    """Rows of one catalog generation selected by a query, without copying."""
+
+    def __init__(self, state, rows, offset=0):
+        self.state = state
+        self.rows = rows
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        records = self.state.records
+        return (records[row] for row in self.rows.tolist())
+
+    def window(self, offset, limit):
+        return CatalogView(self.state, self.rows[offset:offset + limit], self.offset + offset)
+
+    def page(self, number, size):
+        """Return ``(window, number, pages)`` for the 1-based page ``number``.
+
+        The page number is clamped into range, so a stale page from a
+        previous, longer result set lands on the last page instead.
+        """
+        pages = max(1, -(-len(self) // size))
+        number = min(max(1, number or 1), pages)
+        return self.window((number - 1) * size, size), number, pages
+
+    def card_keys(self):
+        card_key = self.state.card_key
+        return [card_key(row) for row in self.rows.tolist()]
+
+    @property
+    def frame(self):
+        return self.state.frame.iloc[self.rows]
+
+
+class RankedView(CatalogView):
+    """Rows of a ranked query, best first.
+
+    Only as many rows as a window reaches are put in order, so showing the
+    first page of a large result costs no full sort.
+    """
+
+    def __init__(self, state, rows, scores):
+        super().__init__(state, None)
+        self.matches = rows
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.matches)
+
+    def _top(self, count):
+        return top_rows(self.matches, self.scores, self.state.order[self.matches], count)
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = self._top(len(self.matches))
+        return self._rows
+
+    @rows.setter
+    def rows(self, rows):
+        self._rows = rows
+
+    def window(self, offset, limit):
+        rows = self._rows if self._rows is not None else self._top(offset + limit)
+        return CatalogView(self.state, rows[offset:offset + limit], self.offset + offset)
+
+
+class Catalog:
+    """Read-only book catalog shared by every callback in a worker process.
+
+    Queries run against whichever generation is current when they start;
+    ``reload`` and ``apply`` build the next generation off to the side and
+    swap it in with a single assignment, so readers never see a half-built
+    catalog.
+    """
+
+    def __init__(self, records, search_fields=("title", "author"), order=None, version=1, source=None):
+        self.search_fields = tuple(search_fields)
+        self.source = source
+        self._lock = threading.Lock()
+        self.state = CatalogState(records, version, self.search_fields, order=order)
+
+    @classmethod
+    def from_state(cls, state, source=None):
+        catalog = cls.__new__(cls)
+        catalog.search_fields = tuple(state.search_fields)
+        catalog.source = source
+        catalog._lock = threading.Lock()
+        catalog.state = state
+        return catalog
+
+    @property
+    def version(self):
+        return self.state.version
+
+    @property
+    def generation(self):
+        """What results derived from the catalog are keyed on: its ``source`` and version.
+
+        Versions restart from 1 with the process, so the source (such as a
+        digest of the records) tells catalogs of different content apart.
+        """
+        return self.source, self.state.version
+
+    def __len__(self):
+        return len(self.state)
+
+    def stats(self):
+        state = self.state
+        return {
+            "backend": "memory",
+            "version": state.version,
+            "books": len(state),
+            "segments": len(state.segments),
+            "dead_rows": state.dead,
+            "facet_bytes": state.facets.nbytes,
+            "fuzzy_bytes": sum(index.nbytes for index in state._fuzzy.values()),
+        }
+
+    def reload(self, records, order=None, version=None):
+        with self._lock:
+            version = self.state.version + 1 if version is None else version
+            self.state = CatalogState(records, version, self.search_fields, order=order)
+        return self.state
+
+    def apply(self, upserts=None, deletes=(), version=None):
+        """Apply a delta without rebuilding the whole index.
+
+        ``upserts`` maps sort keys to new or changed records and ``deletes``
+        lists the sort keys of removed records.
+        """
+        upserts = upserts or {}
+        with self._lock:
+            state = self.state
+            positions = state.positions()
+            dead = [positions[key] for key in list(upserts) + list(deletes) if key in positions]
+            keys = sorted(upserts)
+            version = state.version + 1 if version is None else version
+            state = state.extend([upserts[key] for key in keys], keys, dead, version)
+            if state.needs_compaction():
+                state = state.compacted()
+            self.state = state
+        return self.state
+
+    def warm(self):
+        """Build the current generation's lazy indexes for the configured search modes."""
+        self.state.warm(ranked=use_ranking(), fuzzy=use_fuzzy())
+
+    def value_counts(self, field):
+        """Books per value of the encoded scalar ``field``, in first-seen order."""
+        state = self.state
+        counts = state.value_counts(field)
+        values = state.columns[field].values if len(counts) else ()
+        return {value: count for value, count in zip(values, counts.tolist())
+                if count and value is not None}
+
+    def _matches(self, state, search_term, ranked):
+        # Rows matching the search term, with their scores when ranked; a
+        # term matching nothing falls back to close spellings of its words
+        if search_term and (use_ranking() if ranked is None else ranked):
+            ranking = state.rank(search_term)
+            if ranking is not None:
+                if len(ranking[0]) or not use_fuzzy():
+                    return ranking
+                return state.fuzzy(search_term), None
+        rows = state.search(search_term)
+        if search_term and not len(rows) and use_fuzzy():
+            rows = state.fuzzy(search_term)
+        return rows, None
+
+    def _view(self, state, rows, scores):
+        return CatalogView(state, rows) if scores is None else RankedView(state, rows, scores)
+
+    def query(self, search_term=None, category=None, facets=None, ranked=None, **filters):
+        """Rows matching ``search_term``, ``category``, ``facets`` and ``filters``.
+
+        ``facets`` maps facets (see facets.FACETS) to one value or a list of
+        values, any of which matches. ``filters`` maps encoded fields to a
+        value; list fields match rows holding the value among their items.
+        Ranked queries (SEARCH_RANKING=bm25 by default) match every word of
+        the search term and put the best matches first.
+        """
+        state = self.state
+
+        # Filter by search term
+        rows, scores = self._matches(state, search_term, ranked)
+        keep = np.ones(len(rows), dtype=bool)
+
+        # Filter by category and field values, comparing integer codes
+        if category and category != "All":
+            filters["category"] = category
+        for field, value in filters.items():
+            if value is not None:
+                keep &= state.matches(rows, field, value)
+
+        # Filter by facets, intersecting their bitmaps
+        selected = state.facets.selection(facet_selection(facets))
+        if selected is not None:
+            keep &= selected.contains(rows)
+
+        return self._view(state, rows[keep], None if scores is None else scores[keep])
+
+    def faceted(self, search_term=None, category=None, facets=None, fields=FACETS, ranked=None):
+        """Return ``(view, counts)``: the query's rows and its facet counts.
+
+        ``counts`` maps each of ``fields`` to the number of matching books
+        per value, leaving out values no book matches. Each facet is
+        counted as if its own selection were cleared, so the counts show
+        what picking another value would return.
+        """
+        state = self.state
+        index = state.facets
+        selection = facet_selection(facets, category)
+        rows, scores = self._matches(state, search_term, ranked)
+        scope = Bitmap.from_rows(np.sort(rows))
+
+        counts = {}
+        for facet in fields:
+            others = index.selection(selection, skip=facet)
+            found = index.counts(scope if others is None else scope & others, facet)
+            counts[facet] = {value: count for value, count in found.items() if count}
+
+        selected = index.selection(selection)
+        if selected is not None:
+            keep = selected.contains(rows)
+            rows, scores = rows[keep], None if scores is None else scores[keep]
+        return self._view(state, rows, scores), counts
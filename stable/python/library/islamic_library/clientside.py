@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+
+import flask
+import plotly
+from dash import ClientsideFunction, Input, Output, dcc
+
+from .analysis import KNOWN_WORDS, search_key
+from .fuzzy import FUZZY_LENGTHS, use_fuzzy
+from .ranking import tokenize, use_ranking
+from .scripts import add_script
+from .search import _indexed
+
+# Clientside filtering ships the whole catalog to the browser once and filters
+# it there, so typing costs no server round trip. It is opt-in and only used
+# for catalogs of at most CLIENTSIDE_MAX_BOOKS books; larger catalogs, and
+# ranked search (SEARCH_RANKING=bm25), keep the server-side callbacks.
+CLIENTSIDE_FILTERING = os.environ.get("CLIENTSIDE_FILTERING", "0") == "1"
+CLIENTSIDE_MAX_BOOKS = int(os.environ.get("CLIENTSIDE_MAX_BOOKS", "2000"))
+CATALOG_PATH = "/catalog.json"
+
+
+def use_clientside_filtering(catalog):
+    return CLIENTSIDE_FILTERING and not use_ranking() and len(catalog) <= CLIENTSIDE_MAX_BOOKS
+
+
+class CatalogPayload:
+    """JSON snapshot of the catalog for the browser, rebuilt once per generation.
+
+    Every book carries its category, its pre-rendered card and, for each
+    search field, the text the in-memory index holds: folded, then its
+    search key. With it come the table of known spellings search keys use
+    and, when the typo-tolerant fallback is on, the words of the search
+    fields with their keys, so the browser matches what the server would.
+    The ETag is a digest of the body, so every worker hands out the same
+    tag for the same catalog.
+    """
+
+    def __init__(self, catalog, renderer):
+        self.catalog = catalog
+        self.renderer = renderer
+        self._lock = threading.Lock()
+        self._generation = self._body = self._etag = None
+
+    def get(self):
+        # Generation, not version: it also moves with direct database edits
+        generation = self.catalog.generation
+        with self._lock:
+            if self._generation != generation:
+                books = self.catalog.query()
+                books = books.window(0, len(books))
+                cards = self.renderer.render(books, keys=books.card_keys())
+                fields = self.catalog.search_fields
+                payload = {
+                    "version": self.catalog.version,
+                    "known": KNOWN_WORDS,
+                    "books": [
+                        {
+                            "text": [_indexed(book.get(field)) for field in fields],
+                            "category": book.get("category"),
+                            "card": card
+                        }
+                        for book, card in zip(books, cards)
+                    ]
+                }
+                if use_fuzzy():
+                    words = [sorted({word for field in fields for word in tokenize(book.get(field))})
+                             for book in books]
+                    vocab = sorted({word for found in words for word in found})
+                    ids = {word: position for position, word in enumerate(vocab)}
+                    payload["fuzzy"] = {
+                        "lengths": FUZZY_LENGTHS,
+                        "vocab": [[word, search_key(word)] for word in vocab]
+                    }
+                    for book, found in zip(payload["books"], words):
+                        book["words"] = [ids[word] for word in found]
+                self._body = json.dumps(payload, cls=plotly.utils.PlotlyJSONEncoder).encode("utf-8")
+                self._etag = hashlib.blake2b(self._body, digest_size=16).hexdigest()
+                self._generation = generation
+            return self._body, self._etag
+
+
+def catalog_stores(app, enabled):
+    """Stores holding the shipped catalog; empty unless clientside filtering is on."""
+    if not enabled:
+        return []
+    return [
+        dcc.Store(id="catalog-source", data={"url": app.get_relative_path(CATALOG_PATH)}),
+        dcc.Store(id="catalog-store")
+    ]
+
+
+def register_catalog_route(app, catalog, renderer):
+    payload = CatalogPayload(catalog, renderer)
+
+    @app.server.route(CATALOG_PATH)
+    def catalog_json():
+        body, etag = payload.get()
+        response = flask.Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        # Revalidate on every page load; an unchanged catalog costs a 304
+        response.cache_control.no_cache = True
+        return response.make_conditional(flask.request)
+
+    add_script(app, "catalog_filter.js")
+    app.clientside_callback(
+        ClientsideFunction(namespace="libraryCatalog", function_name="load"),
+        Output("catalog-store", "data"),
+        Input("catalog-source", "data")
+    )
+    return payload
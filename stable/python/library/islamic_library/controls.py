@@ -0,0 +1,93 @@
+import json
+import os
+
+from dash import ClientsideFunction, Input, Output, dcc
+
+from .results import RESULT_CACHE_SIZE, MemoryStore, normalize_query
+from .scripts import add_script
+
+# Search input modes, applied in the browser by js/search_input.js:
+#   "live"     sends every keystroke
+#   "debounce" sends once typing pauses for SEARCH_INPUT_DELAY_MS
+#   "throttle" sends at most once every SEARCH_INPUT_DELAY_MS while typing
+#   "submit"   sends only on Enter or a click on the search button
+SEARCH_INPUT_MODES = ("live", "debounce", "throttle", "submit")
+SEARCH_INPUT_MODE = os.environ.get("SEARCH_INPUT_MODE", "debounce")
+SEARCH_INPUT_DELAY_MS = int(os.environ.get("SEARCH_INPUT_DELAY_MS", "300"))
+
+
+def search_gate(mode=SEARCH_INPUT_MODE, delay_ms=SEARCH_INPUT_DELAY_MS):
+    """Stores placed next to ``search-input``; callbacks listen to ``search-query``.
+
+    The input's own value never reaches the server. The browser-side gate
+    decides when the typed text is copied into ``search-query`` and only
+    ever sends the latest text, so superseded keystrokes cost no request.
+    A callback request reading ``search-query`` that is still in flight when
+    a newer one for the same output is sent is aborted, and its response, if
+    it still comes, is dropped.
+    """
+    if mode not in SEARCH_INPUT_MODES:
+        raise ValueError(f"Unknown search input mode {mode!r}, expected one of {SEARCH_INPUT_MODES}")
+    return [
+        dcc.Store(id="search-query", data=""),
+        dcc.Store(id="search-config", data={"mode": mode, "delay": delay_ms})
+    ]
+
+
+def register_search_gate(app):
+    add_script(app, "search_input.js")
+    app.clientside_callback(
+        ClientsideFunction(namespace="librarySearch", function_name="attach"),
+        Output("search-query", "data"),
+        Input("search-config", "data")
+    )
+
+
+def category_options(catalog, search_term=None, all_label="All Categories", cache=None):
+    """Options for ``category-select``: every category in the catalog with its book count.
+
+    Counts are the catalog's category facet over ``search_term``: how many
+    of the books it finds each category holds. Categories it finds nothing
+    in stay listed with a count of 0, so a picked one never drops out.
+    Without a search they are the catalog's own category counts; searches
+    are counted once per catalog generation when a ``cache`` is given.
+    """
+    categories = catalog.value_counts("category")
+    if not search_term:
+        counts = categories
+    else:
+        key = (search_term, catalog.generation)
+        counts = None if cache is None else cache.get(key)
+        if counts is None:
+            _, counts = catalog.faceted(search_term, fields=("category",))
+            counts = counts["category"]
+            if cache is not None:
+                cache.put(key, counts)
+    return [{"label": f"{all_label} ({sum(counts.values()):,})", "value": "All"}] + [
+        {"label": f"{category} ({counts.get(category, 0):,})", "value": category}
+        for category in categories
+    ]
+
+
+def register_category_options(app, catalog, all_label="All Categories", clientside=False):
+    """Fill ``category-select`` as the search changes.
+
+    With ``clientside`` filtering the browser counts the shipped catalog
+    (js/catalog_filter.js), so searching costs no request for them either.
+    """
+    # Counts follow the search; picking a category leaves them as they are
+    if clientside:
+        app.clientside_callback(
+            "function (query, catalog) {"
+            f" return window.dash_clientside.libraryCatalog.categoryOptions(query, catalog, {json.dumps(all_label)});"
+            " }",
+            Output("category-select", "options"),
+            [Input("search-query", "data"),
+             Input("catalog-store", "data")]
+        )
+        return
+    cache = MemoryStore(RESULT_CACHE_SIZE)
+    app.callback(
+        Output("category-select", "options"),
+        Input("search-query", "data")
+    )(lambda search_term: category_options(catalog, normalize_query(search_term), all_label, cache))
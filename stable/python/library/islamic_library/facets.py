@@ -0,0 +1,240 @@
+import numpy as np
+
+# Fields the catalog is faceted on, in display order
+FACETS = ("category", "tags", "languages", "complexity", "difficulty", "published")
+
+# Width in years of the ranges the published facet groups books into
+PUBLISHED_RANGE = 100
+
+# Roaring layout: rows are split into chunks of 2**16 by their high bits. A
+# chunk holding few rows keeps their low bits as a sorted uint16 array, a
+# denser one as a 2**16-bit bitset
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+ARRAY_LIMIT = 4096
+
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+
+def published_label(year):
+    start = year // PUBLISHED_RANGE * PUBLISHED_RANGE
+    return f"{start}–{start + PUBLISHED_RANGE - 1}"
+
+
+def published_bounds(label):
+    start, stop = label.split("–")
+    return int(start), int(stop)
+
+
+def _container(low):
+    # Sorted, unique uint16 low bits, stored in whichever form is smaller
+    if len(low) <= ARRAY_LIMIT:
+        return low
+    bits = np.zeros(1 << CHUNK_BITS, dtype=bool)
+    bits[low] = True
+    return np.packbits(bits, bitorder="little")
+
+
+def _is_bitset(container):
+    return container.dtype == np.uint8
+
+
+def _test(bits, low):
+    return (bits[low >> 3] >> (low & 7).astype(np.uint8)) & 1 == 1
+
+
+def _low_bits(container):
+    if _is_bitset(container):
+        return np.flatnonzero(np.unpackbits(container, bitorder="little")).astype(np.uint16)
+    return container
+
+
+def _and(a, b):
+    if _is_bitset(a) and _is_bitset(b):
+        return _container(_low_bits(a & b))
+    if _is_bitset(a):
+        a, b = b, a
+    if _is_bitset(b):
+        return a[_test(b, a)]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def _or(a, b):
+    if _is_bitset(a) and _is_bitset(b):
+        return a | b
+    if _is_bitset(a):
+        a, b = b, a
+    if _is_bitset(b):
+        bits = np.unpackbits(b, bitorder="little").astype(bool)
+        bits[a] = True
+        return np.packbits(bits, bitorder="little")
+    return _container(np.union1d(a, b).astype(np.uint16))
+
+
+def _size(container):
+    return int(_POPCOUNT[container].sum()) if _is_bitset(container) else len(container)
+
+
+class Bitmap:
+    """Compressed set of row positions, in the roaring layout (see CHUNK_BITS)."""
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks=None):
+        # High bits -> container of the low bits, in ascending order
+        self.chunks = chunks or {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Bitmap of ``rows``, sorted row positions without duplicates."""
+        rows = np.asarray(rows, dtype=np.int64)
+        keys, starts = np.unique(rows >> CHUNK_BITS, return_index=True)
+        stops = np.append(starts[1:], len(rows))
+        return cls({int(key): _container((rows[start:stop] & CHUNK_MASK).astype(np.uint16))
+                    for key, start, stop in zip(keys.tolist(), starts.tolist(), stops.tolist())})
+
+    def __len__(self):
+        return sum(_size(container) for container in self.chunks.values())
+
+    def __and__(self, other):
+        chunks = {}
+        for key, container in self.chunks.items():
+            if key in other.chunks:
+                both = _and(container, other.chunks[key])
+                if _size(both):
+                    chunks[key] = both
+        return Bitmap(chunks)
+
+    def __or__(self, other):
+        chunks = dict(self.chunks)
+        for key, container in other.chunks.items():
+            chunks[key] = _or(chunks[key], container) if key in chunks else container
+        return Bitmap(dict(sorted(chunks.items())))
+
+    @classmethod
+    def union(cls, bitmaps):
+        result = cls()
+        for bitmap in bitmaps:
+            result = result | bitmap
+        return result
+
+    def intersection_size(self, other):
+        return sum(_size(_and(container, other.chunks[key]))
+                   for key, container in self.chunks.items() if key in other.chunks)
+
+    def contains(self, rows):
+        """Boolean mask of the ``rows`` that are in the bitmap."""
+        mask = np.zeros(len(rows), dtype=bool)
+        high = rows >> CHUNK_BITS
+        for key, container in self.chunks.items():
+            chunk = np.flatnonzero(high == key)
+            low = (rows[chunk] & CHUNK_MASK).astype(np.uint16)
+            if _is_bitset(container):
+                mask[chunk] = _test(container, low)
+            else:
+                mask[chunk] = np.isin(low, container)
+        return mask
+
+    def rows(self):
+        parts = [(np.int64(key) << CHUNK_BITS) | _low_bits(container).astype(np.int64)
+                 for key, container in self.chunks.items()]
+        return np.concatenate(parts).astype(np.int32) if parts else np.empty(0, dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        return sum(container.nbytes for container in self.chunks.values())
+
+
+class FacetIndex:
+    """Bitmap of the rows holding each value of every facet, for one catalog generation.
+
+    Built per facet on first use from the state's encoded columns. The
+    bitmaps include deleted rows, which query results already leave out.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self._bitmaps = {}
+
+    def values(self, facet):
+        """Facet values in display order, each mapped to its bitmap."""
+        if facet not in self._bitmaps:
+            self._bitmaps[facet] = self._build(facet)
+        return self._bitmaps[facet]
+
+    def _build(self, facet):
+        column = self.state.columns.get(facet)
+        if column is None:
+            return {}
+        labels = list(column.values)
+        codes = column.codes
+        if facet == "published":
+            # One value per range of years; unknown years (None, 0) are left out
+            years = {year for year in labels if isinstance(year, int) and year > 0}
+            ranges = list(dict.fromkeys(published_label(year) for year in sorted(years)))
+            position = {label: code for code, label in enumerate(ranges)}
+            lookup = np.array([position[published_label(year)] if year in years else -1
+                               for year in labels] or [-1], dtype=np.int32)
+            labels, codes = ranges, lookup[codes]
+        if column.listed:
+            owners = np.repeat(np.arange(len(column), dtype=np.int32), np.diff(column.offsets))
+        else:
+            owners = np.arange(len(column), dtype=np.int32)
+
+        # Group rows by value; a row listing a value twice is kept once
+        keep = codes >= 0
+        codes, owners = codes[keep], owners[keep]
+        order = np.lexsort((owners, codes))
+        codes, owners = codes[order], owners[order]
+        distinct = np.ones(len(codes), dtype=bool)
+        distinct[1:] = (codes[1:] != codes[:-1]) | (owners[1:] != owners[:-1])
+        codes, owners = codes[distinct], owners[distinct]
+        bounds = np.searchsorted(codes, np.arange(len(labels) + 1))
+        bitmaps = {}
+        for code, label in enumerate(labels):
+            if label is not None and bounds[code] < bounds[code + 1]:
+                bitmaps[label] = Bitmap.from_rows(owners[bounds[code]:bounds[code + 1]])
+        if facet != "published":
+            bitmaps = dict(sorted(bitmaps.items(), key=lambda item: str(item[0])))
+        return bitmaps
+
+    def select(self, facet, values):
+        """Rows holding any of ``values`` of ``facet``."""
+        bitmaps = self.values(facet)
+        return Bitmap.union(bitmaps[value] for value in values if value in bitmaps)
+
+    def selection(self, facets, skip=None):
+        """Rows matching every facet in ``facets`` (AND), any of its values each (OR)."""
+        result = None
+        for facet, values in facets.items():
+            if facet != skip:
+                selected = self.select(facet, values)
+                result = selected if result is None else result & selected
+        return result
+
+    def counts(self, scope, facet):
+        """Rows of ``scope`` holding each value of ``facet``."""
+        return {value: scope.intersection_size(bitmap) for value, bitmap in self.values(facet).items()}
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for bitmaps in self._bitmaps.values() for bitmap in bitmaps.values())
+
+
+def facet_selection(facets, category=None):
+    """Normalize a facet selection to ``{facet: values}``, folding ``category`` in.
+
+    A single value selects itself; a list selects any of its values. Empty
+    selections are dropped; unknown facets raise ValueError.
+    """
+    facets = dict(facets or {})
+    if category and category != "All":
+        facets["category"] = category
+    selection = {}
+    for facet, values in facets.items():
+        if facet not in FACETS:
+            raise ValueError(f"unknown facet {facet!r}")
+        if values is None or values == []:
+            continue
+        selection[facet] = list(values) if isinstance(values, (list, tuple, set)) else [values]
+    return selection
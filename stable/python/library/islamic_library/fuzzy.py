@@ -0,0 +1,158 @@
+import os
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+from .analysis import search_key
+from .ranking import tokenize
+
+# Typo-tolerant fallback: a search finding nothing is retried with every word
+# matching close spellings of itself (FUZZY_SEARCH=0 turns it off)
+FUZZY_SEARCH = os.environ.get("FUZZY_SEARCH", "1") == "1"
+
+# Query words of at least this many characters may hold one typo, two typos
+# from the second length on
+FUZZY_LENGTHS = (4, 7)
+MAX_DISTANCE = len(FUZZY_LENGTHS)
+
+# Words are filed under deletes of their first few characters only; words
+# within a few edits have prefixes within as many edits, and the exact
+# distance check sorts out the rest
+PREFIX_LENGTH = 9
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def use_fuzzy():
+    return FUZZY_SEARCH
+
+
+def max_distance(length):
+    """Edits a query word of ``length`` characters may be away from a match."""
+    return sum(length >= bound for bound in FUZZY_LENGTHS)
+
+
+def _depth(word):
+    # Deletes an indexed word needs: the most edits allowed to any query word
+    # that can reach it, the longest ones being reached by deleting from them
+    return max(edits for edits in range(MAX_DISTANCE + 1) if max_distance(len(word) + edits) >= edits)
+
+
+def _deletes(word, depth):
+    """``word`` and every string left by deleting up to ``depth`` of its characters."""
+    found = frontier = {word}
+    for _ in range(depth):
+        frontier = {text[:i] + text[i + 1:] for text in frontier for i in range(len(text))}
+        found = found | frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Edits turning ``a`` into ``b``, counting a swap of neighbours as one.
+
+    Stops early with ``limit + 1`` once the distance is known to exceed ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, other in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if before is not None and j > 1 and char == b[j - 2] and a[i - 2] == other:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """Words of one catalog segment's search fields, for typo-tolerant lookups.
+
+    A SymSpell deletes dictionary: each word is filed under the strings left
+    by deleting up to two characters of its prefix, hashed into one sorted array. A
+    query word within a few edits of an indexed word shares one of those
+    strings with it, so binary searches for the query word's own deletes
+    find every candidate; an exact edit distance keeps the close ones. Words
+    sharing a search key (see analysis.py) match each other too.
+    """
+
+    def __init__(self, records, fields=("title", "author")):
+        self.size = len(records)
+        # Repeated values (an author's books) are tokenized once
+        tokens = {}
+        for record in records:
+            for field in fields:
+                value = record.get(field)
+                if value not in tokens:
+                    tokens[value] = tokenize(value)
+        rows = [{word for field in fields for word in tokens[record.get(field)]} for record in records]
+        self.vocab = sorted({word for words in rows for word in words})
+        ids = {word: position for position, word in enumerate(self.vocab)}
+
+        # CSR postings: the rows holding each word, in row order
+        counts = np.fromiter((len(words) for words in rows), dtype=np.int64, count=self.size)
+        terms = np.fromiter((ids[word] for words in rows for word in words),
+                            dtype=np.int64, count=int(counts.sum()))
+        order = np.argsort(terms, kind="stable")
+        self._postings = np.repeat(np.arange(self.size, dtype=np.int32), counts)[order]
+        self._offsets = np.searchsorted(terms[order], np.arange(len(self.vocab) + 1))
+
+        # Deletes dictionary, by 32-bit hash; collisions only add candidates to verify
+        hashes, counts = array("q"), array("q")
+        for word in self.vocab:
+            deletes = _deletes(word[:PREFIX_LENGTH], _depth(word))
+            hashes.extend(map(hash, deletes))
+            counts.append(len(deletes))
+        hashes = np.frombuffer(hashes, dtype=np.int64).astype(np.uint32)
+        order = np.argsort(hashes, kind="stable")
+        self._hashes = hashes[order]
+        self._owners = np.repeat(np.arange(len(self.vocab), dtype=np.int32), counts)[order]
+
+        # Words by search key
+        self._keys = {}
+        for position, word in enumerate(self.vocab):
+            self._keys.setdefault(search_key(word), []).append(position)
+
+    def lookup(self, word, prefix=False):
+        """Ids of the words close to ``word`` (or, if ``prefix``, starting with it)."""
+        found = set(self._keys.get(search_key(word), ()))
+        start = bisect_left(self.vocab, word)
+        if prefix:
+            found.update(range(start, bisect_left(self.vocab, word + "\U0010ffff")))
+        elif start < len(self.vocab) and self.vocab[start] == word:
+            found.add(start)
+        limit = max_distance(len(word))
+        if limit:
+            deletes = _deletes(word[:PREFIX_LENGTH], limit)
+            hashes = np.array([hash(text) for text in deletes], dtype=np.int64).astype(np.uint32)
+            starts = np.searchsorted(self._hashes, hashes)
+            stops = np.searchsorted(self._hashes, hashes, side="right")
+            candidates = {int(owner) for start, stop in zip(starts.tolist(), stops.tolist())
+                          for owner in self._owners[start:stop]}
+            found.update(candidate for candidate in candidates - found
+                         if edit_distance(word, self.vocab[candidate], limit) <= limit)
+        return found
+
+    def search(self, words):
+        """Sorted rows holding a close spelling of every one of ``words``.
+
+        The last word also matches the words it begins, as it may still be
+        being typed.
+        """
+        matched = None
+        for position, word in enumerate(words):
+            ids = np.array(sorted(self.lookup(word, prefix=position == len(words) - 1)), dtype=np.int64)
+            hits = np.zeros(self.size, dtype=bool)
+            for start, stop in zip(self._offsets[ids].tolist(), self._offsets[ids + 1].tolist()):
+                hits[self._postings[start:stop]] = True
+            matched = hits if matched is None else matched & hits
+            if not matched.any():
+                return _EMPTY
+        return _EMPTY if matched is None else np.flatnonzero(matched).astype(np.int32)
+
+    @property
+    def nbytes(self):
+        return self._postings.nbytes + self._offsets.nbytes + self._hashes.nbytes + self._owners.nbytes
@@ -0,0 +1,271 @@
+import os
+
+from dash import ClientsideFunction, Input, Output, State, ctx, dcc, html
+
+from .clientside import register_catalog_route, use_clientside_filtering
+from .metrics import publish
+from .results import normalize_category, normalize_query, open_result_cache
+from .scripts import add_script
+
+# Cards per page offered by the page-size control
+PAGE_SIZES = [12, 24, 48, 96]
+
+# Grid modes:
+#   "paged"   serves one page per request, picked with a dbc.Pagination
+#   "stepped" serves one page per request, stepped with previous/next buttons
+#   "virtual" streams fixed-size windows of cards into a scrolling viewport
+#             (infinite scroll)
+# GRID_MODE picks between "paged" and "virtual" in the templates offering both
+GRID_MODES = ("paged", "stepped", "virtual")
+GRID_MODE = os.environ.get("GRID_MODE", "paged")
+VIRTUAL_CHUNK = 12
+VIRTUAL_WINDOW = 36
+
+
+def use_clientside_grid(catalog, mode=GRID_MODE):
+    """Whether the browser filters and pages the catalog itself (paged grids only)."""
+    return mode != "virtual" and use_clientside_filtering(catalog)
+
+
+def describe_page(page, total):
+    """Result count shown next to the pagination controls."""
+    if not total:
+        return "No books found"
+    return f"Showing {page.offset + 1}–{page.offset + len(page)} of {total} books"
+
+
+def pagination_bar(page_sizes=PAGE_SIZES):
+    """Bootstrap pagination bar: result count, page links and page size."""
+    # dash-bootstrap-components comes with the Bootstrap templates, not with this package
+    import dash_bootstrap_components as dbc
+
+    return dbc.Row([
+        dbc.Col(
+            html.Div(id="books-count", className="text-muted"),
+            width="auto"
+        ),
+        dbc.Col(
+            dbc.Pagination(
+                id="books-pagination",
+                max_value=1,
+                active_page=1,
+                first_last=True,
+                previous_next=True,
+                fully_expanded=False,
+                className="mb-0"
+            ),
+            width="auto"
+        ),
+        dbc.Col(
+            dcc.Dropdown(
+                id="page-size-select",
+                options=[{"label": f"{size} per page", "value": size} for size in page_sizes],
+                value=page_sizes[0],
+                clearable=False,
+                style={"width": "10rem"}
+            ),
+            width="auto"
+        )
+    ], className="justify-content-center align-items-center g-3 my-4")
+
+
+def virtual_grid(chunk=VIRTUAL_CHUNK, window=VIRTUAL_WINDOW):
+    """Virtualized grid: only the window of cards around the viewport stays mounted."""
+    return html.Div([
+        html.Div(id="books-count", className="text-muted text-center my-2"),
+        html.Div(
+            [
+                html.Div(id="grid-spacer-top"),
+                html.Div(id="books-grid", className="row g-4"),
+                html.Div(id="grid-spacer-bottom")
+            ],
+            id="books-viewport",
+            style={"height": "80vh", "overflowY": "auto", "overflowX": "hidden"}
+        ),
+        dcc.Store(id="grid-cursor", data={"offset": 0}),
+        dcc.Store(id="grid-window"),
+        dcc.Store(id="grid-config", data={"chunk": chunk, "window": window})
+    ])
+
+
+def books_section(mode=GRID_MODE):
+    """Bootstrap books section: paged grid, or virtualized grid for infinite scrolling."""
+    if mode == "virtual":
+        return virtual_grid()
+    return html.Div([
+        html.Div(id="books-grid", className="row g-4"),
+
+        # Pagination and Result Count
+        pagination_bar()
+    ])
+
+
+class BookGrid:
+    """Server-side grid callbacks: pages and scrolled windows of rendered cards.
+
+    Popular queries are filtered and rendered once per catalog generation:
+    ``results`` (a results.ResultCache) keeps them per normalized query.
+    """
+
+    def __init__(self, catalog, renderer, results, page_sizes=PAGE_SIZES,
+                 chunk=VIRTUAL_CHUNK, window=VIRTUAL_WINDOW):
+        self.catalog = catalog
+        self.renderer = renderer
+        self.results = results
+        self.page_sizes = page_sizes
+        self.chunk = chunk
+        self.window = window
+
+    def page(self, search_term, category, active_page, page_size):
+        """Return ``(cards, count, active page, pages)`` of one page of the query."""
+        page_size = page_size or self.page_sizes[0]
+        search_term, category = normalize_query(search_term), normalize_category(category)
+        key = self.results.key(self.catalog.generation, "grid", search_term, category, active_page, page_size)
+        return self.results.get_or_compute(
+            key, lambda: self.render_page(search_term, category, active_page, page_size)
+        )
+
+    def render_page(self, search_term, category, active_page, page_size):
+        # Filter the shared catalog; the result is a view over its rows, not a copy
+        books = self.catalog.query(search_term, category)
+        page, active_page, pages = books.page(active_page, page_size)
+
+        # Render the matching cards in one pass, reusing cached cards
+        book_cards = self.renderer.render(page, keys=page.card_keys())
+
+        return book_cards, describe_page(page, len(books)), active_page, pages
+
+    def update_paged(self, search_term, category, active_page, page_size):
+        # Only the requested page is rendered; a new query starts from page one
+        if ctx.triggered_id != "books-pagination":
+            active_page = 1
+        book_cards, count, active_page, pages = self.page(search_term, category, active_page, page_size)
+        return book_cards, count, pages, active_page
+
+    def update_stepped(self, search_term, category, prev_clicks, next_clicks, page_size, active_page):
+        # Only the requested page is rendered; a new query starts from page one
+        if ctx.triggered_id == "page-prev":
+            active_page = (active_page or 1) - 1
+        elif ctx.triggered_id == "page-next":
+            active_page = (active_page or 1) + 1
+        else:
+            active_page = 1
+        book_cards, count, active_page, pages = self.page(search_term, category, active_page, page_size)
+        return (
+            book_cards,
+            count,
+            f"Page {active_page} of {pages}",
+            active_page,
+            active_page <= 1,
+            active_page >= pages
+        )
+
+    def update_window(self, search_term, category, cursor):
+        # A new query starts from the top; scrolling only moves the window
+        scrolled = ctx.triggered_id == "grid-cursor"
+        offset = (cursor or {}).get("offset", 0) if scrolled else 0
+
+        # Windows are cached per chunk, like grid pages
+        search_term, category = normalize_query(search_term), normalize_category(category)
+        chunk = int(offset) // self.chunk
+        key = self.results.key(self.catalog.generation, "window", search_term, category, chunk, scrolled)
+        return self.results.get_or_compute(
+            key, lambda: self.render_window(search_term, category, chunk * self.chunk, scrolled)
+        )
+
+    def render_window(self, search_term, category, offset, scrolled):
+        # Filter the shared catalog; the result is a view over its rows, not a copy
+        books = self.catalog.query(search_term, category)
+        offset = max(0, min(offset, len(books) - 1)) // self.chunk * self.chunk
+        window = books.window(offset, self.window)
+
+        # Render the window in one pass, reusing cached cards
+        book_cards = self.renderer.render(window, keys=window.card_keys())
+
+        placement = {
+            "offset": window.offset,
+            "size": len(window),
+            "total": len(books),
+            "reset": not scrolled
+        }
+        return book_cards, describe_page(window, len(books)), placement
+
+
+# Outputs and inputs of each grid mode's callback, clientside or not
+_PAGED_OUTPUTS = [Output("books-grid", "children"),
+                  Output("books-count", "children"),
+                  Output("books-pagination", "max_value"),
+                  Output("books-pagination", "active_page")]
+_PAGED_INPUTS = [Input("search-query", "data"),
+                 Input("category-select", "value"),
+                 Input("books-pagination", "active_page"),
+                 Input("page-size-select", "value")]
+_STEPPED_OUTPUTS = [Output("books-grid", "children"),
+                    Output("books-count", "children"),
+                    Output("page-label", "children"),
+                    Output("books-page", "data"),
+                    Output("page-prev", "disabled"),
+                    Output("page-next", "disabled")]
+_STEPPED_INPUTS = [Input("search-query", "data"),
+                   Input("category-select", "value"),
+                   Input("page-prev", "n_clicks"),
+                   Input("page-next", "n_clicks"),
+                   Input("page-size-select", "value")]
+
+
+def register_book_grid(app, catalog, renderer, mode=GRID_MODE, clientside=False, namespace=""):
+    """Register the callbacks filling ``books-grid`` in ``mode`` (see GRID_MODES).
+
+    With ``clientside`` filtering the browser filters and pages a shipped
+    copy of the catalog; otherwise the server does, caching rendered pages
+    in a result cache under ``namespace`` (see results.ResultCache).
+    Publishes the catalog's and the caches' statistics.
+    """
+    if mode not in GRID_MODES:
+        raise ValueError(f"Unknown grid mode {mode!r}, expected one of {GRID_MODES}")
+    grid = BookGrid(catalog, renderer, open_result_cache(namespace=namespace))
+
+    # Worker statistics served as JSON on /_stats
+    publish("catalog", catalog.stats)
+    if renderer.cache is not None:
+        publish("card_cache", renderer.cache.stats)
+    publish("result_cache", grid.results.stats)
+
+    if mode == "virtual":
+        app.callback(
+            [Output("books-grid", "children"),
+             Output("books-count", "children"),
+             Output("grid-window", "data")],
+            [Input("search-query", "data"),
+             Input("category-select", "value"),
+             Input("grid-cursor", "data")]
+        )(grid.update_window)
+        add_script(app, "virtual_grid.js")
+        app.clientside_callback(
+            ClientsideFunction(namespace="libraryGrid", function_name="placeWindow"),
+            [Output("grid-spacer-top", "style"),
+             Output("grid-spacer-bottom", "style")],
+            Input("grid-window", "data"),
+            State("grid-config", "data")
+        )
+    elif mode == "stepped":
+        if clientside:
+            register_catalog_route(app, catalog, renderer)
+            app.clientside_callback(
+                ClientsideFunction(namespace="libraryCatalog", function_name="steppedGrid"),
+                _STEPPED_OUTPUTS,
+                _STEPPED_INPUTS + [Input("catalog-store", "data")],
+                State("books-page", "data")
+            )
+        else:
+            app.callback(_STEPPED_OUTPUTS, _STEPPED_INPUTS, State("books-page", "data"))(grid.update_stepped)
+    elif clientside:
+        register_catalog_route(app, catalog, renderer)
+        app.clientside_callback(
+            ClientsideFunction(namespace="libraryCatalog", function_name="pagedGrid"),
+            _PAGED_OUTPUTS,
+            _PAGED_INPUTS + [Input("catalog-store", "data")]
+        )
+    else:
+        app.callback(_PAGED_OUTPUTS, _PAGED_INPUTS)(grid.update_paged)
+    return grid
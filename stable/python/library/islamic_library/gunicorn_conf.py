@@ -0,0 +1,58 @@
+import gc
+import os
+
+# Gunicorn settings and hooks for the templates: each template's
+# gunicorn.conf.py, which gunicorn reads from its working directory, imports
+# them from here
+__all__ = ["preload_app", "when_ready", "pre_fork", "post_fork", "post_worker_init"]
+
+# Preloading (PRELOAD_APP=0 turns it off) imports the app, builds the catalog,
+# its indexes and the layout once in the arbiter; workers fork from it and
+# share those pages copy-on-write instead of building their own. The cyclic
+# garbage collector stays off while the app loads, and everything loaded is
+# frozen out of its reach before each fork, so collections in the workers do
+# not write to (and so copy) the shared objects.
+preload_app = os.environ.get("PRELOAD_APP", "1") == "1"
+
+if preload_app:
+    gc.disable()
+
+
+def when_ready(server):
+    # Arbiter, app preloaded, before the first fork
+    if not server.cfg.preload_app:
+        return
+    from .warmup import warm_indexes
+    from .watcher import stop_watchers
+
+    warm_indexes()
+    # Workers watch the catalog themselves; a watcher left running here could
+    # hold the catalog's lock as a worker forks
+    stop_watchers()
+    gc.freeze()
+    gc.enable()
+
+
+def pre_fork(server, worker):
+    # Objects the arbiter made since the last fork join the frozen ones
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Threads do not survive the fork: restart the catalog watchers
+    from .watcher import start_watchers
+
+    start_watchers()
+
+
+def post_worker_init(worker):
+    # Runs in each worker once the app is loaded, before it accepts requests;
+    # notify keeps the arbiter from taking a long warm-up for a hung worker
+    from .warmup import run_warmups
+
+    for stats in run_warmups(notify=worker.notify):
+        worker.log.info(
+            "Warm-up took %.0f ms (indexes %.0f ms): %d requests, %d errors, %d skipped",
+            stats["duration_ms"], stats["index_ms"], stats["requests"], stats["errors"], stats["skipped"]
+        )
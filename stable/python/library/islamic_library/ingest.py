@@ -0,0 +1,308 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+from .repository import (CATALOG_DATABASE, INSERT_BOOK, SQLiteCatalog, book_row, bulk_load,
+                         mirror_source, mirror_state)
+from .snapshot import CATALOG_SNAPSHOT, write_snapshot
+
+# Data fields shared by the No.1-No.8 templates, with their types and the
+# value used when an export leaves them out
+SCHEMA = {
+    "id": (int, None),
+    "title": (str, None),
+    "author": (str, None),
+    "category": (str, None),
+    "description": (str, ""),
+    "language": (str, ""),
+    "languages": (list, []),
+    "tags": (list, []),
+    "spiritual_focus": (list, []),
+    "published": (int, 0),
+    "pages": (int, 0),
+    "rating": (float, 0.0),
+    "difficulty": (str, ""),
+    "complexity": (str, ""),
+}
+REQUIRED = ("title", "author", "category")
+
+# Separator for list fields in CSV cells ("Fiqh|Hadith")
+LIST_SEPARATOR = "|"
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+# Parsers: each yields plain dicts, one record at a time, or an InvalidRecord
+# for input it cannot parse
+
+def read_csv(stream):
+    rows = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    while True:
+        # The reader moves past a line it cannot parse, so reading goes on
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            row = InvalidRecord(f"malformed CSV: {error}")
+        yield row
+
+
+def read_jsonl(stream):
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        if line.strip():
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield InvalidRecord(f"malformed JSON: {error}")
+                continue
+            if isinstance(record, dict):
+                yield record
+            else:
+                yield InvalidRecord(f"expected a JSON object, got {type(record).__name__}")
+
+
+def _marc_records(stream, chunk_size=1 << 16):
+    # ISO 2709 records end with 0x1D; read in chunks and split on it
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        *records, pending = pending.split(b"\x1d")
+        yield from records
+    if pending.strip():
+        yield pending
+
+
+def _subfields(data):
+    # Data field: two indicators, then subfields introduced by 0x1F and a code
+    return [(part[:1], part[1:]) for part in data.split("\x1f")[1:] if part]
+
+
+def parse_marc(raw):
+    """Map one MARC21 record to the catalog schema (MARC-8 read as Latin-1)."""
+    leader = raw[:24].decode("ascii", "replace")
+    encoding = "utf-8" if leader[9:10] == "a" else "latin-1"
+    base = int(leader[12:17])
+    fields = {}
+    for start in range(24, base - 1, 12):
+        entry = raw[start:start + 12].decode("ascii")
+        tag, length, offset = entry[:3], int(entry[3:7]), int(entry[7:12])
+        data = raw[base + offset:base + offset + length].decode(encoding, "replace").rstrip("\x1e")
+        fields.setdefault(tag, []).append(data)
+
+    def first(tag, codes="a"):
+        for data in fields.get(tag, ()):
+            # ISBD punctuation ends each subfield; "Title :" + "subtitle /"
+            values = [value.strip().rstrip(" /:;,.") for code, value in _subfields(data) if code in codes]
+            if values:
+                return ": ".join(values)
+        return None
+
+    def every(tag, code="a"):
+        return [value.strip().rstrip(".") for data in fields.get(tag, ())
+                for sub, value in _subfields(data) if sub == code]
+
+    def year(value):
+        match = re.search(r"\d{4}", value or "")
+        return match and match.group()
+
+    def page_count(value):
+        # "xii, 345 p." -> 345
+        counts = [int(number) for number in re.findall(r"\d+", value or "")]
+        return max(counts) if counts else None
+
+    # Ids are integers whatever the format. A control number read as one
+    # after any letter prefix ("ocm00012345"); other ones are kept as they
+    # are, so validation rejects them like a CSV id that is not a number
+    control = (fields.get("001") or [""])[0].strip()
+    number = re.fullmatch(r"[A-Za-z]*(\d+)", control)
+    fixed = fields.get("008", [""])[0]
+    subjects = every("650")
+    record = {
+        "id": int(number.group(1)) if number else control or None,
+        "title": first("245", "ab"),
+        "author": first("100") or first("110") or first("111"),
+        "category": (every("655") or subjects or [None])[0],
+        "description": first("520"),
+        "language": fixed[35:38].strip() or None,
+        "languages": every("041"),
+        "tags": subjects,
+        "published": year(first("264", "c") or first("260", "c")),
+        "pages": page_count(first("300")),
+    }
+    return {key: value for key, value in record.items() if value not in (None, [])}
+
+
+def read_marc(stream):
+    for raw in _marc_records(stream):
+        try:
+            yield parse_marc(raw.lstrip(b"\r\n"))
+        except (ValueError, IndexError) as error:
+            yield InvalidRecord(f"malformed MARC record: {error}")
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "marc": read_marc}
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".mrc": "marc", ".marc": "marc"}
+
+
+# Validation
+
+def _convert(name, kind, value):
+    if kind is list:
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+        if isinstance(value, (list, tuple)):
+            return [str(item) for item in value]
+        raise InvalidRecord(f"{name}: expected a list, got {value!r}")
+    if kind is str:
+        return str(value).strip()
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise InvalidRecord(f"{name}: expected {kind.__name__}, got {value!r}") from None
+
+
+def style_defaults(samples):
+    """Presentation fields (icons, colours) borrowed from the template's sample books.
+
+    Keyed by category, with the first sample book covering other categories.
+    """
+    styles = {}
+    for book in samples:
+        style = {key: value for key, value in book.items() if key not in SCHEMA}
+        styles.setdefault(book.get("category"), style)
+        styles.setdefault(None, style)
+    return styles
+
+
+def validate(raw, styles, known=()):
+    """Return the record stored for ``raw``, or raise InvalidRecord.
+
+    ``known`` lists the fields the template's cards read, which get defaults.
+    """
+    if isinstance(raw, InvalidRecord):
+        raise raw
+    record = {}
+    for name, (kind, default) in SCHEMA.items():
+        value = raw.get(name)
+        if value is None or value == "":
+            if name in REQUIRED:
+                raise InvalidRecord(f"{name}: missing")
+            # Defaults only for the fields this template's cards read
+            if name in known:
+                record[name] = list(default) if kind is list else default
+        else:
+            record[name] = _convert(name, kind, value)
+    if "rating" in record and not 0 <= record["rating"] <= 5:
+        raise InvalidRecord(f"rating: {record['rating']} outside 0-5")
+
+    # Presentation fields of the export win over the template's defaults
+    style = styles.get(record["category"], styles.get(None, {}))
+    for name, value in style.items():
+        record[name] = raw.get(name) or value
+    return record
+
+
+# Loading
+
+def ingest(records, catalog, batch_size=5000, replace=False, strict=False, report=None, samples=()):
+    """Write ``records`` to ``catalog`` in one transaction of batched inserts.
+
+    Returns ``(loaded, skipped)``. Readers keep seeing the previous catalog
+    until the transaction commits; the catalog version is bumped with it.
+    ``samples`` are the template's sample books, which records borrow their
+    presentation fields from.
+    """
+    styles = style_defaults(samples)
+    known = tuple(samples[0]) if samples else ()
+    loaded = skipped = 0
+    with catalog.pool.connection() as connection, connection:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        with bulk_load(connection, replace=replace):
+            numbered = enumerate(records, 1)
+            while True:
+                chunk = list(itertools.islice(numbered, batch_size))
+                if not chunk:
+                    break
+                batch = []
+                for number, raw in chunk:
+                    try:
+                        batch.append(book_row(validate(raw, styles, known)))
+                    except InvalidRecord as error:
+                        if strict:
+                            raise InvalidRecord(f"record {number}: {error}") from None
+                        skipped += 1
+                        if skipped <= 10:
+                            print(f"skipped record {number}: {error}", file=sys.stderr)
+                connection.executemany(INSERT_BOOK, batch)
+                loaded += len(batch)
+                if report:
+                    report(loaded, skipped)
+        connection.execute(f"PRAGMA user_version = {version + 1}")
+    return loaded, skipped
+
+
+def template_books():
+    """Sample books of the template in the working directory (run from its folder), if any."""
+    try:
+        from books import books_data
+    except ImportError:
+        return []
+    return books_data
+
+
+def main():
+    # python -m islamic_library.ingest, from a template's folder
+    parser = argparse.ArgumentParser(description="Load a catalog export into the SQLite catalog")
+    parser.add_argument("path", help="CSV, JSONL or MARC21 (.mrc) export")
+    parser.add_argument("--format", choices=sorted(READERS),
+                        help="input format (default: from the file extension)")
+    parser.add_argument("--database", default=CATALOG_DATABASE or "library.db")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--replace", action="store_true", help="replace the catalog instead of appending")
+    parser.add_argument("--strict", action="store_true", help="stop at the first invalid record")
+    parser.add_argument("--snapshot", default=CATALOG_SNAPSHOT,
+                        help="rewrite this catalog snapshot once the load is done")
+    args = parser.parse_args()
+
+    fmt = args.format or EXTENSIONS.get(os.path.splitext(args.path)[1].lower())
+    if fmt is None:
+        parser.error(f"cannot tell the format of {args.path}, pass --format")
+
+    catalog = SQLiteCatalog(args.database)
+    started = time.perf_counter()
+
+    def report(loaded, skipped):
+        elapsed = time.perf_counter() - started
+        print(f"  {loaded:,} rows  {loaded / elapsed:,.0f} rows/s", file=sys.stderr)
+
+    with open(args.path, "rb") as stream:
+        try:
+            loaded, skipped = ingest(READERS[fmt](stream), catalog, args.batch_size,
+                                     args.replace, args.strict, report, template_books())
+        except InvalidRecord as error:
+            parser.exit(1, f"{error}; nothing was loaded\n")
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {loaded:,} rows ({skipped:,} skipped) into {args.database} "
+          f"in {elapsed:.1f} s, {loaded / elapsed if elapsed else 0:,.0f} rows/s")
+
+    if args.snapshot:
+        started = time.perf_counter()
+        write_snapshot(mirror_state(catalog, catalog.search_fields), args.snapshot,
+                       mirror_source(args.database, catalog.identity))
+        print(f"Wrote snapshot {args.snapshot} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+// Clientside filtering: fetches the catalog once (revalidated by ETag through
+// the browser's HTTP cache) and filters and pages it without server requests.
+(function () {
+    // Search keys and folding as analysis.py and search.py compute them; the
+    // table of known spellings comes with the catalog
+    var WORD = "[\\p{L}\\p{N}_]";
+    var APOSTROPHES = "'`‘’ʼʾʿ";
+    var MARKS = /[\p{Mn}ـ]/gu;
+    var ARABIC = {
+        "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+        "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه"
+    };
+    var ARABIC_FORMS = new RegExp("[" + Object.keys(ARABIC).join("") + "]", "g");
+    var ARTICLE = new RegExp(
+        "(?<!" + WORD + ")(?:ال(?!له(?!" + WORD + "))(?=" + WORD + WORD + ")" +
+        "|[aeu]l[-\\s](?=" + WORD + ")|[aeu]([dnrstz])-(?=\\1)" +
+        "|[eu]([dnrstz])\\s(?=\\2)|a([dnrz])\\s(?=\\3))", "gu");
+    var SEPARATORS = new RegExp("[^\\p{L}\\p{N}_" + APOSTROPHES + "]+", "gu");
+    var LATIN = [
+        [new RegExp("[" + APOSTROPHES + "]", "gu"), ""],
+        [/aa+/g, "a"],
+        [/(?:ee|ii)+/g, "i"],
+        [/(?:oo|uu)+/g, "u"],
+        [new RegExp("(?<=" + WORD + WORD + ")ah(?!" + WORD + ")", "gu"), "a"]
+    ];
+    var TOKENS = new RegExp(WORD + "+", "gu");
+
+    function fold(value) {
+        // str.casefold for the letters that lower-casing alone leaves apart
+        return String(value || "").toLowerCase().replace(/ß/g, "ss").replace(/ς/g, "σ");
+    }
+
+    function searchKey(value, known) {
+        var text = String(value).normalize("NFKD").replace(MARKS, "")
+            .replace(ARABIC_FORMS, function (letter) { return ARABIC[letter]; });
+        text = fold(text).replace(ARTICLE, "");
+        return text.replace(SEPARATORS, " ").split(" ").filter(Boolean).map(function (word) {
+            LATIN.forEach(function (rule) { word = word.replace(rule[0], rule[1]); });
+            return Object.prototype.hasOwnProperty.call(known, word) ? known[word] : word;
+        }).join(" ");
+    }
+
+    // Typo-tolerant fallback, as fuzzy.py matches words: the same key, the
+    // word itself (or the words it begins, for the last one), or a close
+    // spelling, with a swap of neighbours counted as one edit
+    function editDistance(a, b, limit) {
+        if (Math.abs(a.length - b.length) > limit) {
+            return limit + 1;
+        }
+        var before = null, previous = [];
+        for (var j = 0; j <= b.length; j++) {
+            previous.push(j);
+        }
+        for (var i = 1; i <= a.length; i++) {
+            var current = [i];
+            for (j = 1; j <= b.length; j++) {
+                current[j] = Math.min(previous[j] + 1, current[j - 1] + 1,
+                                      previous[j - 1] + (a[i - 1] !== b[j - 1] ? 1 : 0));
+                if (before && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) {
+                    current[j] = Math.min(current[j], before[j - 2] + 1);
+                }
+            }
+            if (Math.min.apply(null, current) > limit) {
+                return limit + 1;
+            }
+            before = previous;
+            previous = current;
+        }
+        return Math.min(previous[b.length], limit + 1);
+    }
+
+    function fuzzyMatches(catalog, query) {
+        var fuzzy = catalog.fuzzy;
+        var words = fold(query).match(TOKENS) || [];
+        return words.map(function (word, position) {
+            var key = searchKey(word, catalog.known);
+            var last = position === words.length - 1;
+            var limit = fuzzy.lengths.filter(function (bound) { return word.length >= bound; }).length;
+            var found = {};
+            fuzzy.vocab.forEach(function (entry, id) {
+                var other = entry[0];
+                if (entry[1] === key || (last ? other.indexOf(word) === 0 : other === word) ||
+                        (limit && editDistance(word, other, limit) <= limit)) {
+                    found[id] = true;
+                }
+            });
+            return found;
+        });
+    }
+
+    // Books matching the search as the server's in-memory index matches it:
+    // the folded query anywhere in a field, or its search key from the start
+    // of a key word; a query matching nothing falls back to close spellings
+    function search(catalog, query) {
+        var term = fold(query);
+        if (!term) {
+            return catalog.books;
+        }
+        var key = searchKey(query, catalog.known);
+        var pattern = key ? " " + key.toUpperCase() : null;
+        var found = catalog.books.filter(function (book) {
+            return book.text.some(function (text) {
+                return text.indexOf(term) !== -1 || (pattern !== null && text.indexOf(pattern) !== -1);
+            });
+        });
+        if (found.length || !catalog.fuzzy) {
+            return found;
+        }
+        var matches = fuzzyMatches(catalog, query);
+        if (!matches.length) {
+            return found;
+        }
+        return catalog.books.filter(function (book) {
+            return matches.every(function (ids) {
+                return book.words.some(function (id) { return ids[id]; });
+            });
+        });
+    }
+
+    function select(catalog, query, category) {
+        var books = search(catalog, query);
+        if (!category || category === "All") {
+            return books;
+        }
+        return books.filter(function (book) { return book.category === category; });
+    }
+
+    // Options for category-select, as controls.category_options lists them:
+    // every category of the catalog, counted over the books the search finds
+    function categoryOptions(catalog, query, allLabel) {
+        var counts = Object.create(null), categories = [], total = 0;
+        catalog.books.forEach(function (book) {
+            var category = book.category;
+            if (category !== null && category !== undefined && !(category in counts)) {
+                counts[category] = 0;
+                categories.push(category);
+            }
+        });
+        search(catalog, query).forEach(function (book) {
+            if (book.category in counts) {
+                counts[book.category] += 1;
+                total += 1;
+            }
+        });
+        return [{label: allLabel + " (" + total.toLocaleString("en-US") + ")", value: "All"}].concat(
+            categories.map(function (category) {
+                return {label: category + " (" + counts[category].toLocaleString("en-US") + ")", value: category};
+            })
+        );
+    }
+
+    function paginate(books, number, size) {
+        var pages = Math.max(1, Math.ceil(books.length / size));
+        number = Math.min(Math.max(1, number || 1), pages);
+        var start = (number - 1) * size;
+        var window = books.slice(start, start + size);
+        var count = books.length
+            ? "Showing " + (start + 1) + "–" + (start + window.length) + " of " + books.length + " books"
+            : "No books found";
+        return {
+            cards: window.map(function (book) { return book.card; }),
+            count: count,
+            number: number,
+            pages: pages
+        };
+    }
+
+    function triggered(id) {
+        var context = window.dash_clientside.callback_context;
+        return (context.triggered || []).some(function (trigger) {
+            return trigger.prop_id.split(".")[0] === id;
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        libraryCatalog: {
+            load: function (source) {
+                if (source) {
+                    fetch(source.url, {credentials: "same-origin"})
+                        .then(function (response) { return response.json(); })
+                        .then(function (catalog) {
+                            window.dash_clientside.set_props("catalog-store", {data: catalog});
+                        });
+                }
+                return window.dash_clientside.no_update;
+            },
+
+            categoryOptions: function (query, catalog, allLabel) {
+                if (!catalog) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                return categoryOptions(catalog, query, allLabel);
+            },
+
+            // Grids with a dbc.Pagination control (No.2-No.8)
+            pagedGrid: function (query, category, activePage, pageSize, catalog) {
+                if (!catalog) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                var number = triggered("books-pagination") ? activePage : 1;
+                var page = paginate(select(catalog, query, category), number, pageSize || 12);
+                return [page.cards, page.count, page.pages, page.number];
+            },
+
+            // Grids stepped with previous/next buttons (No.1)
+            steppedGrid: function (query, category, prevClicks, nextClicks, pageSize, catalog, activePage) {
+                if (!catalog) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                var number = 1;
+                if (triggered("page-prev")) {
+                    number = (activePage || 1) - 1;
+                } else if (triggered("page-next")) {
+                    number = (activePage || 1) + 1;
+                }
+                var page = paginate(select(catalog, query, category), number, pageSize || 12);
+                return [
+                    page.cards,
+                    page.count,
+                    "Page " + page.number + " of " + page.pages,
+                    page.number,
+                    page.number <= 1,
+                    page.number >= page.pages
+                ];
+            }
+        }
+    });
+})();
@@ -0,0 +1,126 @@
+// Search input gate: copies the text typed into #search-input into the
+// search-query store according to the mode configured in search-config.
+// Callback requests reading search-query are numbered per output: a newer
+// one aborts the one still in flight, and a response arriving after a newer
+// request was sent is turned into 204 (no update), so results for an older
+// query never replace those of a newer one.
+(function () {
+    function readsSearch(body) {
+        var deps = [].concat(body.inputs || [], body.state || []);
+        return deps.some(function (dep) {
+            return [].concat(dep).some(function (item) {
+                return item && item.id === "search-query";
+            });
+        });
+    }
+
+    function guardFetch() {
+        var fetch = window.fetch;
+        if (!fetch || fetch._librarySearch) {
+            return;
+        }
+        var latest = {};
+
+        function superseded() {
+            return new window.Response(null, {status: 204});
+        }
+
+        var guarded = function (resource, init) {
+            var body = null;
+            if (init && typeof init.body === "string" && String(resource).indexOf("_dash-update-component") !== -1) {
+                try {
+                    body = JSON.parse(init.body);
+                } catch (error) {
+                    body = null;
+                }
+            }
+            if (!body || !readsSearch(body)) {
+                return fetch.apply(window, arguments);
+            }
+            var output = body.output;
+            var previous = latest[output];
+            if (previous && previous.controller) {
+                previous.controller.abort();
+            }
+            var request = {controller: window.AbortController ? new window.AbortController() : null};
+            latest[output] = request;
+            var options = Object.assign({}, init);
+            if (request.controller) {
+                options.signal = request.controller.signal;
+            }
+            return fetch.call(window, resource, options).then(function (response) {
+                if (latest[output] !== request) {
+                    return superseded();
+                }
+                delete latest[output];
+                return response;
+            }, function (error) {
+                if (latest[output] !== request) {
+                    return superseded();
+                }
+                delete latest[output];
+                throw error;
+            });
+        };
+        guarded._librarySearch = true;
+        window.fetch = guarded;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        librarySearch: {
+            attach: function (config) {
+                var input = document.getElementById("search-input");
+                if (!input) {
+                    // Layout not mounted yet; try again on the next tick
+                    window.setTimeout(function () {
+                        window.dash_clientside.librarySearch.attach(config);
+                    }, 50);
+                    return window.dash_clientside.no_update;
+                }
+                if (input._librarySearch) {
+                    return window.dash_clientside.no_update;
+                }
+                var gate = input._librarySearch = {timer: null, last: 0, sent: ""};
+                guardFetch();
+
+                function send() {
+                    window.clearTimeout(gate.timer);
+                    gate.timer = null;
+                    // Only the latest text is sent; superseded keystrokes never leave the page
+                    if (input.value === gate.sent) {
+                        return;
+                    }
+                    gate.sent = input.value;
+                    gate.last = Date.now();
+                    window.dash_clientside.set_props("search-query", {data: input.value});
+                }
+
+                input.addEventListener("input", function () {
+                    if (config.mode === "live") {
+                        send();
+                    } else if (config.mode === "debounce") {
+                        window.clearTimeout(gate.timer);
+                        gate.timer = window.setTimeout(send, config.delay);
+                    } else if (config.mode === "throttle") {
+                        var wait = config.delay - (Date.now() - gate.last);
+                        if (wait <= 0) {
+                            send();
+                        } else if (!gate.timer) {
+                            gate.timer = window.setTimeout(send, wait);
+                        }
+                    }
+                });
+                input.addEventListener("keydown", function (event) {
+                    if (event.key === "Enter") {
+                        send();
+                    }
+                });
+                var button = document.getElementById("search-button");
+                if (button) {
+                    button.addEventListener("click", send);
+                }
+                return window.dash_clientside.no_update;
+            }
+        }
+    });
+})();
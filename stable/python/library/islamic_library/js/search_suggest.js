@@ -0,0 +1,58 @@
+// Search suggestions: as the user types into #search-input, fetches the best
+// matching titles and authors from the suggest route into the
+// #search-suggestions datalist. Only the latest request's answer is shown.
+(function () {
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        librarySuggest: {
+            attach: function (config) {
+                var input = document.getElementById("search-input");
+                if (!input) {
+                    // Layout not mounted yet; try again on the next tick
+                    window.setTimeout(function () {
+                        window.dash_clientside.librarySuggest.attach(config);
+                    }, 50);
+                    return window.dash_clientside.no_update;
+                }
+                if (input._librarySuggest) {
+                    return window.dash_clientside.no_update;
+                }
+                var state = input._librarySuggest = {timer: null, controller: null, shown: null};
+
+                function show(phrases) {
+                    window.dash_clientside.set_props("search-suggestions", {
+                        children: phrases.map(function (phrase) {
+                            return {type: "Option", namespace: "dash_html_components", props: {value: phrase}};
+                        })
+                    });
+                }
+
+                function fetchSuggestions() {
+                    var text = input.value.trim();
+                    if (text === state.shown) {
+                        return;
+                    }
+                    state.shown = text;
+                    if (state.controller) {
+                        state.controller.abort();
+                    }
+                    if (!text) {
+                        show([]);
+                        return;
+                    }
+                    var controller = state.controller = new AbortController();
+                    var url = config.url + "?q=" + encodeURIComponent(text) + "&limit=" + config.limit;
+                    fetch(url, {signal: controller.signal})
+                        .then(function (response) { return response.json(); })
+                        .then(show)
+                        .catch(function () {});
+                }
+
+                input.addEventListener("input", function () {
+                    window.clearTimeout(state.timer);
+                    state.timer = window.setTimeout(fetchSuggestions, 50);
+                });
+                return window.dash_clientside.no_update;
+            }
+        }
+    });
+})();
@@ -0,0 +1,94 @@
+// Virtualized books grid: keeps only a window of cards mounted and asks the
+// server for the next window (through the grid-cursor store) while scrolling.
+(function () {
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        libraryGrid: {
+            placeWindow: function (placement, config) {
+                var viewport = document.getElementById("books-viewport");
+                var grid = document.getElementById("books-grid");
+                if (!placement || !viewport || !grid) {
+                    return [{}, {}];
+                }
+
+                var state = viewport._libraryGrid;
+                if (!state) {
+                    state = viewport._libraryGrid = {pending: false, requested: null};
+                    viewport.addEventListener("scroll", function () {
+                        if (state.pending) {
+                            return;
+                        }
+                        state.pending = true;
+                        window.requestAnimationFrame(function () {
+                            state.pending = false;
+                            requestWindow(viewport, state, config);
+                        });
+                    }, {passive: true});
+                }
+
+                state.placement = placement;
+                state.requested = null;
+                if (placement.reset) {
+                    viewport.scrollTop = 0;
+                }
+                state.geometry = measure(grid) || state.geometry || {columns: 1, rowHeight: 400};
+
+                // The new cards may not be mounted yet: re-measure after they paint
+                window.requestAnimationFrame(function () {
+                    var geometry = measure(grid);
+                    if (geometry && (geometry.columns !== state.geometry.columns ||
+                                     geometry.rowHeight !== state.geometry.rowHeight)) {
+                        state.geometry = geometry;
+                        var styles = spacers(state);
+                        window.dash_clientside.set_props("grid-spacer-top", {style: styles[0]});
+                        window.dash_clientside.set_props("grid-spacer-bottom", {style: styles[1]});
+                    }
+                });
+                return spacers(state);
+            }
+        }
+    });
+
+    // Spacers stand in for the rows above and below the mounted window
+    function spacers(state) {
+        var placement = state.placement;
+        var columns = state.geometry.columns;
+        var rowsAbove = Math.floor(placement.offset / columns);
+        var rowsBelow = Math.ceil(
+            Math.max(0, placement.total - placement.offset - placement.size) / columns
+        );
+        return [
+            {height: rowsAbove * state.geometry.rowHeight + "px"},
+            {height: rowsBelow * state.geometry.rowHeight + "px"}
+        ];
+    }
+
+    function measure(grid) {
+        var cards = grid.children;
+        if (!cards.length) {
+            return null;
+        }
+        var top = cards[0].offsetTop;
+        var columns = 1;
+        while (columns < cards.length && cards[columns].offsetTop === top) {
+            columns += 1;
+        }
+        var rowHeight = columns < cards.length
+            ? cards[columns].offsetTop - top
+            : cards[0].offsetHeight;
+        return {columns: columns, rowHeight: Math.max(rowHeight, 1)};
+    }
+
+    function requestWindow(viewport, state, config) {
+        var geometry = state.geometry;
+        if (!geometry || !state.placement) {
+            return;
+        }
+        // Keep one chunk above the first visible card, snapped to chunk boundaries
+        var first = Math.floor(viewport.scrollTop / geometry.rowHeight) * geometry.columns;
+        var offset = Math.max(0, (Math.floor(first / config.chunk) - 1) * config.chunk);
+        if (offset !== state.placement.offset && offset !== state.requested) {
+            state.requested = offset;
+            window.dash_clientside.set_props("grid-cursor", {data: {offset: offset}});
+        }
+    }
+})();
@@ -0,0 +1,52 @@
+import os
+
+import flask
+
+# Runtime statistics of this worker process, served as JSON on STATS_PATH;
+# set STATS_PATH to an empty string to turn the route off
+STATS_PATH = os.environ.get("STATS_PATH", "/_stats")
+
+_sources = {}
+
+
+def publish(name, source):
+    """Publish ``source()`` (a callable returning a dict) under ``name``."""
+    _sources[name] = source
+
+
+def process_memory(path="/proc/self/smaps_rollup"):
+    """Memory of this process in kB: resident, proportional share, and private vs shared pages.
+
+    Pages a forked worker still shares with the arbiter count as shared;
+    ``private`` is what the worker adds on its own. Empty off Linux.
+    """
+    try:
+        with open(path) as stream:
+            fields = dict(line.split(":", 1) for line in stream if line.endswith("kB\n"))
+    except OSError:
+        return {}
+    kb = {name: int(value.split()[0]) for name, value in fields.items()}
+    return {
+        "rss_kb": kb.get("Rss", 0),
+        "pss_kb": kb.get("Pss", 0),
+        "private_kb": kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0),
+        "shared_kb": kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0),
+    }
+
+
+def snapshot():
+    stats = {"pid": os.getpid(), "memory": process_memory()}
+    for name, source in _sources.items():
+        stats[name] = source()
+    return stats
+
+
+def register_stats_route(app, path=STATS_PATH):
+    if not path:
+        return
+
+    @app.server.route(path)
+    def stats():
+        response = flask.jsonify(snapshot())
+        response.cache_control.no_store = True
+        return response
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Connections inherited across a fork are parked here and never used or closed
+# in the child: closing them would release the parent's SQLite file locks
+_inherited = []
+
+
+class ConnectionPool:
+    """Bounded, fork-safe pool of database connections for one worker process.
+
+    Connections are opened lazily up to ``size`` and handed out one thread
+    at a time; a thread finding all of them checked out waits up to
+    ``timeout`` seconds. After a fork (gunicorn pre-fork workers) the child
+    notices the new process id and starts over with fresh connections.
+    """
+
+    def __init__(self, connect, size=4, timeout=30.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self):
+        if getattr(self, "_idle", None):
+            _inherited.extend(self._idle)
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._idle = []
+        self._created = 0
+        self.in_use = 0
+        self.checkouts = self.waits = 0
+        self.wait_time = self.checkout_time = self.max_checkout_time = 0.0
+
+    @contextmanager
+    def connection(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+        started = time.perf_counter()
+        connection = None
+        with self._condition:
+            if not self._idle and self._created >= self.size:
+                # Every connection is checked out: wait for one to come back
+                self.waits += 1
+                deadline = started + self.timeout
+                while not self._idle and self._created >= self.size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        self.wait_time += time.perf_counter() - started
+                        raise TimeoutError(f"no database connection free after {self.timeout}s")
+                self.wait_time += time.perf_counter() - started
+            if self._idle:
+                connection = self._idle.pop()
+            else:
+                self._created += 1
+            self.in_use += 1
+
+        if connection is None:
+            try:
+                connection = self._connect()
+            except BaseException:
+                with self._condition:
+                    self._created -= 1
+                    self.in_use -= 1
+                    self._condition.notify()
+                raise
+
+        elapsed = time.perf_counter() - started
+        with self._condition:
+            self.checkouts += 1
+            self.checkout_time += elapsed
+            self.max_checkout_time = max(self.max_checkout_time, elapsed)
+
+        try:
+            yield connection
+        finally:
+            with self._condition:
+                self._idle.append(connection)
+                self.in_use -= 1
+                self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time_ms": self.wait_time * 1000,
+                "checkout_ms_avg": self.checkout_time * 1000 / self.checkouts if self.checkouts else 0.0,
+                "checkout_ms_max": self.max_checkout_time * 1000,
+            }
@@ -0,0 +1,191 @@
+import heapq
+import math
+import os
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from .analysis import search_key
+from .search import fold
+
+# Relevance ranking: with SEARCH_RANKING=bm25, search results are ordered by
+# their BM25F score over RANK_FIELDS instead of by their place in the catalog.
+# The in-memory catalog matches every query word as a word, the last one as a
+# word prefix. The SQLite catalog ranks with FTS5's bm25() over its trigram
+# index, which matches every word as a substring ("hadith" inside
+# "ahadith"): the two backends can find and order the same query differently.
+SEARCH_RANKING = os.environ.get("SEARCH_RANKING", "source")
+
+# Ranked fields and their boosts
+RANK_FIELDS = {"title": 3.0, "author": 2.0, "description": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Scores are compared in steps of this size, so rows whose scores differ only
+# by float rounding tie and keep their catalog order
+SCORE_TOLERANCE = 1e-9
+
+# Fields whose key words (see analysis.py) are indexed too: the names people
+# spell many ways
+KEY_FIELDS = ("title", "author")
+
+_WORD = re.compile(r"\w+")
+
+# Key words (see analysis.py) share the vocabulary with the folded words,
+# marked so neither ever matches the other
+_KEY = "\0"
+
+
+def use_ranking():
+    return SEARCH_RANKING == "bm25"
+
+
+def tokenize(text):
+    return _WORD.findall(fold(text))
+
+
+def key_terms(text):
+    return [_KEY + word for word in search_key(text).split()]
+
+
+def _terms(values, keyed):
+    # Folded words, then key words if ``keyed``; repeated values share one list
+    terms = {}
+    return [terms[value] if value in terms
+            else terms.setdefault(value, (tokenize(value), key_terms(value) if keyed else []))
+            for value in values]
+
+
+class RankIndex:
+    """Word postings of one catalog segment, with per-field term frequencies.
+
+    ``vocab`` is sorted, so the words starting with a prefix are one range of
+    it and of each field's postings. Key words of KEY_FIELDS are indexed
+    next to the folded ones; a row's length counts its folded words only.
+    """
+
+    def __init__(self, records, fields=RANK_FIELDS):
+        self.fields = tuple(fields)
+        tokens = {field: _terms((record.get(field) for record in records), field in KEY_FIELDS)
+                  for field in self.fields}
+        self.size = len(records)
+        self.vocab = sorted({word for rows in tokens.values()
+                             for pair in rows for words in pair for word in words})
+        ids = {word: position for position, word in enumerate(self.vocab)}
+
+        # Per field: CSR postings (rows and term frequencies) and row lengths
+        self.lengths, self.offsets, self.rows, self.tf = {}, {}, {}, {}
+        keys = []
+        for field in self.fields:
+            counts = np.fromiter((len(words) + len(key) for words, key in tokens[field]),
+                                 dtype=np.int64, count=self.size)
+            terms = np.fromiter((ids[word] for pair in tokens[field] for words in pair for word in words),
+                                dtype=np.int64, count=int(counts.sum()))
+            pairs, tf = np.unique(terms * max(1, self.size) + np.repeat(np.arange(self.size), counts),
+                                  return_counts=True)
+            terms, rows = np.divmod(pairs, max(1, self.size))
+            self.lengths[field] = np.fromiter((len(words) for words, _ in tokens[field]),
+                                              dtype=np.int32, count=self.size)
+            self.offsets[field] = np.searchsorted(terms, np.arange(len(self.vocab) + 1))
+            self.rows[field] = rows.astype(np.int32)
+            self.tf[field] = tf.astype(np.int32)
+            keys.append(pairs)
+
+        # Rows holding each word in any field
+        pairs = np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.int64)
+        self.df = np.bincount(pairs // max(1, self.size), minlength=len(self.vocab))
+
+    def span(self, word, prefix=False):
+        """Vocabulary range of ``word``, or of every word starting with it."""
+        start = bisect_left(self.vocab, word)
+        if prefix:
+            return start, bisect_left(self.vocab, word + "\U0010ffff")
+        found = start < len(self.vocab) and self.vocab[start] == word
+        return start, start + found
+
+    def document_frequency(self, span):
+        start, stop = span
+        if stop - start == 1:
+            return int(self.df[start])
+        return len(np.unique(np.concatenate([self._slice(field, span)[0] for field in self.fields])))
+
+    def _slice(self, field, span):
+        offsets = self.offsets[field]
+        start, stop = offsets[span[0]], offsets[span[1]]
+        return self.rows[field][start:stop], self.tf[field][start:stop]
+
+    def weights(self, span, average_lengths, boosts):
+        """BM25F pseudo-frequency of the word range ``span`` for every row."""
+        weight = np.zeros(self.size)
+        for field in self.fields:
+            rows, tf = self._slice(field, span)
+            if not len(rows):
+                continue
+            norm = 1 - BM25_B + BM25_B * self.lengths[field][rows] / max(average_lengths[field], 1e-9)
+            weight += boosts[field] * np.bincount(rows, weights=tf / norm, minlength=self.size)
+        return weight
+
+
+def _scores(indexes, words, prefix, total, average_lengths, boosts):
+    # Per index: BM25F scores of the rows holding every word (the last one
+    # as a ``prefix`` if asked), zero elsewhere
+    scores = [np.zeros(index.size) for index in indexes]
+    matched = [np.ones(index.size, dtype=bool) for index in indexes]
+    for position, word in enumerate(words):
+        last = prefix and position == len(words) - 1
+        spans = [index.span(word, last) for index in indexes]
+        df = sum(index.document_frequency(span) for index, span in zip(indexes, spans))
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        for index, span, score, found in zip(indexes, spans, scores, matched):
+            weight = index.weights(span, average_lengths, boosts)
+            found &= weight > 0
+            score += idf * weight / (BM25_K1 + weight)
+    for score, found in zip(scores, matched):
+        score[~found] = 0
+    return scores
+
+
+def bm25_scores(indexes, query, boosts=RANK_FIELDS):
+    """Score the rows of every segment in ``indexes`` against ``query``.
+
+    Returns one score array per index; rows missing any query word score
+    zero. The last word also matches the words it begins, so results keep
+    up with a query that is still being typed. Statistics (document count,
+    frequencies, field lengths) are summed over the segments. The query's
+    key words (see analysis.py) are scored the same way for the rows its
+    folded words miss.
+    """
+    words = tokenize(query)
+    if not words:
+        return None
+    total = sum(index.size for index in indexes) or 1
+    average_lengths = {field: sum(int(index.lengths[field].sum()) for index in indexes) / total
+                       for field in boosts}
+    scores = _scores(indexes, words, True, total, average_lengths, boosts)
+    # Even a query spelled as its key needs this pass: "bukhari" finds
+    # "Bukhārī" and "البخاري" through their keys only
+    keys = key_terms(query)
+    if keys:
+        others = _scores(indexes, keys, True, total, average_lengths, boosts)
+        for score, other in zip(scores, others):
+            np.copyto(score, other, where=score == 0)
+    return scores
+
+
+def top_rows(rows, scores, order, count):
+    """The ``count`` best of ``rows``: highest score first, then by ``order``.
+
+    Scores are rounded to SCORE_TOLERANCE first. No full sort: a
+    linear-time partition finds the score the ``count``-th row reaches, and
+    a heap orders the few rows at or above it. Any ``count`` gives a prefix
+    of the same order, so pages cut from different counts line up.
+    """
+    scores = np.round(np.asarray(scores) / SCORE_TOLERANCE)
+    candidates = np.arange(len(rows))
+    if 0 < count < len(rows):
+        threshold = np.partition(scores, len(scores) - count)[len(scores) - count]
+        candidates = np.flatnonzero(scores >= threshold)
+    keys = list(zip((-scores[candidates]).tolist(), order[candidates].tolist()))
+    best = heapq.nsmallest(count, range(len(keys)), key=keys.__getitem__)
+    return rows[candidates[np.asarray(best, dtype=np.int64)]]
@@ -0,0 +1,812 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+from .analysis import ANALYSIS_VERSION, search_key
+from .bloom import TermFilter, use_search_filter
+from .catalog import ENCODED_FIELDS, LIST_FIELDS, Catalog, CatalogState, record_fingerprint
+from .facets import FACETS, facet_selection, published_bounds, published_label
+from .fuzzy import FuzzyIndex, use_fuzzy
+from .ranking import RANK_FIELDS, tokenize, use_ranking
+from .search import fold
+from .pool import ConnectionPool
+from .snapshot import CATALOG_SNAPSHOT, load_or_build
+from .watcher import CatalogWatcher
+
+# Catalog backend: set CATALOG_DATABASE to a SQLite file to serve the catalog
+# from the database instead of the books_data list in app.py. An empty
+# database is seeded from books_data on first start.
+CATALOG_DATABASE = os.environ.get("CATALOG_DATABASE", "")
+
+# Connections per worker process, and prepared statements kept per connection
+CATALOG_POOL_SIZE = int(os.environ.get("CATALOG_POOL_SIZE", "4"))
+CATALOG_STATEMENT_CACHE = int(os.environ.get("CATALOG_STATEMENT_CACHE", "128"))
+
+# Serve the database from an in-memory copy, updated from its change log
+CATALOG_IN_MEMORY = os.environ.get("CATALOG_IN_MEMORY", "0") == "1"
+
+# Fields indexed by FTS5; search_fields picks the ones a query matches
+FTS_COLUMNS = ("title", "author", "description")
+
+# Bumped with every change to the tables below; databases created by an older
+# version are upgraded when opened
+SCHEMA_VERSION = 4
+
+# Each search field is also stored case-folded (see search.fold) and as its
+# search key (see analysis.py), set off by spaces so a key pattern matches from
+# the start of a key word. FTS5 indexes those columns, so the database
+# matches terms exactly as the in-memory index does, for every script.
+DERIVED_COLUMNS = (tuple(f"folded_{field}" for field in FTS_COLUMNS)
+                   + tuple(f"key_{field}" for field in FTS_COLUMNS))
+_FTS_VALUES = ", ".join(f"new.{column}" for column in DERIVED_COLUMNS)
+_FTS_OLD_VALUES = ", ".join(f"old.{column}" for column in DERIVED_COLUMNS)
+_FTS_COLUMNS = ", ".join(DERIVED_COLUMNS)
+
+FTS_TABLE = f"""CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    {_FTS_COLUMNS},
+    content='books', content_rowid='row', tokenize='trigram case_sensitive 1'
+)"""
+
+_DERIVED_DEFINITIONS = "".join(f",\n    {column} TEXT NOT NULL DEFAULT ''" for column in DERIVED_COLUMNS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS books (
+    row INTEGER PRIMARY KEY,
+    id INTEGER,
+    title TEXT,
+    author TEXT,
+    category TEXT,
+    description TEXT,
+    fingerprint TEXT NOT NULL,
+    record TEXT NOT NULL{_DERIVED_DEFINITIONS}
+);
+CREATE INDEX IF NOT EXISTS books_category ON books (category, row);
+{FTS_TABLE};
+CREATE TABLE IF NOT EXISTS book_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    row INTEGER NOT NULL,
+    op TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _update_trigger(when=""):
+    # SQL of books_au, run for the rows matching ``when`` only if given
+    return f"""CREATE TRIGGER books_au AFTER UPDATE ON books{when} BEGIN
+    INSERT INTO books_fts (books_fts, rowid, {_FTS_COLUMNS})
+    VALUES ('delete', old.row, {_FTS_OLD_VALUES});
+    INSERT INTO books_fts (rowid, {_FTS_COLUMNS})
+    VALUES (new.row, {_FTS_VALUES});
+    INSERT INTO book_changes (row, op) VALUES (new.row, 'upsert');
+END"""
+
+
+# Triggers keeping books_fts in step with books and recording every change in
+# book_changes ("upsert" or "delete" of a row), one statement each
+TRIGGERS = {
+    "books_ai": f"""CREATE TRIGGER books_ai AFTER INSERT ON books BEGIN
+    INSERT INTO books_fts (rowid, {_FTS_COLUMNS})
+    VALUES (new.row, {_FTS_VALUES});
+    INSERT INTO book_changes (row, op) VALUES (new.row, 'upsert');
+END""",
+    "books_ad": f"""CREATE TRIGGER books_ad AFTER DELETE ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, {_FTS_COLUMNS})
+    VALUES ('delete', old.row, {_FTS_OLD_VALUES});
+    INSERT INTO book_changes (row, op) VALUES (old.row, 'delete');
+END""",
+    "books_au": _update_trigger(),
+}
+
+# A book whose id is already stored replaces it in place, keeping its row;
+# one stored unchanged is left alone, so loading an export again logs no changes
+_BOOK_COLUMNS = ("id", "title", "author", "category", "description", "fingerprint", "record") + DERIVED_COLUMNS
+INSERT_BOOK = (
+    f"INSERT INTO books ({', '.join(_BOOK_COLUMNS)}) VALUES ({', '.join('?' * len(_BOOK_COLUMNS))}) "
+    "ON CONFLICT (id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in _BOOK_COLUMNS[1:])
+    + " WHERE books.fingerprint IS NOT excluded.fingerprint"
+)
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _key_text(value):
+    key = search_key(value)
+    return f" {key} " if key else ""
+
+
+def derived_values(record):
+    """Values of DERIVED_COLUMNS for one record."""
+    return (tuple(fold(record.get(field)) for field in FTS_COLUMNS)
+            + tuple(_key_text(record.get(field)) for field in FTS_COLUMNS))
+
+
+def book_row(record):
+    """Column values stored for one record; the full record is kept as JSON."""
+    return (
+        record.get("id"),
+        _text(record.get("title")),
+        _text(record.get("author")),
+        _text(record.get("category")),
+        _text(record.get("description")),
+        record_fingerprint(record),
+        json.dumps(dict(record), default=str),
+        *derived_values(record)
+    )
+
+
+def install_triggers(connection):
+    """Create the triggers, replacing any left by an older version of the schema."""
+    for name, sql in TRIGGERS.items():
+        current = connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+        ).fetchone()
+        if current is None or current[0] != sql:
+            connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+            connection.execute(sql)
+
+
+def _meta(connection, key):
+    found = connection.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+    return found[0] if found else None
+
+
+def _set_meta(connection, key, value):
+    connection.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _outdated(connection):
+    # What install_schema has to do: "schema" (new tables), "keys" (new search keys) or nothing
+    if int(_meta(connection, "schema") or 0) < SCHEMA_VERSION:
+        return "schema"
+    if _meta(connection, "analysis") != str(ANALYSIS_VERSION):
+        return "keys"
+    return None
+
+
+def refresh_derived(connection):
+    """Recompute DERIVED_COLUMNS of every row and rebuild the FTS index from them.
+
+    The change log does not move: the records stay as they are.
+    """
+    for name in TRIGGERS:
+        connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+    assignments = ", ".join(f"{column} = ?" for column in DERIVED_COLUMNS)
+    rows = connection.execute("SELECT row, record FROM books").fetchall()
+    connection.executemany(f"UPDATE books SET {assignments} WHERE row = ?",
+                           (derived_values(json.loads(record)) + (row,) for row, record in rows))
+    connection.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+    install_triggers(connection)
+
+
+def install_schema(connection):
+    """Create the catalog tables, upgrading those of an older version of the schema.
+
+    Stored search keys are recomputed when analysis.py's ANALYSIS_VERSION
+    moves; the catalog version is bumped with them, so results cached under
+    the old keys are not served again.
+    """
+    connection.executescript(SCHEMA)
+    with connection:
+        # Identifies this database, so a file replaced at the same path is told apart
+        connection.execute("INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('id', ?)", (uuid.uuid4().hex,))
+    if _outdated(connection) is None:
+        with connection:
+            install_triggers(connection)
+        return
+    with connection:
+        # Workers opening an old database at once upgrade it one at a time
+        connection.execute("BEGIN IMMEDIATE")
+        outdated = _outdated(connection)
+        if outdated == "schema":
+            for name in TRIGGERS:
+                connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+            # Books appended more than once keep their latest copy; the FTS
+            # index is rebuilt below, the change log has to hear of it here
+            duplicates = ("SELECT row FROM books WHERE id IS NOT NULL AND row NOT IN "
+                          "(SELECT max(row) FROM books WHERE id IS NOT NULL GROUP BY id)")
+            connection.execute(f"INSERT INTO book_changes (row, op) SELECT row, 'delete' FROM ({duplicates})")
+            connection.execute(f"DELETE FROM books WHERE row IN ({duplicates})")
+            connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS books_id ON books (id)")
+            present = {column for _, column, *_ in connection.execute("PRAGMA table_info(books)")}
+            for column in DERIVED_COLUMNS:
+                if column not in present:
+                    connection.execute(f"ALTER TABLE books ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+            # The FTS table is recreated over the derived columns
+            connection.execute("DROP TABLE IF EXISTS books_fts")
+            connection.execute(FTS_TABLE)
+        if outdated is not None:
+            refresh_derived(connection)
+            if connection.execute("SELECT 1 FROM books LIMIT 1").fetchone():
+                version = connection.execute("PRAGMA user_version").fetchone()[0]
+                connection.execute(f"PRAGMA user_version = {version + 1}")
+            _set_meta(connection, "schema", SCHEMA_VERSION)
+            _set_meta(connection, "analysis", ANALYSIS_VERSION)
+        install_triggers(connection)
+
+
+@contextmanager
+def bulk_load(connection, replace=False):
+    """Suspend the FTS triggers while rows are bulk inserted into ``books``.
+
+    Runs inside the caller's transaction, opening one if none is open, so
+    the triggers come back on rollback and other connections never see
+    them gone. The rows inserted in the block are indexed and logged with
+    one statement each at the end, which is several times faster than doing
+    it row by row from the insert trigger. Books already stored (see
+    INSERT_BOOK) are updated in place and reindexed as they change.
+    Replacing the catalog clears the change log down to a single "reset"
+    entry.
+    """
+    # sqlite3 opens no transaction before DDL: the drops would commit at once
+    if not connection.in_transaction:
+        connection.execute("BEGIN")
+    for name in TRIGGERS:
+        connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+    if replace:
+        connection.execute("DELETE FROM books")
+        connection.execute("INSERT INTO books_fts (books_fts) VALUES ('delete-all')")
+        connection.execute("DELETE FROM book_changes")
+        connection.execute("INSERT INTO book_changes (row, op) VALUES (0, 'reset')")
+    last_row = connection.execute("SELECT coalesce(max(row), 0) FROM books").fetchone()[0]
+    # Books loaded again update their rows in place: those indexed before the
+    # load are reindexed and logged as they change, the new ones at the end
+    connection.execute(_update_trigger(f" WHEN old.row <= {int(last_row)}"))
+    yield
+    connection.execute(
+        f"INSERT INTO books_fts (rowid, {_FTS_COLUMNS}) "
+        f"SELECT row, {_FTS_COLUMNS} FROM books WHERE row > ?",
+        (last_row,)
+    )
+    if not replace:
+        connection.execute(
+            "INSERT INTO book_changes (row, op) SELECT row, 'upsert' FROM books WHERE row > ?",
+            (last_row,)
+        )
+    connection.execute("DROP TRIGGER books_au")
+    for sql in TRIGGERS.values():
+        connection.execute(sql)
+
+
+def _field_texts(rows):
+    return [value for row in rows for value in row if value]
+
+
+def _phrase(columns, text):
+    return "{" + " ".join(columns) + "} : " + '"' + text.replace('"', '""') + '"'
+
+
+def _search_clause(branches):
+    """Return ``(clause, params, query)`` for the rows matching any of ``branches``.
+
+    A branch lists ``(columns, text)`` pairs that must all hold: one of the
+    columns contains the text. Texts of three characters or more are looked
+    up in the FTS index, shorter ones with instr(). ``query`` is the FTS5
+    query of the long texts of every branch.
+    """
+    branches = [branch for branch in branches if branch]
+    queries = ["(" + " AND ".join(_phrase(columns, text) for columns, text in branch if len(text) >= 3) + ")"
+               for branch in branches if any(len(text) >= 3 for _, text in branch)]
+    query = " OR ".join(queries)
+    if all(len(text) >= 3 for branch in branches for _, text in branch):
+        return "books.row IN (SELECT rowid FROM books_fts WHERE books_fts MATCH ?)", [query], query
+    clauses, params = [], []
+    for branch in branches:
+        parts, values = [], []
+        long = [_phrase(columns, text) for columns, text in branch if len(text) >= 3]
+        if long:
+            parts.append("books.row IN (SELECT rowid FROM books_fts WHERE books_fts MATCH ?)")
+            values.append(" AND ".join(long))
+        for columns, text in branch:
+            if len(text) < 3:
+                parts.append("(" + " OR ".join(f"instr(books.{column}, ?) > 0" for column in columns) + ")")
+                values.extend([text] * len(columns))
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(values)
+    return "(" + " OR ".join(clauses) + ")", params, query
+
+
+class RecordWindow:
+    """Records fetched for one page or window of a database query."""
+
+    def __init__(self, records, keys, offset=0):
+        self.records = records
+        self.keys = keys
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def card_keys(self):
+        return self.keys
+
+
+class SQLiteQuery:
+    """A filtered catalog query; counts and windows are fetched on demand.
+
+    Filtering, ordering and LIMIT/OFFSET all run in SQLite, so only the
+    rows of the requested window are read and decoded.
+    """
+
+    def __init__(self, catalog, where, params, ranked=False):
+        self.catalog = catalog
+        self.where = where
+        self.params = params
+        # Ranked queries join the FTS table and order by its bm25() score
+        # with the field boosts; LIMIT keeps SQLite's sort to the top rows.
+        # The trigram index matches words as substrings, where the in-memory
+        # ranking matches words and prefixes (see ranking.py)
+        if ranked:
+            # Key columns weigh nothing: rows only their key finds rank last
+            weights = ", ".join(str(RANK_FIELDS.get(column[len("folded_"):], 0.0))
+                                if column.startswith("folded_") else "0.0" for column in DERIVED_COLUMNS)
+            self.source = "books JOIN books_fts ON books_fts.rowid = books.row"
+            self.order = f"bm25(books_fts, {weights}), books.row"
+        else:
+            self.source, self.order = "books", "row"
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            sql = f"SELECT count(*) FROM {self.source} WHERE {self.where}"
+            with self.catalog.pool.connection() as connection:
+                self._count = connection.execute(sql, self.params).fetchone()[0]
+        return self._count
+
+    def __iter__(self):
+        return iter(self.window(0, -1))
+
+    def window(self, offset, limit):
+        sql = (f"SELECT books.id, books.fingerprint, books.record FROM {self.source} "
+               f"WHERE {self.where} ORDER BY {self.order} LIMIT ? OFFSET ?")
+        with self.catalog.pool.connection() as connection:
+            rows = connection.execute(sql, self.params + [limit, offset]).fetchall()
+        records = [json.loads(record) for _, _, record in rows]
+        keys = [(book_id, fingerprint) for book_id, fingerprint, _ in rows]
+        return RecordWindow(records, keys, offset)
+
+    def page(self, number, size):
+        """Return ``(window, number, pages)``, clamping ``number`` into range."""
+        pages = max(1, -(-len(self) // size))
+        number = min(max(1, number or 1), pages)
+        return self.window((number - 1) * size, size), number, pages
+
+    def card_keys(self):
+        return self.window(0, -1).card_keys()
+
+
+class SQLiteCatalog:
+    """Book catalog stored in SQLite, with an FTS5 trigram index for search.
+
+    Offers the same ``query``/``version``/``reload`` interface as the
+    in-memory ``Catalog``. A term matches the folded columns, or its search
+    key the key columns, so it finds what the in-memory index finds. Texts
+    of three or more characters are answered by the trigram index; shorter
+    ones are looked for with instr().
+
+    Connections come from a per-process pool. The SQL text of every query
+    is built from a fixed set of clauses, with all values bound as
+    parameters, so each connection's statement cache keeps the prepared
+    statements and their query plans across callbacks.
+
+    Search terms no book can contain are answered without a search: a
+    TermFilter over the search fields (see bloom.py) rules them out. It is
+    kept up to date from the change log in the background and consulted
+    only while it is current.
+
+    A term finding nothing falls back to close spellings of its words, as
+    in the in-memory catalog: a FuzzyIndex over the words of the search
+    fields (see fuzzy.py) maps them to database rows. It is rebuilt in the
+    background once the change log moves on; the previous one answers
+    meanwhile, and books deleted since drop out of its rows in SQL.
+    """
+
+    def __init__(self, path, search_fields=("title", "author"),
+                 pool_size=CATALOG_POOL_SIZE, statement_cache=CATALOG_STATEMENT_CACHE):
+        self.path = path
+        self.statement_cache = statement_cache
+        self.search_fields = tuple(search_fields)
+        if not self.search_fields or not set(self.search_fields) <= set(FTS_COLUMNS):
+            raise ValueError(f"search_fields must be a non-empty subset of {FTS_COLUMNS}")
+        self.pool = ConnectionPool(self._connect, size=pool_size)
+        self._counts = {}
+        self._filter_lock = threading.Lock()
+        self._filter = self._filter_seq = self._filter_builder = None
+        self._fuzzy_lock = threading.Lock()
+        self._fuzzy = self._fuzzy_seq = self._fuzzy_builder = None
+        with self.pool.connection() as connection:
+            install_schema(connection)
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.path, check_same_thread=False, cached_statements=self.statement_cache
+        )
+        # WAL lets every worker read while another process writes
+        connection.execute("PRAGMA journal_mode = WAL")
+        return connection
+
+    @property
+    def version(self):
+        # Bumped by every write that goes through reload or the ingest tools
+        with self.pool.connection() as connection:
+            return connection.execute("PRAGMA user_version").fetchone()[0]
+
+    @property
+    def identity(self):
+        """Id written into the database when it was created; a database replaced at the same path has another."""
+        with self.pool.connection() as connection:
+            return _meta(connection, "id")
+
+    @property
+    def generation(self):
+        """What results derived from the catalog are keyed on: the database, its version and last change.
+
+        The change log also moves with writes made straight to the
+        database, which leave the version as it is.
+        """
+        with self.pool.connection() as connection:
+            identity, version, last_change = connection.execute(
+                "SELECT (SELECT value FROM catalog_meta WHERE key = 'id'),"
+                " (SELECT user_version FROM pragma_user_version), coalesce(max(seq), 0) FROM book_changes"
+            ).fetchone()
+        return mirror_source(self.path, identity), version, last_change
+
+    def __len__(self):
+        with self.pool.connection() as connection:
+            return connection.execute("SELECT count(*) FROM books").fetchone()[0]
+
+    def stamp(self):
+        """Cheap change detector: modification time and size of the file and its WAL."""
+        stamp = []
+        for path in (self.path, self.path + "-wal"):
+            try:
+                status = os.stat(path)
+            except OSError:
+                stamp.append(None)
+            else:
+                stamp.append((status.st_mtime_ns, status.st_size))
+        return tuple(stamp)
+
+    def snapshot(self):
+        """Return ``(last change, rows, records)`` read in one transaction."""
+        with self.pool.connection() as connection:
+            connection.execute("BEGIN")
+            try:
+                seq = connection.execute("SELECT coalesce(max(seq), 0) FROM book_changes").fetchone()[0]
+                rows = connection.execute("SELECT row, record FROM books ORDER BY row").fetchall()
+            finally:
+                connection.execute("ROLLBACK")
+        return seq, [row for row, _ in rows], [json.loads(record) for _, record in rows]
+
+    def last_change(self):
+        with self.pool.connection() as connection:
+            return connection.execute("SELECT coalesce(max(seq), 0) FROM book_changes").fetchone()[0]
+
+    def changes_since(self, seq):
+        """``(seq, row, op)`` entries of the change log after ``seq``."""
+        with self.pool.connection() as connection:
+            return connection.execute(
+                "SELECT seq, row, op FROM book_changes WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+
+    def records_at(self, rows):
+        """Map each of ``rows`` still present to its record."""
+        with self.pool.connection() as connection:
+            found = connection.execute(
+                "SELECT row, record FROM books WHERE row IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(rows)),)
+            ).fetchall()
+        return {row: json.loads(record) for row, record in found}
+
+    def stats(self):
+        stats = {"backend": "sqlite", "version": self.version, "books": len(self), "pool": self.pool.stats()}
+        if self._filter is not None:
+            stats["term_filter"] = {"change": self._filter_seq, **self._filter.stats()}
+        if self._fuzzy is not None:
+            stats["fuzzy"] = {"change": self._fuzzy_seq, "bytes": self._fuzzy[0].nbytes + self._fuzzy[1].nbytes}
+        return stats
+
+    def warm(self):
+        """Bring the term filter and the fuzzy index up to date now, not on the first queries."""
+        if use_search_filter() and self._term_filter() is None:
+            self._filter_builder.join()
+        if use_fuzzy():
+            self._fuzzy_index()
+            builder = self._fuzzy_builder
+            if builder is not None:
+                builder.join()
+
+    def _term_filter(self):
+        # The term filter if it has seen every change; otherwise it is
+        # brought up to date in the background and None returned meanwhile
+        last_change = self.last_change()
+        with self._filter_lock:
+            if self._filter_seq == last_change:
+                return self._filter
+            # A builder started before a fork is not alive in the child
+            if not (self._filter_builder and self._filter_builder.is_alive()):
+                self._filter_builder = threading.Thread(target=self._update_filter, daemon=True)
+                self._filter_builder.start()
+        return None
+
+    def _update_filter(self):
+        term_filter, seq = self._filter, self._filter_seq
+        changes = self.changes_since(seq) if term_filter is not None else []
+        columns = ", ".join(f"{kind}_{field}" for kind in ("folded", "key") for field in self.search_fields)
+        with self.pool.connection() as connection:
+            if term_filter is None or term_filter.saturated or any(op == "reset" for _, _, op in changes):
+                # Rebuilt from every book, sized for them
+                connection.execute("BEGIN")
+                try:
+                    seq = connection.execute("SELECT coalesce(max(seq), 0) FROM book_changes").fetchone()[0]
+                    texts = _field_texts(connection.execute(f"SELECT {columns} FROM books"))
+                finally:
+                    connection.execute("ROLLBACK")
+                term_filter = TermFilter(texts)
+            elif changes:
+                # Books written since: their texts are added, removed ones stay
+                rows = sorted({row for _, row, op in changes if op == "upsert"})
+                term_filter.add(_field_texts(connection.execute(
+                    f"SELECT {columns} FROM books WHERE row IN (SELECT value FROM json_each(?))",
+                    (json.dumps(rows),)
+                )))
+                seq = changes[-1][0]
+        with self._filter_lock:
+            self._filter, self._filter_seq = term_filter, seq
+
+    def _fuzzy_index(self):
+        # ``(index, rows)``: the fuzzy index and the database row of each of
+        # its positions. Rebuilt in the background once the change log moves
+        # on; only the first one is waited for
+        last_change = self.last_change()
+        with self._fuzzy_lock:
+            if self._fuzzy_seq != last_change and not (self._fuzzy_builder and self._fuzzy_builder.is_alive()):
+                self._fuzzy_builder = threading.Thread(target=self._update_fuzzy, daemon=True)
+                self._fuzzy_builder.start()
+            fuzzy, builder = self._fuzzy, self._fuzzy_builder
+        if fuzzy is None:
+            builder.join()
+            fuzzy = self._fuzzy
+        return fuzzy
+
+    def _update_fuzzy(self):
+        columns = ", ".join(self.search_fields)
+        with self.pool.connection() as connection:
+            connection.execute("BEGIN")
+            try:
+                seq = connection.execute("SELECT coalesce(max(seq), 0) FROM book_changes").fetchone()[0]
+                found = connection.execute(f"SELECT row, {columns} FROM books ORDER BY row").fetchall()
+            finally:
+                connection.execute("ROLLBACK")
+        index = FuzzyIndex([dict(zip(self.search_fields, values)) for _, *values in found], self.search_fields)
+        rows = np.fromiter((row for row, *_ in found), dtype=np.int64, count=len(found))
+        with self._fuzzy_lock:
+            self._fuzzy, self._fuzzy_seq = (index, rows), seq
+
+    def _fuzzy_rows(self, search_term):
+        """Database rows holding a close spelling of every word of ``search_term``."""
+        words = tokenize(search_term)
+        if not words:
+            return []
+        index, rows = self._fuzzy_index()
+        return rows[index.search(words)].tolist()
+
+    def _search(self, search_term, ranked):
+        # Return ``(search_term, rows, ranked)`` to filter by: the term, or,
+        # if it matches no book at all, the rows of close spellings of its
+        # words, unranked like in the in-memory catalog
+        if not (search_term and use_fuzzy()):
+            return search_term, None, ranked
+        where, params = self._where(search_term, ranked=ranked)
+        source = SQLiteQuery(self, "1", [], ranked).source
+        with self.pool.connection() as connection:
+            if connection.execute(f"SELECT EXISTS (SELECT 1 FROM {source} WHERE {where})", params).fetchone()[0]:
+                return search_term, None, ranked
+        return None, self._fuzzy_rows(search_term), False
+
+    def reload(self, records):
+        """Replace the stored catalog with ``records`` in one transaction."""
+        with self.pool.connection() as connection, connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            with bulk_load(connection, replace=True):
+                connection.executemany(INSERT_BOOK, (book_row(record) for record in records))
+            connection.execute(f"PRAGMA user_version = {version + 1}")
+        return self
+
+    def value_counts(self, field):
+        """Books per value of the encoded scalar ``field``, in first-seen order.
+
+        Counted with one GROUP BY and kept until the change log moves on.
+        """
+        if field not in ENCODED_FIELDS:
+            raise ValueError(f"cannot count {field!r}")
+        last_change = self.last_change()
+        cached = self._counts.get(field)
+        if cached is None or cached[0] != last_change:
+            column = "category" if field == "category" else f"json_extract(record, '$.{field}')"
+            with self.pool.connection() as connection:
+                found = connection.execute(
+                    f"SELECT {column}, count(*) FROM books WHERE {column} IS NOT NULL "
+                    "GROUP BY 1 ORDER BY min(row)"
+                ).fetchall()
+            cached = self._counts[field] = (last_change, dict(found))
+        return cached[1]
+
+    def _ranked(self, search_term, ranked):
+        # Ranking needs a word the trigram FTS index can match
+        ranked = use_ranking() if ranked is None else ranked
+        return bool(ranked and search_term and any(len(word) >= 3 for word in tokenize(search_term)))
+
+    def _where(self, search_term=None, category=None, selection=None, filters=None, skip=None,
+               ranked=False, rows=None):
+        clauses, params = [], []
+
+        # Rows found another way (see _search) stand in for the search term
+        if rows is not None:
+            clauses.append("books.row IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(rows))
+
+        # Filter by search term: every word of it when ranked, else the whole
+        # term; either as typed (folded) or as its search key, from the start
+        # of a key word
+        if ranked:
+            folded = [f"folded_{field}" for field in RANK_FIELDS]
+            keys = [f"key_{field}" for field in RANK_FIELDS]
+            branches = [[(folded, word) for word in tokenize(search_term)],
+                        [(keys, f" {word}") for word in search_key(search_term).split()]]
+            # The bm25() join needs every row matched through the FTS index
+            branches = [branch for branch in branches if any(len(text) >= 3 for _, text in branch)]
+            clause, values, query = _search_clause(branches)
+            clauses += ["books_fts MATCH ?", clause]
+            params += [query] + values
+        elif search_term:
+            key = search_key(search_term)
+            term_filter = self._term_filter() if use_search_filter() else None
+            if term_filter is not None and not (term_filter.might_contain(search_term)
+                                                or key and term_filter.might_contain(f" {key}")):
+                # No book holds every trigram of the term or of its key: skip the search
+                clauses.append("0")
+            else:
+                branches = [[([f"folded_{field}" for field in self.search_fields], fold(search_term))]]
+                if key:
+                    branches.append([([f"key_{field}" for field in self.search_fields], f" {key}")])
+                clause, values, _ = _search_clause(branches)
+                clauses.append(clause)
+                params.extend(values)
+
+        # Filter by category
+        if category and category != "All":
+            clauses.append("category = ?")
+            params.append(category)
+
+        # Filter by other field values, read from the stored record
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            if field in LIST_FIELDS:
+                clauses.append(f"EXISTS (SELECT 1 FROM json_each(record, '$.{field}') WHERE value = ?)")
+            elif field in ENCODED_FIELDS:
+                clauses.append(f"json_extract(record, '$.{field}') = ?")
+            else:
+                raise ValueError(f"cannot filter on {field!r}")
+            params.append(value)
+
+        # Filter by facets: any of the selected values of each
+        for facet, values in (selection or {}).items():
+            if facet == skip:
+                continue
+            if facet == "published":
+                bounds = [published_bounds(value) for value in values]
+                clauses.append("(" + " OR ".join(
+                    "json_extract(record, '$.published') BETWEEN ? AND ?" for _ in bounds) + ")")
+                params.extend(bound for pair in bounds for bound in pair)
+                continue
+            marks = ", ".join("?" * len(values))
+            if facet in LIST_FIELDS:
+                clauses.append(f"EXISTS (SELECT 1 FROM json_each(record, '$.{facet}') WHERE value IN ({marks}))")
+            elif facet == "category":
+                clauses.append(f"category IN ({marks})")
+            else:
+                clauses.append(f"json_extract(record, '$.{facet}') IN ({marks})")
+            params.extend(values)
+
+        return " AND ".join(clauses) or "1", params
+
+    def query(self, search_term=None, category=None, facets=None, ranked=None, **filters):
+        search_term, rows, ranked = self._search(search_term, self._ranked(search_term, ranked))
+        where, params = self._where(search_term, category, facet_selection(facets), filters, ranked=ranked, rows=rows)
+        return SQLiteQuery(self, where, params, ranked)
+
+    def faceted(self, search_term=None, category=None, facets=None, fields=FACETS, ranked=None):
+        """Return ``(query, counts)``, as Catalog.faceted does, counted with GROUP BY."""
+        search_term, rows, ranked = self._search(search_term, self._ranked(search_term, ranked))
+        source = SQLiteQuery(self, "1", [], ranked).source
+        selection = facet_selection(facets, category)
+        counts = {}
+        with self.pool.connection() as connection:
+            for facet in fields:
+                where, params = self._where(search_term, None, selection, skip=facet, ranked=ranked, rows=rows)
+                matching = f"SELECT books.row, books.category, books.record FROM {source} WHERE {where}"
+                if facet in LIST_FIELDS:
+                    sql = (f"SELECT item.value, count(DISTINCT books.row) FROM ({matching}) AS books, "
+                           f"json_each(books.record, '$.{facet}') AS item GROUP BY item.value")
+                elif facet == "category":
+                    sql = f"SELECT category, count(*) FROM ({matching}) GROUP BY 1"
+                else:
+                    sql = f"SELECT json_extract(record, '$.{facet}'), count(*) FROM ({matching}) GROUP BY 1"
+                found = connection.execute(sql, params).fetchall()
+                if facet == "published":
+                    ranges = {}
+                    for year, count in sorted((year, count) for year, count in found
+                                              if isinstance(year, int) and year > 0):
+                        label = published_label(year)
+                        ranges[label] = ranges.get(label, 0) + count
+                    counts[facet] = ranges
+                else:
+                    counts[facet] = dict(sorted(((value, count) for value, count in found if value is not None),
+                                                key=lambda item: str(item[0])))
+        where, params = self._where(search_term, None, selection, ranked=ranked, rows=rows)
+        return SQLiteQuery(self, where, params, ranked), counts
+
+
+def mirror_source(database, identity):
+    """Source of in-memory copies of the SQLite catalog at ``database`` with id ``identity``."""
+    return f"sqlite:{os.path.realpath(database)}:{identity}"
+
+
+def mirror_state(source, search_fields):
+    """In-memory state of a SQLite catalog, as of its last change."""
+    # Sort keys are database rows and the version is the last change applied
+    seq, rows, books = source.snapshot()
+    return CatalogState(books, seq, tuple(search_fields), order=rows)
+
+
+def open_catalog(records, search_fields=("title", "author"), database=CATALOG_DATABASE,
+                 in_memory=CATALOG_IN_MEMORY, snapshot=CATALOG_SNAPSHOT):
+    """Catalog for the app.
+
+    In memory from ``records`` when no ``database`` is set; otherwise the
+    SQLite catalog itself or, with ``in_memory``, an in-memory copy of it
+    that a CatalogWatcher keeps current. In-memory catalogs are mapped from
+    the ``snapshot`` file when it matches their source, and build it when
+    it does not.
+    """
+    search_fields = tuple(search_fields)
+    if not database:
+        digest = hashlib.blake2b(json.dumps(records, sort_keys=True, default=str).encode("utf-8"),
+                                 digest_size=16).hexdigest()
+        source = f"records:{digest}"
+        state = load_or_build(snapshot, search_fields, source, lambda: CatalogState(records, 1, search_fields))
+        return Catalog.from_state(state, source)
+
+    source = SQLiteCatalog(database, search_fields=search_fields)
+    if not len(source):
+        source.reload(records)
+    if not in_memory:
+        return source
+
+    # The source names the database by its id: a snapshot of a database since
+    # replaced at the same path does not match, whatever its version
+    mirror = mirror_source(database, source.identity)
+    last_change = source.last_change()
+    state = load_or_build(snapshot, search_fields, mirror,
+                          lambda: mirror_state(source, search_fields),
+                          current=lambda state: state.version <= last_change)
+    catalog = Catalog.from_state(state, mirror)
+    CatalogWatcher(catalog, source).start()
+    return catalog
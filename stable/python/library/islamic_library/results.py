@@ -0,0 +1,405 @@
+import fcntl
+import glob
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import stat
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from plotly.utils import PlotlyJSONEncoder
+
+from .pool import ConnectionPool
+from .search import fold
+
+# Rendered grid results, keyed on the normalized query and the catalog
+# version, so a popular query is filtered and rendered once. RESULT_CACHE
+# picks where they are kept:
+#   "memory" an LRU of RESULT_CACHE_SIZE results in each worker
+#   "disk"   a SQLite file under RESULT_CACHE_PATH shared by the workers
+#   "shared" a table of RESULT_CACHE_SIZE slots in a memory-mapped file
+#            under RESULT_CACHE_PATH, shared by the workers
+#   "off"    no caching
+# The memory backend touches no files. The others keep each app's results
+# (and the workers' hit counts) in a directory of its own under
+# RESULT_CACHE_PATH, which like it must belong to this user with mode 0700.
+# Shared results are stored as JSON, never as pickles: a file another user
+# could write must not be able to run code in a worker.
+RESULT_CACHE_BACKENDS = ("memory", "disk", "shared", "off")
+RESULT_CACHE = os.environ.get("RESULT_CACHE", "memory")
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_PATH = os.environ.get(
+    "RESULT_CACHE_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                 f"library-results-{os.getuid()}"),
+)
+# Largest encoded result a shared slot holds; bigger ones are not shared
+RESULT_SLOT_BYTES = int(os.environ.get("RESULT_SLOT_BYTES", str(128 * 1024)))
+
+# Workers write their hit counts for the aggregate at most this often
+STATS_INTERVAL = 1.0
+
+
+def normalize_query(term):
+    """Search term as results are keyed on: trimmed, case-folded, whitespace collapsed."""
+    return " ".join(fold(term).split())
+
+
+def normalize_category(category):
+    """Category as results are keyed on: no selection is the same as "All"."""
+    return category or "All"
+
+
+def encode_result(value):
+    """JSON bytes of a callback result; rendered components become their JSON form."""
+    return json.dumps(value, cls=PlotlyJSONEncoder, separators=(",", ":")).encode("utf-8")
+
+
+def decode_result(data):
+    """Result read back from encode_result: components as the dicts Dash sends anyway."""
+    return json.loads(data)
+
+
+def private_directory(path):
+    """Create ``path`` with mode 0700 if needed; raise PermissionError unless only this user can use it."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory of user {os.getuid()} with mode 0700")
+    return path
+
+
+class MemoryStore:
+    """Bounded LRU of results in this worker process."""
+
+    backend = "memory"
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._results.get(key)
+            if value is not None:
+                self._results.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._results[key] = value
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        return {"size": len(self._results), "maxsize": self.maxsize, "evictions": self.evictions}
+
+
+class DiskStore:
+    """Results, as JSON, in a SQLite file shared by the workers of a host.
+
+    The oldest results go first once the file holds ``maxsize`` of them. A
+    write that finds the file busy is dropped rather than waited for.
+    """
+
+    backend = "disk"
+
+    def __init__(self, path, maxsize=RESULT_CACHE_SIZE):
+        self.path = path
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._puts = 0
+        self.pool = ConnectionPool(self._connect)
+        with self.pool.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, value BLOB NOT NULL, stored REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=0.1, isolation_level=None)
+        # WAL lets every worker read while another one writes; a lost cache
+        # write on power failure costs nothing
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = OFF")
+        return connection
+
+    def get(self, key):
+        with self.pool.connection() as connection:
+            row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        return decode_result(row[0]) if row else None
+
+    def put(self, key, value):
+        data = encode_result(value)
+        try:
+            with self.pool.connection() as connection:
+                connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, data, time.time()))
+                self._puts += 1
+                if self._puts % max(1, self.maxsize // 8) == 0:
+                    connection.execute(
+                        "DELETE FROM results WHERE key IN "
+                        "(SELECT key FROM results ORDER BY stored DESC LIMIT -1 OFFSET ?)", (self.maxsize,)
+                    )
+        except sqlite3.OperationalError:
+            self.dropped += 1
+
+    def stats(self):
+        with self.pool.connection() as connection:
+            size = connection.execute("SELECT count(*) FROM results").fetchone()[0]
+        return {"size": size, "maxsize": self.maxsize, "dropped": self.dropped}
+
+
+# A shared slot: sequence number, key digest, payload length, then the payload
+_SLOT = struct.Struct("<Q16sI4x")
+_SEQUENCE = struct.Struct("<Q")
+
+
+class SharedStore:
+    """Hash table of fixed-size slots in a memory-mapped file shared by the workers.
+
+    Each key owns one slot, and a newer result for another key hashing to
+    it takes the slot over. Writers hold a byte-range lock on the slot and
+    make its sequence number odd while they write; readers copy the slot
+    and keep the copy only if the number was even and unchanged throughout,
+    so they never wait and never see a half-written result.
+    """
+
+    backend = "shared"
+
+    def __init__(self, path, slots=RESULT_CACHE_SIZE, slot_bytes=RESULT_SLOT_BYTES):
+        self.path = path
+        self.slots = max(1, slots)
+        self.slot_bytes = slot_bytes
+        self.too_large = self.busy = 0
+        self._lock = threading.Lock()
+        # Never follow a link planted in place of the file
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        if os.fstat(self._fd).st_uid != os.getuid():
+            os.close(self._fd)
+            raise PermissionError(f"{path} belongs to another user")
+        size = self.slots * slot_bytes
+        if os.fstat(self._fd).st_size < size:
+            # Zero-filled: every slot starts empty, with an even sequence number
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _slot(self, key):
+        return int.from_bytes(key[:8], "little") % self.slots * self.slot_bytes
+
+    def get(self, key):
+        offset = self._slot(key)
+        sequence = _SEQUENCE.unpack_from(self._map, offset)[0]
+        if sequence % 2:
+            return None
+        _, stored, length = _SLOT.unpack_from(self._map, offset)
+        data = self._map[offset + _SLOT.size:offset + _SLOT.size + min(length, self.slot_bytes - _SLOT.size)]
+        if _SEQUENCE.unpack_from(self._map, offset)[0] != sequence or stored != key:
+            return None
+        try:
+            return decode_result(data)
+        except ValueError:
+            return None
+
+    def put(self, key, value):
+        data = encode_result(value)
+        if len(data) > self.slot_bytes - _SLOT.size:
+            self.too_large += 1
+            return
+        offset = self._slot(key)
+        # Record locks exclude other processes only, so threads take a lock too
+        with self._lock:
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, _SLOT.size, offset)
+            except OSError:
+                self.busy += 1
+                return
+            try:
+                sequence = _SLOT.unpack_from(self._map, offset)[0]
+                # Odd while writing; a writer that died midway left it odd already
+                sequence += 1 if sequence % 2 == 0 else 2
+                _SEQUENCE.pack_into(self._map, offset, sequence)
+                _SLOT.pack_into(self._map, offset, sequence, key, len(data))
+                self._map[offset + _SLOT.size:offset + _SLOT.size + len(data)] = data
+                _SEQUENCE.pack_into(self._map, offset, sequence + 1)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, _SLOT.size, offset)
+
+    def stats(self):
+        return {"slots": self.slots, "slot_bytes": self.slot_bytes, "too_large": self.too_large, "busy": self.busy}
+
+
+class NullStore:
+    backend = "off"
+
+    def get(self, key):
+        return None
+
+    def put(self, key, value):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _Flight:
+    # One computation in progress, and what it came to
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = self.error = None
+
+
+class ResultCache:
+    """Callback results looked up by key before the callback does any work.
+
+    Keys digest the cache's ``namespace`` (apps sharing a store must differ
+    in it), the catalog version and the query; hits skip filtering and card
+    rendering entirely. Concurrent misses on one key in a worker compute it
+    once: the first computes, the rest wait for its result (or exception)
+    and count as ``coalesced``. Each worker counts its hits, misses and
+    coalesced lookups and, with a ``stats_dir``, writes them there so any
+    worker can sum them up.
+    """
+
+    def __init__(self, store, namespace="", stats_dir=None):
+        self.store = store
+        self.namespace = namespace
+        self.stats_dir = stats_dir
+        self.hits = self.misses = self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._written = 0.0
+        self._prefix = hashlib.blake2b(namespace.encode("utf-8"), digest_size=4).hexdigest()
+
+    def key(self, version, *parts):
+        payload = json.dumps([self.namespace, version, *parts], default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+    def get_or_compute(self, key, compute):
+        value = self.store.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+        else:
+            value = self._compute_once(key, compute)
+        self._write_counts()
+        return value
+
+    def _compute_once(self, key, compute):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = compute()
+            self.store.put(key, flight.value)
+            return flight.value
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _counts_path(self, pid):
+        return os.path.join(self.stats_dir, f"counts-{self._prefix}-{pid}.json")
+
+    def _write_counts(self):
+        now = time.monotonic()
+        if self.stats_dir is None or now - self._written < STATS_INTERVAL:
+            return
+        self._written = now
+        path = self._counts_path(os.getpid())
+        with open(path + ".tmp", "w") as stream:
+            json.dump({"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}, stream)
+        os.replace(path + ".tmp", path)
+
+    def aggregate(self):
+        """Hit counts summed over every running worker that has written them."""
+        hits = misses = coalesced = workers = 0
+        for path in glob.glob(self._counts_path("*")):
+            if path.endswith(".tmp") or path == self._counts_path(os.getpid()):
+                continue
+            # Workers gone (restarted, or from an earlier server) leave their file
+            # behind; it is removed rather than counted
+            if not _alive(int(path[:-len(".json")].rsplit("-", 1)[1])):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as stream:
+                    counts = json.load(stream)
+            except (OSError, ValueError):
+                continue
+            hits, misses, workers = hits + counts["hits"], misses + counts["misses"], workers + 1
+            coalesced += counts.get("coalesced", 0)
+        # This worker's own counts are always current
+        hits, misses, workers = hits + self.hits, misses + self.misses, workers + 1
+        coalesced += self.coalesced
+        lookups = hits + misses + coalesced
+        return {"workers": workers, "hits": hits, "misses": misses, "coalesced": coalesced,
+                "hit_ratio": hits / lookups if lookups else 0.0}
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        stats = {
+            "backend": self.store.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            **self.store.stats(),
+        }
+        if self.stats_dir is not None:
+            stats["aggregate"] = self.aggregate()
+        return stats
+
+
+def open_result_cache(namespace, backend=RESULT_CACHE, path=RESULT_CACHE_PATH, size=RESULT_CACHE_SIZE):
+    """ResultCache on the configured backend (see RESULT_CACHE)."""
+    if backend not in RESULT_CACHE_BACKENDS:
+        raise ValueError(f"Unknown result cache {backend!r}, expected one of {RESULT_CACHE_BACKENDS}")
+    if backend == "off":
+        return ResultCache(NullStore(), namespace)
+    if backend == "memory":
+        return ResultCache(MemoryStore(size), namespace)
+    # One directory per app: apps never read each other's results
+    private_directory(path)
+    path = private_directory(os.path.join(path, hashlib.blake2b(namespace.encode("utf-8"), digest_size=8).hexdigest()))
+    if backend == "disk":
+        store = DiskStore(os.path.join(path, "results.db"), size)
+    else:
+        store = SharedStore(os.path.join(path, f"results-{size}x{RESULT_SLOT_BYTES}.shm"), size)
+    return ResultCache(store, namespace, stats_dir=path)
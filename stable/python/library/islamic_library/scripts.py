@@ -0,0 +1,12 @@
+import os
+
+# Browser-side halves of the engine's clientside callbacks, shipped in js/
+# and served by Dash like a component library's bundles, ahead of its renderer
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "js")
+
+
+def add_script(app, name):
+    """Load js/``name`` on ``app``'s pages."""
+    if not os.path.exists(os.path.join(SCRIPTS_DIR, name)):
+        raise ValueError(f"no script {name!r} in {SCRIPTS_DIR}")
+    app.scripts.append_script({"relative_package_path": f"js/{name}", "namespace": __package__})
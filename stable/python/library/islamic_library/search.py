@@ -0,0 +1,171 @@
+import numpy as np
+
+from .analysis import search_key
+
+# Trigram codes pack three code points (21 bits each) into one uint64
+_SHIFT = 21
+_PAD = "\0\0"
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def fold(value):
+    if value is None:
+        return ""
+    return str(value).casefold()
+
+
+def _indexed(value):
+    # Folded text, then its search key: a query never spans the NUL between
+    # them, the key's words are each set off by spaces, and the key's Latin
+    # letters are capitals, which no folded query holds
+    key = search_key(value)
+    return f"{fold(value)}\0 {key.upper()} " if key else fold(value)
+
+
+def _key_pattern(term):
+    # What the key of ``term`` looks like in indexed text: from the start of a key word
+    key = search_key(term).upper()
+    return f" {key}" if key else ""
+
+
+def _folded(values):
+    # Repeated values (an author's books) share one indexed string
+    folded = {}
+    return [folded[value] if value in folded else folded.setdefault(value, _indexed(value))
+            for value in values]
+
+
+def _trigram_code(a, b, c):
+    return (a << (2 * _SHIFT)) | (b << _SHIFT) | c
+
+
+def trigrams(texts):
+    """Trigram codes of ``texts``, each padded with two NULs, and the text each is in.
+
+    Only trigrams starting inside a text count, so every substring of one
+    shorter than three characters begins one of its trigrams.
+    """
+    padded = [text + _PAD for text in texts]
+    lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+    chars = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if not len(chars):
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    local = np.arange(len(chars)) - starts
+    valid = np.flatnonzero(local < np.repeat(lengths - len(_PAD), lengths))
+    owners = np.repeat(np.arange(len(padded), dtype=np.int64), lengths)[valid]
+    return _trigram_code(chars[valid], chars[valid + 1], chars[valid + 2]), owners
+
+
+def _contains(texts, rows, query):
+    # Text columns mapped from a snapshot bring their own scan
+    if hasattr(texts, "contains"):
+        return texts.contains(rows, query)
+    return np.fromiter((query in texts[row] for row in rows.tolist()), dtype=bool, count=len(rows))
+
+
+class SearchIndex:
+    """Trigram inverted index answering case-insensitive substring queries.
+
+    Every field value is case-folded, followed by its search key (see
+    analysis.py), and padded with two NULs, so each substring shorter than
+    three characters is the prefix of an indexed trigram. Short queries
+    become a range scan over the sorted trigram vocabulary; longer ones
+    intersect the posting lists of their trigrams and verify the few
+    remaining candidates. A query also matches on its own key, from the
+    start of a key word, so "al-Bukhari" finds "البخاري" and "Bukhaari".
+    """
+
+    def __init__(self, records, fields=("title", "author")):
+        self.fields = tuple(fields)
+        self._texts = [_folded(record.get(field) for record in records) for field in self.fields]
+        self.size = len(self._texts[0]) if self._texts else 0
+        self._build()
+
+    @classmethod
+    def restore(cls, fields, texts, vocab, offsets, postings):
+        """Index over prebuilt arrays; ``texts`` holds one indexed-text sequence per field."""
+        index = cls.__new__(cls)
+        index.fields = tuple(fields)
+        index._texts = list(texts)
+        index.size = len(index._texts[0]) if index._texts else 0
+        index._vocab, index._offsets, index._postings = vocab, offsets, postings
+        return index
+
+    def _build(self):
+        codes, owners = trigrams([text for texts in self._texts for text in texts])
+        if not len(codes):
+            self._vocab = np.empty(0, dtype=np.uint64)
+            self._offsets = np.zeros(1, dtype=np.int64)
+            self._postings = _EMPTY
+            return
+        # Texts run field by field, so a text's row is its position modulo the size
+        owners = (owners % max(self.size, 1)).astype(np.int32)
+
+        # Sort by (trigram, row) and drop duplicate pairs
+        order = np.lexsort((owners, codes))
+        codes, owners = codes[order], owners[order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (owners[1:] != owners[:-1])
+        codes, owners = codes[keep], owners[keep]
+
+        self._vocab, first = np.unique(codes, return_index=True)
+        self._offsets = np.append(first, len(codes)).astype(np.int64)
+        self._postings = owners
+
+    def _range(self, lo, hi):
+        start, stop = np.searchsorted(self._vocab, np.array([lo, hi], dtype=np.uint64))
+        return self._postings[self._offsets[start]:self._offsets[stop]]
+
+    def _union(self, rows):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def _posting(self, code):
+        position = np.searchsorted(self._vocab, np.uint64(code))
+        if position == len(self._vocab) or self._vocab[position] != code:
+            return _EMPTY
+        return self._postings[self._offsets[position]:self._offsets[position + 1]]
+
+    def search(self, term):
+        """Return the sorted row positions whose fields contain ``term``, or its key."""
+        query = fold(term)
+        if not query:
+            return np.arange(self.size, dtype=np.int32)
+        if "\0" in query:
+            return _EMPTY
+        rows = self._substring(query)
+        key = _key_pattern(term)
+        if key:
+            more = self._substring(key, found=rows)
+            if len(more):
+                rows = self._union(np.concatenate([rows, more]))
+        return rows
+
+    def _substring(self, query, found=_EMPTY):
+        # Rows containing ``query``, leaving out any already ``found``
+        points = [ord(char) for char in query]
+        if len(points) == 1:
+            lo = points[0] << (2 * _SHIFT)
+            return self._union(self._range(lo, lo + (1 << (2 * _SHIFT))))
+        if len(points) == 2:
+            lo = _trigram_code(points[0], points[1], 0)
+            return self._union(self._range(lo, lo + (1 << _SHIFT)))
+
+        codes = {_trigram_code(*points[i:i + 3]) for i in range(len(points) - 2)}
+        postings = sorted((self._posting(code) for code in codes), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+
+        if len(found):
+            candidates = candidates[~np.isin(candidates, found, assume_unique=True)]
+        if len(points) == 3:
+            return candidates
+        matched = np.zeros(len(candidates), dtype=bool)
+        for texts in self._texts:
+            matched |= _contains(texts, candidates, query)
+        return candidates[matched]
@@ -0,0 +1,194 @@
+import json
+import mmap
+import os
+from types import MappingProxyType
+
+import numpy as np
+
+from .catalog import CatalogState, EncodedColumn
+from .search import SearchIndex
+
+# Snapshot file: magic, header length, JSON header, then 64-byte aligned arrays
+# that workers map read-only, sharing the pages through the OS page cache
+CATALOG_SNAPSHOT = os.environ.get("CATALOG_SNAPSHOT", "")
+
+MAGIC = b"LIBSNAP4"
+ALIGN = 64
+
+
+class StringColumn:
+    """Strings stored as UTF-8 bytes in ``buffer`` from ``start`` on, decoded on access."""
+
+    def __init__(self, buffer, start, offsets):
+        self.buffer = buffer
+        self.start = start
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        start = self.start + int(self.offsets[row])
+        return self.buffer[start:start + int(self.offsets[row + 1] - self.offsets[row])].decode("utf-8")
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    def contains(self, rows, text):
+        """Boolean mask of the ``rows`` whose string contains ``text``."""
+        needle = text.encode("utf-8")
+        if len(rows) < 256:
+            return np.fromiter((needle in self[row].encode("utf-8") for row in rows.tolist()),
+                               dtype=bool, count=len(rows))
+        # Many candidates: scan the whole column for the needle instead. UTF-8
+        # is self-synchronizing, so byte matches are character matches.
+        hits, position, end = [], self.start, self.start + int(self.offsets[-1])
+        find = self.buffer.find
+        while True:
+            position = find(needle, position, end)
+            if position < 0:
+                break
+            hits.append(position - self.start)
+            position += 1
+        starts = np.asarray(hits, dtype=np.int64)
+        owners = np.searchsorted(self.offsets, starts, side="right") - 1
+        # Drop matches that run past the end of their string
+        owners = owners[starts + len(needle) <= self.offsets[owners + 1]]
+        return np.isin(rows, owners)
+
+
+class RecordColumn(StringColumn):
+    """Records stored as JSON text, decoded on access."""
+
+    def __getitem__(self, row):
+        return MappingProxyType(json.loads(super().__getitem__(row)))
+
+
+class FingerprintColumn:
+    def __init__(self, digests):
+        self.digests = digests
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __getitem__(self, row):
+        return self.digests[row].decode("ascii")
+
+
+def _strings(values):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def write_snapshot(state, path, source=None):
+    """Write ``state`` to ``path`` atomically; ``source`` identifies what it was built from."""
+    if len(state.segments) > 1 or state.dead:
+        state = state.compacted()
+    index = state.segments[0][1]
+    rows = range(len(state.records))
+    arrays = {
+        "order": state.order,
+        "fingerprints": np.array([state.card_key(row)[1] for row in rows], dtype="S16"),
+        "vocab": index._vocab,
+        "offsets": index._offsets,
+        "postings": index._postings,
+    }
+    for field, column in state.columns.items():
+        arrays[f"column_{field}_codes"] = column.codes
+        if column.listed:
+            arrays[f"column_{field}_offsets"] = column.offsets
+    records = (json.dumps(dict(state.records[row]), default=str) for row in rows)
+    arrays["records_data"], arrays["records_offsets"] = _strings(records)
+    for field, texts in zip(index.fields, index._texts):
+        arrays[f"text_{field}_data"], arrays[f"text_{field}_offsets"] = _strings(texts)
+
+    header = {
+        "version": state.version,
+        "source": source,
+        "search_fields": list(state.search_fields),
+        "columns": {field: list(column.values) for field, column in state.columns.items()},
+        "arrays": {},
+    }
+    # Array offsets depend on the header size, so lay out against a generous bound
+    position = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": position}
+        position += -(-array.nbytes // ALIGN) * ALIGN
+    encoded = json.dumps(header).encode("utf-8")
+    start = -(-(len(MAGIC) + 8 + len(encoded) + 1024) // ALIGN) * ALIGN
+    header["data_offset"] = start
+    encoded = json.dumps(header).encode("utf-8").ljust(start - len(MAGIC) - 8)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as stream:
+        stream.write(MAGIC)
+        stream.write(np.uint64(len(encoded)).tobytes())
+        stream.write(encoded)
+        for name, array in arrays.items():
+            stream.seek(start + header["arrays"][name]["offset"])
+            stream.write(np.ascontiguousarray(array).tobytes())
+        stream.truncate(start + position)
+    os.replace(temporary, path)
+
+
+def read_snapshot(path, search_fields, source=None):
+    """Map the snapshot at ``path`` into a CatalogState, or None if it is missing or stale."""
+    try:
+        with open(path, "rb") as stream:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if mapped[:len(MAGIC)] != MAGIC:
+        return None
+    length = int(np.frombuffer(mapped, dtype=np.uint64, count=1, offset=len(MAGIC))[0])
+    header = json.loads(mapped[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+    if header["source"] != source or tuple(header["search_fields"]) != tuple(search_fields):
+        return None
+
+    def start(name):
+        return header["data_offset"] + header["arrays"][name]["offset"]
+
+    def array(name):
+        spec = header["arrays"][name]
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        return np.frombuffer(mapped, dtype=np.dtype(spec["dtype"]), count=count,
+                             offset=start(name)).reshape(spec["shape"])
+
+    def strings(name, column=StringColumn):
+        return column(mapped, start(f"{name}_data"), array(f"{name}_offsets"))
+
+    columns = {}
+    for field, values in header["columns"].items():
+        offsets = f"column_{field}_offsets"
+        columns[field] = EncodedColumn(array(f"column_{field}_codes"), tuple(values),
+                                       array(offsets) if offsets in header["arrays"] else None)
+    texts = [strings(f"text_{field}") for field in search_fields]
+    index = SearchIndex.restore(search_fields, texts, array("vocab"), array("offsets"), array("postings"))
+    return CatalogState.restore(
+        strings("records", RecordColumn),
+        header["version"],
+        tuple(search_fields),
+        index,
+        columns,
+        array("order"),
+        FingerprintColumn(array("fingerprints")),
+    )
+
+
+def load_or_build(path, search_fields, source, build, current=lambda state: True):
+    """State mapped from the snapshot at ``path`` if it is usable, else ``build()``.
+
+    A freshly built state is written to ``path`` for the next worker.
+    """
+    if path:
+        state = read_snapshot(path, search_fields, source)
+        if state is not None and current(state):
+            return state
+    state = build()
+    if path:
+        write_snapshot(state, path, source)
+    return state
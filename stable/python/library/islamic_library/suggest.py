@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import threading
+from bisect import bisect_left
+
+import flask
+import numpy as np
+from dash import ClientsideFunction, Input, Output, dcc, html
+
+from .scripts import add_script
+from .search import fold
+
+# Search-as-you-type suggestions for titles and authors, served as JSON on
+# SUGGEST_PATH and shown in a datalist under search-input by
+# js/search_suggest.js; set SUGGEST_PATH to an empty string to turn them off
+SUGGEST_PATH = os.environ.get("SUGGEST_PATH", "/suggest")
+SUGGEST_LIMIT = int(os.environ.get("SUGGEST_LIMIT", "8"))
+SUGGEST_MAX = 50
+SUGGEST_FIELDS = ("title", "author")
+
+# Prefixes matching more entries than this keep their answer once found
+CACHE_RANGE = 4096
+
+_WORD_START = re.compile(r"(?<!\w)\w")
+
+
+def popularity(record):
+    """Weight a book adds to its title and author: one, plus its rating."""
+    rating = record.get("rating")
+    return 1 + (rating if isinstance(rating, (int, float)) else 0)
+
+
+class _Suffixes:
+    # The sorted entries as a sequence for bisect, each read out of the
+    # phrase text when compared rather than stored as a string of its own
+    def __init__(self, text, starts, stops):
+        # Memoryviews hand out Python ints, quicker to index than numpy arrays
+        self.text, self.starts, self.stops = text, memoryview(starts), memoryview(stops)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, position):
+        return self.text[self.starts[position]:self.stops[position]]
+
+
+class SuggestIndex:
+    """Prefix index over the titles and authors of one catalog generation.
+
+    Phrases are ranked by popularity, summed over the books naming them.
+    Rather than a trie, this is a suffix array over word starts: the folded
+    phrases are one string, and every word start in it is an entry, sorted
+    by the text from there to the end of its phrase. The entries a prefix
+    begins, at the start of any word of a phrase, are one range of it,
+    found by binary search; the phrases ranked best in that range are the
+    suggestions. Each entry costs three int32s, against a node per
+    character in a trie. Large ranges (short prefixes) are answered once
+    and kept.
+    """
+
+    def __init__(self, records, fields=SUGGEST_FIELDS):
+        weights = {}
+        for record in records:
+            weight = popularity(record)
+            for field in fields:
+                value = record.get(field)
+                if isinstance(value, str) and value.strip():
+                    weights[value] = weights.get(value, 0) + weight
+        self.phrases = sorted(weights, key=lambda phrase: (-weights[phrase], phrase))
+
+        folded = [fold(phrase) for phrase in self.phrases]
+        offsets = np.cumsum([0] + [len(text) for text in folded])
+        entries = sorted((text[match.start():], rank, match.start())
+                         for rank, text in enumerate(folded)
+                         for match in _WORD_START.finditer(text))
+        ranks = np.fromiter((rank for _, rank, _ in entries), dtype=np.int32, count=len(entries))
+        starts = np.fromiter((start for _, _, start in entries), dtype=np.int32, count=len(entries))
+        self._ranks = ranks
+        self._suffixes = _Suffixes("".join(folded), (offsets[ranks] + starts).astype(np.int32),
+                                   offsets[ranks + 1].astype(np.int32))
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def complete(self, prefix, limit=SUGGEST_LIMIT):
+        """Best ``limit`` phrases holding a word that starts with ``prefix``."""
+        prefix = " ".join(fold(prefix).split())
+        if not prefix:
+            return []
+        ranks = self._cache.get(prefix)
+        if ranks is None:
+            start = bisect_left(self._suffixes, prefix)
+            stop = bisect_left(self._suffixes, prefix + "\U0010ffff", start)
+            ranks = np.unique(self._ranks[start:stop])
+            if stop - start > CACHE_RANGE:
+                ranks = self._cache[prefix] = ranks[:SUGGEST_MAX].copy()
+        return [self.phrases[rank] for rank in ranks[:limit].tolist()]
+
+    @property
+    def nbytes(self):
+        """Memory held by the index, the phrase strings and kept answers included."""
+        suffixes = self._suffixes
+        return (sys.getsizeof(self.phrases) + sum(map(sys.getsizeof, self.phrases))
+                + sys.getsizeof(suffixes.text) + suffixes.starts.nbytes + suffixes.stops.nbytes
+                + self._ranks.nbytes + sum(ranks.nbytes for ranks in list(self._cache.values())))
+
+
+class Suggestions:
+    """The catalog's suggestion index, rebuilt in the background as the catalog changes.
+
+    Until a rebuild finishes, the previous generation's index keeps
+    answering; before the first one finishes there are no suggestions.
+    """
+
+    def __init__(self, catalog, fields=SUGGEST_FIELDS):
+        self.catalog = catalog
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._index = None
+        self._generation = None
+        self._builder = None
+
+    def get(self):
+        generation = self.catalog.generation
+        with self._lock:
+            # A builder started before a fork is not alive in the child
+            if generation != self._generation and not (self._builder and self._builder.is_alive()):
+                self._builder = threading.Thread(target=self._build, args=(generation,), daemon=True)
+                self._builder.start()
+            return self._index
+
+    def _build(self, generation):
+        books = self.catalog.query()
+        index = SuggestIndex(books.window(0, len(books)), self.fields)
+        with self._lock:
+            self._index, self._generation = index, generation
+
+    def warm(self):
+        """Build the current catalog's index now, waiting for it."""
+        self.get()
+        builder = self._builder
+        if builder is not None:
+            builder.join()
+
+    def complete(self, prefix, limit=SUGGEST_LIMIT):
+        index = self.get()
+        return index.complete(prefix, limit) if index is not None else []
+
+    def stats(self):
+        with self._lock:
+            index, generation = self._index, self._generation
+        return {
+            "generation": generation,
+            "phrases": len(index) if index is not None else 0,
+            "bytes": index.nbytes if index is not None else 0,
+        }
+
+
+def suggest_components(app, path=SUGGEST_PATH):
+    """Datalist for ``search-input`` (give it ``list="search-suggestions"``) and its config."""
+    if not path:
+        return []
+    return [
+        html.Datalist(id="search-suggestions"),
+        dcc.Store(id="suggest-config", data={"url": app.get_relative_path(path), "limit": SUGGEST_LIMIT})
+    ]
+
+
+def register_suggest_route(app, catalog, path=SUGGEST_PATH):
+    """Serve suggestions on ``path``: plain Flask, so no Dash callback runs per keystroke."""
+    if not path:
+        return None
+    suggestions = Suggestions(catalog)
+    suggestions.get()
+
+    @app.server.route(path)
+    def suggest():
+        limit = max(1, min(flask.request.args.get("limit", SUGGEST_LIMIT, type=int), SUGGEST_MAX))
+        response = flask.jsonify(suggestions.complete(flask.request.args.get("q", ""), limit))
+        # Suggestions follow the catalog, so browsers may reuse them briefly
+        response.cache_control.max_age = 60
+        return response
+
+    add_script(app, "search_suggest.js")
+    app.clientside_callback(
+        ClientsideFunction(namespace="librarySuggest", function_name="attach"),
+        Output("search-suggestions", "title"),
+        Input("suggest-config", "data")
+    )
+    return suggestions
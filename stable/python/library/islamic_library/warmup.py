@@ -0,0 +1,132 @@
+import os
+import time
+
+from .controls import category_options
+from .metrics import publish
+
+# Worker warm-up, run by the post_worker_init hook in gunicorn.conf.py before
+# a worker accepts requests: the catalog builds its lazy indexes, suggestions
+# are indexed, and the top queries, alone and in every category, go through
+# the grid callback as requests would, filling this worker's caches.
+# WARMUP=0 turns it off. The top queries come from WARMUP_QUERIES (comma
+# separated) and WARMUP_QUERIES_FILE (one per line); WARMUP_BUDGET caps the
+# seconds spent replaying them.
+WARMUP = os.environ.get("WARMUP", "1") == "1"
+WARMUP_QUERIES = os.environ.get("WARMUP_QUERIES", "")
+WARMUP_QUERIES_FILE = os.environ.get("WARMUP_QUERIES_FILE", "")
+WARMUP_BUDGET = float(os.environ.get("WARMUP_BUDGET", "20"))
+
+GRID_OUTPUT = "books-grid.children"
+
+# Warm-ups of this process, run by run_warmups
+_warmups = []
+
+
+def warmup_queries(queries=WARMUP_QUERIES, path=WARMUP_QUERIES_FILE):
+    """Search terms to replay: no search first, then the configured ones, each once."""
+    found = queries.split(",")
+    if path:
+        with open(path, encoding="utf-8") as stream:
+            found.extend(stream)
+    return list(dict.fromkeys([""] + [query.strip() for query in found if query.strip()]))
+
+
+class Warmup:
+    """Warms one app's catalog, suggestions and grid callback in the current worker."""
+
+    def __init__(self, app, catalog, suggestions=None, queries=None):
+        self.app = app
+        self.catalog = catalog
+        self.suggestions = suggestions
+        self.queries = warmup_queries() if queries is None else queries
+        self.requests = self.errors = self.skipped = 0
+        self.duration_ms = self.index_ms = None
+        _warmups.append(self)
+        publish("warmup", self.stats)
+
+    def _grid_request(self):
+        # Builds the body of a grid callback request; None when the grid is
+        # filtered in the browser and has no server callback
+        for output, spec in self.app.callback_map.items():
+            # Clientside callbacks are listed too, without a server function
+            if GRID_OUTPUT in output and "callback" in spec:
+                break
+        else:
+            return None
+        outputs = [dict(zip(("id", "property"), item.rsplit(".", 1))) for item in output.strip(".").split("...")]
+
+        def body(values):
+            def props(items):
+                return [{"id": item["id"], "property": item["property"], "value": values.get(item["id"])}
+                        for item in items]
+            return {
+                "output": output,
+                "outputs": outputs if output.startswith("..") else outputs[0],
+                "inputs": props(spec["inputs"]),
+                "state": props(spec.get("state", [])),
+                "changedPropIds": ["search-query.data"],
+            }
+        return body
+
+    def warm_indexes(self, notify=lambda: None):
+        """Build the catalog's lazy indexes, its category facet and the suggestion index."""
+        started = time.perf_counter()
+        self.catalog.warm()
+        # The dropdown's counts over a search: the category facet, the only one the app shows
+        self.catalog.faceted(None, fields=("category",))
+        notify()
+        if self.suggestions is not None:
+            self.suggestions.warm()
+            notify()
+        self.index_ms = (time.perf_counter() - started) * 1000
+
+    def run(self, notify=lambda: None, budget=WARMUP_BUDGET):
+        """Warm up, calling ``notify`` between steps; returns the stats."""
+        started = time.perf_counter()
+        self.warm_indexes(notify)
+        replaying = time.perf_counter()
+
+        body = self._grid_request()
+        if body is not None:
+            client = self.app.server.test_client()
+            path = self.app.config.routes_pathname_prefix + "_dash-update-component"
+            categories = [option["value"] for option in category_options(self.catalog)]
+            for query in self.queries:
+                for category in categories:
+                    if time.perf_counter() - replaying > budget:
+                        self.skipped += 1
+                        continue
+                    response = client.post(path, json=body({"search-query": query, "category-select": category}))
+                    self.requests += 1
+                    self.errors += response.status_code not in (200, 204)
+                    notify()
+        self.duration_ms = (time.perf_counter() - started) * 1000
+        return self.stats()
+
+    def stats(self):
+        return {
+            "queries": len(self.queries),
+            "requests": self.requests,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "index_ms": self.index_ms,
+            "duration_ms": self.duration_ms,
+        }
+
+
+def register_warmup(app, catalog, suggestions=None):
+    """Warm ``app`` up in every worker that calls run_warmups."""
+    return Warmup(app, catalog, suggestions)
+
+
+def warm_indexes():
+    """Build the indexes of every app in this process, e.g. in a preloading arbiter."""
+    for warmup in _warmups:
+        warmup.warm_indexes()
+
+
+def run_warmups(notify=lambda: None):
+    """Run the warm-ups of this process (unless WARMUP=0); returns their stats."""
+    if not WARMUP:
+        return []
+    return [warmup.run(notify) for warmup in _warmups]
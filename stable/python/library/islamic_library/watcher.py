@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+import time
+import weakref
+
+from .metrics import publish
+
+# Seconds between checks of the catalog database; 0 turns the watcher off
+CATALOG_WATCH_INTERVAL = float(os.environ.get("CATALOG_WATCH_INTERVAL", "2"))
+
+logger = logging.getLogger(__name__)
+
+# Watchers of this process, restarted in forked workers by start_watchers
+_watchers = weakref.WeakSet()
+
+
+class CatalogWatcher:
+    """Keeps an in-memory Catalog in step with the SQLite catalog it mirrors.
+
+    Every ``interval`` seconds the database file's stamp is compared with
+    the last one seen. When it moved, the change log entries past the
+    catalog's version are applied as one delta: changed rows are re-read
+    and appended as a new index segment, deleted rows are masked out. A
+    "reset" entry, written when the catalog is replaced, reloads it whole.
+    Either way the new generation is built off to the side and swapped in.
+    """
+
+    def __init__(self, catalog, source, interval=CATALOG_WATCH_INTERVAL):
+        self.catalog = catalog
+        self.source = source
+        self.interval = interval
+        self.polls = self.deltas = self.reloads = self.errors = 0
+        self.last_apply_ms = 0.0
+        self._stamp = None
+        self._pid = None
+        self._stop = self._thread = None
+        _watchers.add(self)
+        publish("catalog_watcher", self.stats)
+
+    def start(self):
+        """Poll from a daemon thread; calling again in a forked child restarts it."""
+        if self.interval <= 0 or self._pid == os.getpid():
+            return self
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="catalog-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop polling; waits up to ``timeout`` seconds for a poll under way to finish."""
+        if self._stop is not None:
+            self._stop.set()
+        if self._pid == os.getpid() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._pid = None
+
+    def _run(self, stop):
+        while not stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                self.errors += 1
+                logger.exception("catalog watcher failed to apply changes")
+
+    def poll(self):
+        """Apply pending changes now; returns the number of change log entries read."""
+        self.polls += 1
+        stamp = self.source.stamp()
+        if stamp == self._stamp:
+            return 0
+        # Writes after this point move the stamp again and are caught next time
+        self._stamp = stamp
+        changes = self.source.changes_since(self.catalog.version)
+        if not changes:
+            return 0
+
+        started = time.perf_counter()
+        last = changes[-1][0]
+        if any(op == "reset" for _, _, op in changes):
+            seq, rows, books = self.source.snapshot()
+            self.catalog.reload(books, order=rows, version=seq)
+            self.reloads += 1
+        else:
+            # Only the last change of each row matters
+            ops = {}
+            for _, row, op in changes:
+                ops[row] = op
+            upserts = self.source.records_at([row for row, op in ops.items() if op == "upsert"])
+            deletes = [row for row in ops if row not in upserts]
+            self.catalog.apply(upserts, deletes, version=last)
+            self.deltas += 1
+        self.last_apply_ms = (time.perf_counter() - started) * 1000
+        return len(changes)
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "version": self.catalog.version,
+            "polls": self.polls,
+            "deltas": self.deltas,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_apply_ms": self.last_apply_ms,
+        }
+
+
+def start_watchers():
+    """(Re)start every watcher in this process, e.g. in a freshly forked worker."""
+    for watcher in list(_watchers):
+        watcher.start()
+
+
+def stop_watchers():
+    """Stop every watcher in this process, e.g. in a preloading arbiter before it forks.
+
+    Waits for polls under way, so no watcher holds a catalog's lock at the fork.
+    """
+    for watcher in list(_watchers):
+        watcher.stop(timeout=30)
@@ -0,0 +1,75 @@
+import pytest
+
+from islamic_library.analysis import search_key
+from islamic_library.catalog import Catalog
+
+BOOKS = [
+    {"id": 1, "title": "Sahih Al-Bukhari", "author": "Imam Al-Bukhari"},
+    {"id": 2, "title": "صحيح البخاري", "author": "محمد بن إسماعيل البخاري"},
+    {"id": 3, "title": "Ṣaḥīḥ al-Bukhārī", "author": "Muḥammad al-Bukhārī"},
+    {"id": 4, "title": "Riyad us-Saliheen", "author": "Imam An-Nawawi"},
+    {"id": 5, "title": "In the Footsteps of the Prophet", "author": "Tariq Ramadan"},
+    {"id": 6, "title": "One Hundred Great Muslims", "author": "Jamil Ahmad"},
+    {"id": 7, "title": "A New Approach to Fiqh", "author": "Wahbah al-Zuhayli"},
+    {"id": 8, "title": "My First Quran", "author": "Goodword"},
+    {"id": 9, "title": "Men Around the Messenger", "author": "Khalid Muhammad Khalid"},
+    {"id": 10, "title": "The Noble Qur'an", "author": "Divine Revelation"},
+    {"id": 11, "title": "القرآن الكريم", "author": "Divine Revelation"},
+]
+
+
+def ids(catalog, term):
+    return [book["id"] for book in catalog.query(term)]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return Catalog(BOOKS)
+
+
+@pytest.mark.parametrize("variant", ["Bukhari", "Al-Bukhari", "bukhaari", "Bukhārī", "البخاري", "البخارى"])
+def test_spellings_share_a_key(variant):
+    assert search_key(variant) == "bukhari"
+
+
+@pytest.mark.parametrize("variant", ["Riyad us-Saliheen", "Riyadh us Salihin", "riyadh us-salihin"])
+def test_spaced_and_hyphenated_articles_share_a_key(variant):
+    assert search_key(variant) == "riyad salihin"
+
+
+def test_spaced_english_words_are_kept():
+    assert search_key("As soon as") == "as sun as"
+    assert search_key("Sitting at the feet") == "sitting at the fit"
+
+
+def test_keys_keep_vowels():
+    assert search_key("Imam An-Nawawi") == "imam nawawi"
+    assert search_key("Men Around the Messenger") == "men around the messenger"
+
+
+@pytest.mark.parametrize("variant", ["Qur'an", "Koran", "القرآن", "qurʾān"])
+def test_known_transliterations(variant):
+    assert search_key(variant) == "quran"
+
+
+@pytest.mark.parametrize("term", ["Bukhari", "al-Bukhari", "bukhaari", "البخاري"])
+def test_variants_find_every_script(catalog, term):
+    assert ids(catalog, term) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("Nawawi", [4]),
+    ("Imam", [1, 4]),
+    ("mean", []),
+    ("quran", [8, 10, 11]),
+])
+def test_unrelated_titles_do_not_match(catalog, monkeypatch, term, expected):
+    # Exact and key matches only, without the typo-tolerant fallback
+    monkeypatch.setattr("islamic_library.catalog.use_fuzzy", lambda: False)
+    assert ids(catalog, term) == expected
+
+
+def test_key_pass_keeps_prefix_matching(catalog):
+    # A term still being typed matches the key words it begins
+    assert ids(catalog, "bukh") == [1, 2, 3]
+    assert ids(catalog, "salih") == [4]
@@ -0,0 +1,90 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from islamic_library.bloom import BloomFilter, TermFilter
+from islamic_library.catalog import Catalog
+from islamic_library.ingest import ingest
+from islamic_library.repository import SQLiteCatalog
+from islamic_library.search import fold
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz -'"
+
+
+def make_texts(count, seed=1):
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(LETTERS[:26]) for _ in range(rng.randint(2, 9))) for _ in range(400)]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 5))).title() for _ in range(count)] + \
+        ["Riyāḍ aṣ-Ṣāliḥīn", "صحيح البخاري", "Ibn Kathīr"]
+
+
+def substrings(text, longest=6):
+    folded = fold(text)
+    return {folded[start:start + length] for start in range(len(folded))
+            for length in range(1, longest + 1) if start + length <= len(folded)}
+
+
+@pytest.mark.parametrize("rate", [0.1, 0.01, 0.001])
+def test_bloom_filter_keeps_its_false_positive_rate(rate):
+    rng = np.random.default_rng(4)
+    keys = rng.integers(0, 1 << 63, 20000, dtype=np.uint64)
+    bloom = BloomFilter(len(keys), rate)
+    bloom.add(keys)
+    assert bloom.contains(keys).all()
+    others = np.setdiff1d(rng.integers(0, 1 << 63, 200000, dtype=np.uint64), keys)
+    measured = bloom.contains(others).mean()
+    assert measured <= rate + 3 * math.sqrt(rate / len(others))
+    assert measured == pytest.approx(bloom.estimated_rate, rel=0.25, abs=2e-4)
+
+
+def test_every_indexed_term_passes_the_filter():
+    texts = make_texts(500)
+    term_filter = TermFilter(texts, rate=0.01)
+    for text in texts:
+        for term in substrings(text):
+            assert term_filter.might_contain(term), (text, term)
+        assert term_filter.might_contain(text.upper())
+    assert term_filter.rejected == 0
+
+
+def test_terms_in_no_text_pass_at_the_configured_rate():
+    texts = make_texts(2000)
+    present = set().union(*(substrings(text, 3) for text in texts))
+    rng = random.Random(2)
+    # A three-letter term is one trigram: it passes only as a false positive
+    absent = {term for term in ("".join(rng.choice(LETTERS) for _ in range(3)) for _ in range(20000))
+              if term not in present}
+    for rate in (0.05, 0.01):
+        term_filter = TermFilter(texts, rate=rate)
+        passed = sum(term_filter.might_contain(term) for term in absent)
+        # Within three standard deviations of sampling error
+        assert passed / len(absent) <= rate + 3 * math.sqrt(rate / len(absent)), rate
+        assert term_filter.stats()["rejected"] == len(absent) - passed
+
+
+def test_added_texts_pass_the_filter():
+    term_filter = TermFilter(make_texts(100), rate=0.01)
+    assert not term_filter.might_contain("zqxj")
+    term_filter.add(["Zqxjian Tales"])
+    assert all(term_filter.might_contain(term) for term in substrings("Zqxjian Tales"))
+
+
+BOOKS = [{"id": number, "title": title, "author": author, "category": "Hadith"}
+         for number, (title, author) in enumerate(zip(make_texts(300, seed=5), make_texts(300, seed=6)), 1)]
+
+
+def test_sqlite_search_through_the_filter_misses_no_book(tmp_path):
+    database = SQLiteCatalog(str(tmp_path / "catalog.db")).reload(BOOKS)
+    database.warm()
+    memory = Catalog(BOOKS)
+    rng = random.Random(8)
+    terms = [term for book in rng.sample(BOOKS, 40) for term in rng.sample(sorted(substrings(book["title"])), 5)]
+    for term in terms:
+        assert [book["id"] for book in database.query(term)] == [book["id"] for book in memory.query(term)], term
+    assert database._term_filter().rejected == 0
+    # Books written after the filter was built are taken in
+    ingest([{"id": 1000, "title": "Zqxjian Tales", "author": "Anonymous", "category": "Adab"}], database)
+    database.warm()
+    assert [book["id"] for book in database.query("qxji")] == [1000]
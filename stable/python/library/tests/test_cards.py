@@ -0,0 +1,104 @@
+import importlib.util
+import os
+import random
+import sys
+
+import pytest
+
+from islamic_library import warmup
+from islamic_library.cards import CardCache, CardRenderer, component_json
+from islamic_library.catalog import record_fingerprint
+
+TEMPLATES = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+def load_template(number, monkeypatch):
+    # Each template imports its own ``books`` module from its folder
+    folder = os.path.join(TEMPLATES, f"No.{number}")
+    monkeypatch.syspath_prepend(folder)
+    monkeypatch.delitem(sys.modules, "books", raising=False)
+    monkeypatch.setattr(warmup, "_warmups", [])
+    spec = importlib.util.spec_from_file_location(f"template_{number}", os.path.join(folder, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def vary(books, count, seed):
+    # Records shaped like the template's sample books with other values,
+    # list fields from empty to several items
+    rng = random.Random(seed)
+    words = ["Sahih", "Al-Bukhari", "نووي", "Tafsir", "<b>", "{}", "a b", ""]
+    result = []
+    for number in range(count):
+        book = dict(rng.choice(books))
+        for key, value in book.items():
+            if isinstance(value, list):
+                book[key] = [rng.choice(words) or "x" for _ in range(rng.randint(0, 4))]
+            elif isinstance(value, bool):
+                continue
+            elif isinstance(value, int):
+                book[key] = rng.randint(0, 2000)
+            elif isinstance(value, float):
+                book[key] = round(rng.uniform(0, 5), 1)
+            elif key != "icon" and not key.endswith("color"):
+                book[key] = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        book["id"] = 1000 + number
+        result.append(book)
+    return result
+
+
+@pytest.mark.parametrize("number", range(1, 9))
+def test_traced_cards_match_create_book_card(number, monkeypatch):
+    template = load_template(number, monkeypatch)
+    renderer = CardRenderer(template.create_book_card)
+    # Traced, not falling back to create_book_card for every record
+    assert renderer._fill != renderer.render_one
+    books = template.books_data + vary(template.books_data, 50, seed=number)
+    expected = [component_json(template.create_book_card(book)) for book in books]
+    assert renderer.render(books) == expected
+    columns = {key: [book.get(key) for book in books] for key in books[0]}
+    assert renderer.render(columns) == expected
+    # The template's own renderer, through its card cache
+    keys = [(book["id"], record_fingerprint(book)) for book in books]
+    assert template.card_renderer.render(books, keys) == expected
+    assert template.card_renderer.render(books, keys) == expected
+
+
+def test_cache_evicts_the_least_recently_used():
+    cache = CardCache(maxsize=3)
+    for number in range(3):
+        cache.put((number, "a"), f"card {number}")
+    assert cache.get((0, "a")) == "card 0"
+    cache.put((3, "a"), "card 3")
+    # 1 was used least recently
+    assert cache.get((1, "a")) is None
+    assert [cache.get((number, "a")) for number in (0, 2, 3)] == ["card 0", "card 2", "card 3"]
+    assert cache.stats()["evictions"] == 1 and len(cache) == 3
+    for number in range(4, 10):
+        cache.put((number, "a"), f"card {number}")
+    assert len(cache) == 3 and cache.evictions == 7
+    disabled = CardCache(maxsize=0)
+    disabled.put((1, "a"), "card 1")
+    assert len(disabled) == 0
+
+
+def test_changed_records_replace_their_cached_card():
+    def create_card(book):
+        return {"title": book["title"]}
+
+    cache = CardCache(maxsize=10)
+    renderer = CardRenderer(create_card, cache=cache)
+    books = [{"id": 1, "title": "Sahih Al-Bukhari"}, {"id": 2, "title": "Sahih Muslim"}]
+
+    def render():
+        return renderer.render(books, [(book["id"], record_fingerprint(book)) for book in books])
+
+    assert render() == [{"title": "Sahih Al-Bukhari"}, {"title": "Sahih Muslim"}]
+    assert render() == [{"title": "Sahih Al-Bukhari"}, {"title": "Sahih Muslim"}]
+    assert cache.hits == 2 and cache.misses == 2
+    books[1] = {"id": 2, "title": "Sahih Muslim, abridged"}
+    assert render() == [{"title": "Sahih Al-Bukhari"}, {"title": "Sahih Muslim, abridged"}]
+    # The stale card of book 2 is dropped, not left to age out
+    assert cache.invalidations == 1 and len(cache) == 2
+    assert cache.get((2, record_fingerprint({"id": 2, "title": "Sahih Muslim"}))) is None
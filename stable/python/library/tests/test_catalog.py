@@ -0,0 +1,32 @@
+import random
+
+from islamic_library.catalog import Catalog
+
+CATEGORIES = ["Hadith", "Quran", "Seerah", "Fiqh", None]
+DIFFICULTIES = ["Beginner", "Intermediate", "Advanced"]
+
+
+def book(number, rng):
+    return {"id": number, "title": f"Book {number}", "author": "Author",
+            "category": rng.choice(CATEGORIES), "difficulty": rng.choice(DIFFICULTIES)}
+
+
+def test_counts_kept_through_deltas_match_a_recount():
+    rng = random.Random(11)
+    books = {number: book(number, rng) for number in range(1, 201)}
+    catalog = Catalog(list(books.values()), order=list(books))
+    # Counts taken once are then moved by each delta rather than recounted
+    catalog.value_counts("category")
+    catalog.value_counts("difficulty")
+
+    for step in range(30):
+        upserts = {number: book(number, rng) for number in rng.sample(range(1, 260), 15)}
+        deletes = [number for number in rng.sample(sorted(books), 5) if number not in upserts]
+        catalog.apply(upserts, deletes)
+        books.update(upserts)
+        for number in deletes:
+            del books[number]
+
+        recount = Catalog([books[number] for number in sorted(books)])
+        for field in ("category", "difficulty"):
+            assert catalog.value_counts(field) == recount.value_counts(field), (step, field)
@@ -0,0 +1,154 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from islamic_library.catalog import Catalog
+from islamic_library.clientside import CatalogPayload
+from islamic_library.controls import category_options
+
+SCRIPT = Path(__file__).parent.parent / "islamic_library" / "js" / "catalog_filter.js"
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+
+BOOKS = [
+    {"id": 1, "title": "Sahih Al-Bukhari", "author": "Imam Al-Bukhari", "category": "Hadith"},
+    {"id": 2, "title": "صحيح البخاري", "author": "محمد بن إسماعيل البخاري", "category": "Hadith"},
+    {"id": 3, "title": "Ṣaḥīḥ al-Bukhārī", "author": "Muḥammad al-Bukhārī", "category": "Hadith"},
+    {"id": 4, "title": "Riyad us-Saliheen", "author": "Imam An-Nawawi", "category": "Hadith"},
+    {"id": 5, "title": "Été à Médine", "author": "STRAẞE", "category": "History"},
+    {"id": 6, "title": "Men Around the Messenger", "author": "Khalid Muhammad Khalid", "category": "History"},
+    {"id": 7, "title": "The Noble Qur'an", "author": "Divine Revelation", "category": "Quran"},
+    {"id": 8, "title": "القرآن الكريم", "author": "Divine Revelation", "category": "Quran"},
+    {"id": 9, "title": "Tafsir Ibn Kathir", "author": "Ismāʿīl ibn Kathīr", "category": "Quran"},
+]
+
+TERMS = ["", "bukhari", "Al-Bukhārī", "البخاري", "sah", "Ṣaḥīḥ", "é", "strasse", "Koran", "القران",
+         "Nawawi", "mean", "Imam", "kathir", "ibn kat", "bukahri", "messanger", "tafsri ibn",
+         "Riyadh us Salihin", "an nawawi", "us saliheen", "as sahih"]
+
+# Loads the script with the globals Dash provides and answers each query of
+# the request (read as JSON from stdin) with its books and category options
+HARNESS = """
+const fs = require("fs");
+const vm = require("vm");
+const window = {dash_clientside: {callback_context: {triggered: []}}};
+vm.runInNewContext(fs.readFileSync(process.argv[1], "utf8"), {window});
+const request = JSON.parse(fs.readFileSync(0, "utf8"));
+const library = window.dash_clientside.libraryCatalog;
+for (const [term, category] of request.queries) {
+    console.log(JSON.stringify([library.pagedGrid(term, category, 1, 1000, request.catalog)[0],
+                                library.categoryOptions(term, request.catalog, "All Categories")]));
+}
+"""
+
+
+class IdRenderer:
+    # Cards stand in as the ids of their books
+    def render(self, books, keys=None):
+        return [book["id"] for book in books]
+
+
+def run_filter(catalog, queries):
+    payload = json.loads(CatalogPayload(catalog, IdRenderer()).get()[0])
+    result = subprocess.run(["node", "-e", HARNESS, str(SCRIPT)], check=True, capture_output=True,
+                            input=json.dumps({"catalog": payload, "queries": queries}), text=True)
+    return [json.loads(line) for line in result.stdout.splitlines()]
+
+
+def ids(catalog, term, category=None):
+    return [book["id"] for book in catalog.query(term, category=category)]
+
+
+@pytest.mark.parametrize("fuzzy", [False, True])
+def test_matches_the_server(monkeypatch, fuzzy):
+    monkeypatch.setattr("islamic_library.catalog.use_fuzzy", lambda: fuzzy)
+    monkeypatch.setattr("islamic_library.clientside.use_fuzzy", lambda: fuzzy)
+    catalog = Catalog(BOOKS)
+    queries = [[term, category] for term in TERMS for category in ("All", "Hadith")]
+    expected = [[ids(catalog, term, None if category == "All" else category), category_options(catalog, term)]
+                for term, category in queries]
+    assert run_filter(catalog, queries) == expected
+
+
+# Loads js/search_input.js with a stubbed page and fetch, replays callback
+# requests and server responses (read as JSON from stdin) and prints the
+# status each request's caller got, in the order the callers got them
+FETCH_HARNESS = """
+const fs = require("fs");
+const vm = require("vm");
+const pending = {}, settled = [];
+function fetch(url, options) {
+    return new Promise((resolve, reject) => {
+        const name = JSON.parse(options.body).name;
+        pending[name] = resolve;
+        if (options.signal) {
+            options.signal.addEventListener("abort", () => reject(new DOMException("aborted", "AbortError")));
+        }
+    });
+}
+const input = {value: "", addEventListener: () => {}};
+const window = {fetch, Response, AbortController, setTimeout, clearTimeout, dash_clientside: {no_update: null}};
+const document = {getElementById: (id) => (id === "search-input" ? input : null)};
+vm.runInNewContext(fs.readFileSync(process.argv[1], "utf8"), {window, document, Date});
+window.dash_clientside.librarySearch.attach({mode: "debounce", delay: 300});
+
+(async () => {
+    for (const [step, name, output, reads] of JSON.parse(fs.readFileSync(0, "utf8"))) {
+        if (step === "send") {
+            const dependency = {id: reads ? "search-query" : "category-select", property: "data", value: name};
+            const body = JSON.stringify({name, output, inputs: [dependency], state: []});
+            window.fetch("/_dash-update-component", {method: "POST", body}).then(
+                (response) => settled.push([name, response.status]),
+                (error) => settled.push([name, error.name])
+            );
+        } else {
+            pending[name](new Response("{}", {status: 200}));
+        }
+        await new Promise((resolve) => setImmediate(resolve));
+    }
+    console.log(JSON.stringify(settled));
+})();
+"""
+
+SEARCH_SCRIPT = SCRIPT.parent / "search_input.js"
+
+
+def run_requests(steps):
+    result = subprocess.run(["node", "-e", FETCH_HARNESS, str(SEARCH_SCRIPT)], check=True, capture_output=True,
+                            input=json.dumps(steps), text=True)
+    return [tuple(item) for item in json.loads(result.stdout)]
+
+
+def test_stale_search_responses_are_never_applied():
+    # "ib" is answered after "ibn" was sent: its caller gets 204, no update
+    assert run_requests([
+        ["send", "ib", "books-grid", True],
+        ["send", "ibn", "books-grid", True],
+        ["resolve", "ibn"],
+        ["resolve", "ib"],
+    ]) == [("ib", 204), ("ibn", 200)]
+    assert run_requests([
+        ["send", "i", "books-grid", True],
+        ["send", "ib", "books-grid", True],
+        ["send", "ibn", "books-grid", True],
+        ["resolve", "ib"],
+        ["resolve", "ibn"],
+    ]) == [("i", 204), ("ib", 204), ("ibn", 200)]
+
+
+def test_requests_in_turn_and_for_other_outputs_are_kept():
+    assert run_requests([
+        ["send", "ib", "books-grid", True],
+        ["resolve", "ib"],
+        ["send", "ibn", "books-grid", True],
+        ["send", "ibn options", "category-select.options", True],
+        ["send", "hadith", "books-count", False],
+        ["send", "fiqh", "books-count", False],
+        ["resolve", "ibn options"],
+        ["resolve", "ibn"],
+        ["resolve", "fiqh"],
+        ["resolve", "hadith"],
+    ]) == [("ib", 200), ("ibn options", 200), ("ibn", 200), ("fiqh", 200), ("hadith", 200)]
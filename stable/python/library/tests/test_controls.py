@@ -0,0 +1,80 @@
+import shutil
+
+import pytest
+
+from islamic_library.benchmark import run_gate, superseded
+from islamic_library.catalog import Catalog
+from islamic_library.controls import category_options
+from islamic_library.results import MemoryStore
+
+BOOKS = [
+    {"id": 1, "title": "Sahih Al-Bukhari", "author": "Imam Al-Bukhari", "category": "Hadith"},
+    {"id": 2, "title": "Riyad us-Saliheen", "author": "Imam An-Nawawi", "category": "Hadith"},
+    {"id": 3, "title": "The Sealed Nectar", "author": "Safiur Rahman Mubarakpuri", "category": "Seerah"},
+    {"id": 4, "title": "Tafsir Ibn Kathir", "author": "Ibn Kathir", "category": "Quran"},
+]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    catalog = Catalog(BOOKS, source="test")
+    catalog.facet_queries = 0
+    faceted = catalog.faceted
+
+    def counted(*args, **kwargs):
+        catalog.facet_queries += 1
+        return faceted(*args, **kwargs)
+
+    monkeypatch.setattr(catalog, "faceted", counted)
+    return catalog
+
+
+def labels(options):
+    return [option["label"] for option in options]
+
+
+def test_counts_follow_the_search(catalog):
+    assert labels(category_options(catalog, "imam")) == [
+        "All Categories (2)", "Hadith (2)", "Seerah (0)", "Quran (0)"
+    ]
+
+
+def test_no_search_uses_the_catalog_counts(catalog):
+    assert labels(category_options(catalog)) == [
+        "All Categories (4)", "Hadith (2)", "Seerah (1)", "Quran (1)"
+    ]
+    assert catalog.facet_queries == 0
+
+
+def test_searches_are_counted_once_per_generation(catalog):
+    cache = MemoryStore()
+    first = category_options(catalog, "kathir", cache=cache)
+    assert category_options(catalog, "kathir", cache=cache) == first
+    assert catalog.facet_queries == 1
+
+    catalog.apply({5: {"id": 5, "title": "Stories of the Prophets", "author": "Ibn Kathir", "category": "Seerah"}})
+    assert labels(category_options(catalog, "kathir", cache=cache))[:3] == [
+        "All Categories (2)", "Hadith (0)", "Seerah (1)"
+    ]
+    assert catalog.facet_queries == 2
+
+
+# Typing "ibn" with 100 ms between keystrokes, a pause, then Enter
+TYPING = [(1000, "input", "i"), (1100, "input", "ib"), (1200, "input", "ibn"), (2000, "enter", None)]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+@pytest.mark.parametrize("mode, expected", [
+    ("live", [(1000, "i"), (1100, "ib"), (1200, "ibn")]),
+    ("debounce", [(1500, "ibn")]),
+    ("throttle", [(1000, "i"), (1300, "ibn")]),
+    ("submit", [(2000, "ibn")]),
+])
+def test_search_gate(mode, expected):
+    assert run_gate(TYPING, mode, 300) == expected
+
+
+def test_superseded_requests():
+    sends = [(0, "i"), (100, "ib"), (400, "ibn")]
+    assert superseded(sends, 150) == 1
+    assert superseded(sends, 50) == 0
@@ -0,0 +1,120 @@
+import random
+
+import numpy as np
+import pytest
+
+from islamic_library.catalog import LIST_FIELDS, Catalog
+from islamic_library.facets import ARRAY_LIMIT, CHUNK_BITS, FACETS, Bitmap, published_label
+from islamic_library.repository import SQLiteCatalog
+
+TAGS = ["hadith", "sunnah", "fiqh", "tafsir", "history"]
+LANGUAGES = ["Arabic", "English", "Urdu", "French"]
+LEVELS = ["Beginner", "Intermediate", "Advanced", None]
+
+
+def make_books(count, seed=7):
+    rng = random.Random(seed)
+    return [{"id": number, "title": f"Book {number}", "author": rng.choice(["Nawawi", "Bukhari", "Malik"]),
+             "category": rng.choice(["Hadith", "Quran", "Fiqh", None]),
+             "tags": rng.sample(TAGS, rng.randint(0, 3)),
+             "languages": rng.sample(LANGUAGES, rng.randint(1, 2)),
+             "difficulty": rng.choice(LEVELS),
+             "complexity": rng.choice(LEVELS),
+             "published": rng.choice([0, None, 610, 699, 700, 870, 1277, 1990, 2005])}
+            for number in range(1, count + 1)]
+
+
+def facet_values(book, facet):
+    # The values of ``facet`` a book holds, as the facet index groups them
+    value = book.get(facet)
+    if facet == "published":
+        return {published_label(value)} if isinstance(value, int) and value > 0 else set()
+    if facet in LIST_FIELDS:
+        return set(value or ())
+    return set() if value is None else {value}
+
+
+def brute_force(books, selection, skip=None):
+    # Books holding any of the selected values of every facet but ``skip``
+    return [book for book in books
+            if all(facet_values(book, facet) & set(values) for facet, values in selection.items() if facet != skip)]
+
+
+def brute_counts(books, selection):
+    counts = {}
+    for facet in FACETS:
+        found = {}
+        for book in brute_force(books, selection, skip=facet):
+            for value in facet_values(book, facet):
+                found[value] = found.get(value, 0) + 1
+        counts[facet] = found
+    return counts
+
+
+def selections(seed=11, count=40):
+    rng = random.Random(seed)
+    pools = {"category": ["Hadith", "Quran", "Fiqh"], "tags": TAGS, "languages": LANGUAGES,
+             "difficulty": LEVELS[:-1], "complexity": LEVELS[:-1],
+             "published": [published_label(year) for year in (610, 700, 870, 1277, 1990)]}
+    result = [{}]
+    for _ in range(count):
+        facets = rng.sample(FACETS, rng.randint(1, 3))
+        result.append({facet: rng.sample(pools[facet], rng.randint(1, 2)) for facet in facets})
+    return result
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def catalog(request, tmp_path):
+    books = make_books(300)
+    if request.param == "memory":
+        return Catalog(books), books
+    return SQLiteCatalog(str(tmp_path / "catalog.db")).reload(books), books
+
+
+def test_faceted_queries_match_a_brute_force_filter(catalog):
+    catalog, books = catalog
+    for selection in selections():
+        expected = [book["id"] for book in brute_force(books, selection)]
+        assert [book["id"] for book in catalog.query(facets=selection)] == expected, selection
+        view, counts = catalog.faceted(facets=selection)
+        assert [book["id"] for book in view] == expected, selection
+        assert counts == brute_counts(books, selection), selection
+
+
+def test_facets_combine_with_search_and_category(catalog):
+    catalog, books = catalog
+    scope = [book for book in books if "Nawawi" in book["author"]]
+    selection = {"tags": ["fiqh", "sunnah"], "published": [published_label(1990)]}
+    view, counts = catalog.faceted("nawawi", category="Hadith", facets=selection)
+    expected = brute_force(scope, {**selection, "category": ["Hadith"]})
+    assert [book["id"] for book in view] == [book["id"] for book in expected]
+    assert counts == brute_counts(scope, {**selection, "category": ["Hadith"]})
+
+
+def test_published_facet_groups_years_into_ranges(catalog):
+    catalog, books = catalog
+    _, counts = catalog.faceted(fields=("published",))
+    assert set(counts["published"]) == {"600–699", "700–799", "800–899", "1200–1299", "1900–1999", "2000–2099"}
+    assert sum(counts["published"].values()) == sum(1 for book in books if book["published"])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bitmap_operations_match_sets(seed):
+    rng = np.random.default_rng(seed)
+    # Sparse chunks keep arrays, dense ones bitsets; both kinds meet in every operation
+    size = 3 << CHUNK_BITS
+
+    def sample():
+        dense = rng.choice(1 << CHUNK_BITS, ARRAY_LIMIT * 3, replace=False)
+        sparse = rng.choice(np.arange(1 << CHUNK_BITS, size), rng.integers(0, ARRAY_LIMIT), replace=False)
+        return set(dense[:rng.integers(0, len(dense))].tolist()) | set(sparse.tolist())
+
+    first, second = sample(), sample()
+    a, b = Bitmap.from_rows(sorted(first)), Bitmap.from_rows(sorted(second))
+    assert len(a) == len(first)
+    assert a.rows().tolist() == sorted(first)
+    assert (a & b).rows().tolist() == sorted(first & second)
+    assert (a | b).rows().tolist() == sorted(first | second)
+    assert a.intersection_size(b) == len(first & second)
+    probe = rng.integers(0, size, 2000)
+    assert a.contains(probe).tolist() == [int(row) in first for row in probe]
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from islamic_library.analysis import search_key
+from islamic_library.catalog import Catalog
+from islamic_library.fuzzy import FuzzyIndex, edit_distance, max_distance
+from islamic_library.repository import SQLiteCatalog
+
+BOOKS = [
+    {"id": 1, "title": "Riyad us-Saliheen", "author": "Imam An-Nawawi", "category": "Hadith"},
+    {"id": 2, "title": "Sahih Al-Bukhari", "author": "Imam Al-Bukhari", "category": "Hadith"},
+    {"id": 3, "title": "Tafsir Ibn Kathir", "author": "Ibn Kathir", "category": "Quran"},
+    {"id": 4, "title": "The Sealed Nectar", "author": "Safiur Rahman Mubarakpuri", "category": "Seerah"},
+    {"id": 5, "title": "Fortress of the Muslim", "author": "Saeed Al-Qahtani", "category": "Dua"},
+    {"id": 6, "title": "Men Around the Messenger", "author": "Khalid Muhammad Khalid", "category": "Seerah"},
+]
+
+
+def brute_distance(a, b):
+    # Optimal string alignment distance, without any early exit
+    table = [[i + j if not i or not j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            table[i][j] = min(table[i - 1][j] + 1, table[i][j - 1] + 1, table[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                table[i][j] = min(table[i][j], table[i - 2][j - 2] + 1)
+    return table[-1][-1]
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("bukhari", "bukhari", 0),
+    ("bukhari", "bukhary", 1),
+    ("bukhari", "bukahri", 1),
+    ("messenger", "messanger", 1),
+    ("nawawi", "nawai", 1),
+    ("salihin", "saliheen", 2),
+    ("kathir", "", 6),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 10) == distance
+
+
+def test_edit_distance_stops_past_the_limit():
+    rng = random.Random(3)
+    for _ in range(500):
+        a = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 8)))
+        limit = rng.randint(0, 3)
+        assert edit_distance(a, b, limit) == min(brute_distance(a, b), limit + 1), (a, b, limit)
+
+
+def test_longer_words_allow_more_typos():
+    assert [max_distance(length) for length in range(1, 10)] == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+
+
+def test_lookup_finds_exactly_the_words_within_bounds():
+    rng = random.Random(5)
+    words = sorted({"".join(rng.choice("abcdeh") for _ in range(rng.randint(2, 12))) for _ in range(400)})
+    index = FuzzyIndex([{"title": word} for word in words], fields=("title",))
+    for _ in range(200):
+        query = rng.choice(words)
+        query = "".join(char for char in query if rng.random() > 0.15) or query
+        limit = max_distance(len(query))
+        expected = {word for word in index.vocab if brute_distance(query, word) <= limit}
+        found = {index.vocab[position] for position in index.lookup(query)}
+        # Words sharing the query's search key match too, whatever their distance
+        assert expected <= found, query
+        assert all(search_key(word) == search_key(query) for word in found - expected), query
+
+
+def test_prefix_lookup_completes_the_last_word():
+    index = FuzzyIndex(BOOKS)
+    assert {index.vocab[position] for position in index.lookup("bukh", prefix=True)} == {"bukhari"}
+    assert index.search(["sahih", "bukh"]).tolist() == [1]
+    assert index.search(["sahih", "kathir"]).tolist() == []
+
+
+def test_search_needs_every_word_and_returns_rows_in_order():
+    index = FuzzyIndex(BOOKS)
+    assert index.search(["imam"]).tolist() == [0, 1]
+    assert index.search(["imma", "nawaw"]).tolist() == [0]
+    assert index.search(["kathr", "tafsri"]).tolist() == [2]
+
+
+@pytest.fixture
+def database(tmp_path):
+    return SQLiteCatalog(str(tmp_path / "catalog.db")).reload(BOOKS)
+
+
+@pytest.mark.parametrize("term", ["Riyadh us Salihin", "Riyadh us Salihen", "bukhary", "imma nawaw", "messanger",
+                                  "tafsri ibn", "the seald nectr", "zzzz", "!!"])
+@pytest.mark.parametrize("ranked", [False, True])
+def test_sqlite_falls_back_like_memory(database, term, ranked):
+    memory = Catalog(BOOKS)
+    assert [book["id"] for book in database.query(term, ranked=ranked)] == \
+        [book["id"] for book in memory.query(term, ranked=ranked)]
+    assert database.faceted(term, ranked=ranked)[1]["category"] == memory.faceted(term, ranked=ranked)[1]["category"]
+
+
+def test_sqlite_finds_the_request_example(database):
+    assert [book["id"] for book in database.query("Riyadh us Salihin")] == [1]
+    assert [book["id"] for book in database.query("Riyadh us Salihen", category="Hadith")] == [1]
+
+
+def test_sqlite_fallback_follows_changes(database):
+    assert [book["id"] for book in database.query("bukhary")] == [2]
+    database.reload(BOOKS[2:] + [{"id": 7, "title": "Mukhtasar Sahih Bukhari", "author": "Az-Zabidi"}])
+    database.warm()
+    assert [book["id"] for book in database.query("bukhary")] == [7]
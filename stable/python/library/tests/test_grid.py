@@ -0,0 +1,41 @@
+from islamic_library.catalog import Catalog
+from islamic_library.grid import BookGrid
+from islamic_library.results import MemoryStore, ResultCache
+
+BOOKS = [{"id": number, "title": f"Book {number}", "author": "Author", "category": "Hadith"}
+         for number in range(1, 31)]
+
+
+class IdRenderer:
+    cache = None
+    renders = 0
+
+    def render(self, books, keys=None):
+        self.renders += 1
+        return [book["id"] for book in books]
+
+
+def book_grid():
+    return BookGrid(Catalog(BOOKS, source="test"), IdRenderer(), ResultCache(MemoryStore()), chunk=12, window=24)
+
+
+def test_pages_are_rendered_once():
+    grid = book_grid()
+    assert grid.page("book", None, 3, 12) == ([25, 26, 27, 28, 29, 30], "Showing 25–30 of 30 books", 3, 3)
+    assert grid.page(" BOOK ", "All", 3, 12)[0] == [25, 26, 27, 28, 29, 30]
+    assert grid.renderer.renders == 1
+
+
+def test_pages_past_the_end_show_the_last_one():
+    assert book_grid().page(None, None, 9, 24)[1:] == ("Showing 25–30 of 30 books", 2, 2)
+
+
+def test_no_results():
+    assert book_grid().page("tafsir", None, 1, 12) == ([], "No books found", 1, 1)
+
+
+def test_windows_start_at_a_chunk():
+    cards, count, placement = book_grid().render_window("book", "All", 17, True)
+    assert cards == list(range(13, 31))
+    assert count == "Showing 13–30 of 30 books"
+    assert placement == {"offset": 12, "size": 18, "total": 30, "reset": False}
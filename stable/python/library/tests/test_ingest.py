@@ -0,0 +1,145 @@
+import io
+
+import pytest
+
+from islamic_library.ingest import InvalidRecord, ingest, parse_marc, read_csv, read_marc, validate
+from islamic_library.repository import SQLiteCatalog
+
+
+def marc_record(fields, encoding="a"):
+    # ISO 2709: leader, a 12-byte directory entry per field, then the fields
+    data = b""
+    directory = b""
+    for tag, value in fields:
+        if not tag.startswith("00"):
+            indicators, *subfields = value
+            value = indicators + "".join(f"\x1f{code}{text}" for code, text in subfields)
+        encoded = value.encode("utf-8") + b"\x1e"
+        directory += f"{tag}{len(encoded):04d}{len(data):05d}".encode("ascii")
+        data += encoded
+    base = 24 + len(directory) + 1
+    length = base + len(data) + 1
+    leader = f"{length:05d}nam {encoding}22{base:05d} a 4500".encode("ascii")
+    return leader + directory + b"\x1e" + data + b"\x1d"
+
+
+FIXED = "990101s1999    sa            000 0 ara d"
+
+NAWAWI = marc_record([
+    ("001", "ocm00012345"),
+    ("008", FIXED),
+    ("041", ("0 ", ("a", "ara"), ("a", "eng"))),
+    ("100", ("1 ", ("a", "Nawawi,"), ("d", "1233-1277."))),
+    ("245", ("10", ("a", "Riyāḍ aṣ-ṣāliḥīn :"), ("b", "gardens of the righteous /"), ("c", "an-Nawawi."))),
+    ("264", (" 1", ("a", "Riyadh :"), ("b", "Darussalam,"), ("c", "c1999."))),
+    ("300", ("  ", ("a", "xii, 1150 p. ;"), ("c", "24 cm."))),
+    ("520", ("  ", ("a", "Sayings of the Prophet arranged by subject."),)),
+    ("650", (" 0", ("a", "Hadith."), ("x", "Texts."))),
+    ("650", (" 0", ("a", "Ethics."),)),
+])
+
+
+def test_marc_record_maps_to_the_schema():
+    assert parse_marc(NAWAWI) == {
+        "id": 12345,
+        "title": "Riyāḍ aṣ-ṣāliḥīn: gardens of the righteous",
+        "author": "Nawawi",
+        "category": "Hadith",
+        "description": "Sayings of the Prophet arranged by subject",
+        "language": "ara",
+        "languages": ["ara", "eng"],
+        "tags": ["Hadith", "Ethics"],
+        "published": "1999",
+        "pages": 1150,
+    }
+
+
+@pytest.mark.parametrize("control, expected", [("12345", 12345), ("00012345", 12345), ("ocm00012345", 12345)])
+def test_marc_ids_are_integers(control, expected):
+    record = parse_marc(marc_record([("001", control), ("245", ("00", ("a", "Title")))]))
+    assert record["id"] == expected
+
+
+@pytest.mark.parametrize("control", ["12345", "BOOK-7"])
+def test_marc_and_csv_ids_agree(control):
+    samples = {"title": "Title", "author": "Unknown", "category": "Hadith"}
+    marc = parse_marc(marc_record([("001", control)]))
+    csv_record = next(read_csv(io.BytesIO(f"id\n{control}\n".encode())))
+    if control.isdigit():
+        assert validate({**marc, **samples}, {})["id"] == validate({**csv_record, **samples}, {})["id"] == 12345
+    else:
+        # Neither reader lets an id through that is not a number
+        for raw in (marc, csv_record):
+            with pytest.raises(InvalidRecord, match="id: expected int"):
+                validate({**raw, **samples}, {})
+
+
+def test_latin1_records_and_malformed_ones_in_a_stream():
+    # A blank leader position 9 marks MARC-8, read as Latin-1
+    latin = marc_record([("001", "2"), ("245", ("00", ("a", "Café")))], encoding=" ")
+    latin = latin.replace("Café".encode("utf-8"), "Café".encode("latin-1"))
+    latin = f"{len(latin):05d}".encode("ascii") + latin[5:]
+    records = list(read_marc(io.BytesIO(NAWAWI + b"garbage\x1d" + latin)))
+    assert records[0]["id"] == 12345
+    assert isinstance(records[1], InvalidRecord)
+    assert records[2]["title"] == "Café"
+
+
+CSV = """id,title,author,category,rating,published,tags
+1,Sahih Al-Bukhari,Imam Al-Bukhari,Hadith,4.9,846,hadith|sunnah
+2,Riyad us-Saliheen,,Hadith,4.8,1277,hadith
+3,Tafsir Ibn Kathir,Ibn Kathir,Quran,nine,1370,tafsir
+x4,The Sealed Nectar,Safiur Rahman Mubarakpuri,Seerah,4.7,1979,seerah
+5,Fortress of the Muslim,Saeed Al-Qahtani,Dua,6,1988,dua
+6,Men Around the Messenger,Khalid Muhammad Khalid,Seerah,4.6,soon,seerah
+7,Sahih Muslim,Imam Muslim,Hadith,4.9,875,hadith
+"""
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return SQLiteCatalog(str(tmp_path / "catalog.db"))
+
+
+def load(catalog, text, **options):
+    return ingest(read_csv(io.BytesIO(text.encode("utf-8"))), catalog, **options)
+
+
+def test_invalid_csv_rows_are_skipped_and_reported(catalog, capsys):
+    assert load(catalog, CSV) == (2, 5)
+    assert [book["id"] for book in catalog.query()] == [1, 7]
+    assert list(catalog.query("bukhari"))[0]["tags"] == ["hadith", "sunnah"]
+    report = capsys.readouterr().err.splitlines()
+    assert report == [
+        "skipped record 2: author: missing",
+        "skipped record 3: rating: expected float, got 'nine'",
+        "skipped record 4: id: expected int, got 'x4'",
+        "skipped record 5: rating: 6.0 outside 0-5",
+        "skipped record 6: published: expected int, got 'soon'",
+    ]
+
+
+def test_strict_ingest_stops_at_the_first_invalid_row(catalog):
+    with pytest.raises(InvalidRecord, match="record 2: author: missing"):
+        load(catalog, CSV, strict=True)
+    # Nothing of the failed load is kept
+    assert len(catalog) == 0
+
+
+def test_loading_the_same_export_again_changes_nothing(catalog):
+    load(catalog, CSV)
+    books = list(catalog.query())
+    rows = catalog.records_at(range(1, 10))
+    seq = catalog.last_change()
+
+    assert load(catalog, CSV) == (2, 5)
+    assert list(catalog.query()) == books
+    assert catalog.records_at(range(1, 10)) == rows
+    assert catalog.changes_since(seq) == []
+    assert list(catalog.query("sahih muslim"))[0]["id"] == 7
+
+    # A changed book keeps its row and is logged once
+    load(catalog, CSV.replace("Sahih Muslim,Imam Muslim", "Sahih Muslim,Imam Muslim ibn al-Hajjaj"))
+    assert len(catalog) == 2
+    assert [(row, op) for _, row, op in catalog.changes_since(seq)] == [(2, "upsert")]
+    assert list(catalog.query("hajjaj"))[0]["id"] == 7
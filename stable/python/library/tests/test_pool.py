@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from islamic_library import pool as pool_module
+from islamic_library.pool import ConnectionPool
+
+
+class Connection:
+    opened = 0
+
+    def __init__(self):
+        Connection.opened += 1
+        self.number = Connection.opened
+
+
+@pytest.fixture
+def pool():
+    Connection.opened = 0
+    return ConnectionPool(Connection, size=2, timeout=0.2)
+
+
+def test_connections_are_reused(pool):
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first is not second
+    with pool.connection() as again:
+        assert again in (first, second)
+    assert pool.stats()["open"] == 2 and Connection.opened == 2
+
+
+def test_connections_come_back_when_the_block_raises(pool):
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            with pool.connection():
+                raise RuntimeError("query failed")
+    stats = pool.stats()
+    assert stats["in_use"] == 0 and stats["idle"] == 1 and Connection.opened == 1
+    # Both connections can still be checked out together
+    with pool.connection(), pool.connection():
+        assert pool.stats()["in_use"] == 2
+
+
+def test_failed_connects_free_their_place(pool):
+    def refuse():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    pool._connect = refuse
+    for _ in range(3):
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection():
+                pass
+    assert pool.stats()["open"] == 0 and pool.stats()["in_use"] == 0
+
+
+def test_waiters_get_a_returned_connection_or_time_out(pool):
+    received = []
+
+    def wait():
+        with pool.connection() as connection:
+            received.append(connection)
+
+    with pool.connection() as first:
+        with pool.connection():
+            with pytest.raises(TimeoutError):
+                with pool.connection():
+                    pass
+            pool.timeout = 5
+            waiter = threading.Thread(target=wait)
+            waiter.start()
+            waiter.join(0.1)
+            assert not received
+        waiter.join(5)
+    assert len(received) == 1 and received[0] is not first
+    assert pool.stats()["waits"] == 2 and Connection.opened == 2
+
+
+def test_connections_are_opened_again_after_a_fork(pool, monkeypatch):
+    with pool.connection() as parent:
+        pass
+    child_pid = os.getpid() + 1
+    monkeypatch.setattr(pool_module.os, "getpid", lambda: child_pid)
+    with pool.connection() as child:
+        assert child is not parent
+    # The parent's connections are set aside, neither used nor closed
+    assert parent in pool_module._inherited
+    assert pool.stats()["open"] == 1 and pool.stats()["checkouts"] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_a_forked_child_opens_its_own_connections(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), size=1)
+    with pool.connection() as connection, connection:
+        connection.execute("CREATE TABLE books (id INTEGER)")
+    with pool.connection() as parent:
+        parent_id = id(parent)
+    reader, writer = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            with pool.connection() as child, child:
+                child.execute("INSERT INTO books VALUES (1)")
+                fresh = id(child) != parent_id
+            os.write(writer, b"1" if fresh else b"0")
+        finally:
+            os._exit(0)
+    os.close(writer)
+    assert os.read(reader, 1) == b"1"
+    os.waitpid(pid, 0)
+    with pool.connection() as connection:
+        assert connection.execute("SELECT id FROM books").fetchall() == [(1,)]
+        assert id(connection) == parent_id
@@ -0,0 +1,103 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from islamic_library.catalog import Catalog
+from islamic_library.ranking import (BM25_B, BM25_K1, RANK_FIELDS, SCORE_TOLERANCE, RankIndex, bm25_scores,
+                                     tokenize, top_rows)
+
+WORDS = ["prophet", "prayer", "prayers", "fasting", "fiqh", "history", "light", "garden", "journey", "mercy"]
+
+
+def make_books(count, seed=9):
+    rng = random.Random(seed)
+
+    def text(low, high):
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+    return [{"id": number, "title": text(1, 4), "author": text(1, 2), "description": text(0, 12)}
+            for number in range(1, count + 1)]
+
+
+def brute_scores(books, query):
+    # BM25F as the ranking promises it: every query word in some field, the
+    # last one as a prefix; field frequencies boosted and length-normalized
+    words = tokenize(query)
+    lengths = {field: [len(tokenize(book.get(field))) for book in books] for field in RANK_FIELDS}
+    average = {field: sum(values) / len(books) for field, values in lengths.items()}
+
+    def frequency(book, field, word, prefix):
+        return sum(token.startswith(word) if prefix else token == word for token in tokenize(book.get(field)))
+
+    scores = [0.0] * len(books)
+    for position, word in enumerate(words):
+        prefix = position == len(words) - 1
+        holders = [any(frequency(book, field, word, prefix) for field in RANK_FIELDS) for book in books]
+        df = sum(holders)
+        idf = math.log(1 + (len(books) - df + 0.5) / (df + 0.5))
+        for row, book in enumerate(books):
+            if not holders[row]:
+                scores[row] = None
+            if scores[row] is None:
+                continue
+            weight = sum(boost * frequency(book, field, word, prefix)
+                         / (1 - BM25_B + BM25_B * lengths[field][row] / average[field])
+                         for field, boost in RANK_FIELDS.items())
+            scores[row] += idf * weight / (BM25_K1 + weight)
+    return [score or 0.0 for score in scores]
+
+
+@pytest.mark.parametrize("query", ["prophet", "mercy garden", "pray", "prayer jour", "fiqh history light", "zzz"])
+def test_scores_match_a_brute_force_bm25f(query):
+    books = make_books(200)
+    # Two segments, as after a watcher update, share their statistics
+    indexes = [RankIndex(books[:150]), RankIndex(books[150:])]
+    scores = np.concatenate(bm25_scores(indexes, query))
+    assert np.allclose(scores, brute_scores(books, query))
+
+
+def test_fields_are_weighted_by_their_boost():
+    books = [
+        {"id": 1, "title": "Light", "author": "Anonymous", "description": "A book of mercy"},
+        {"id": 2, "title": "Light", "author": "Mercy", "description": "A book"},
+        {"id": 3, "title": "Mercy", "author": "Anonymous", "description": "A book of light"},
+    ]
+    scores = bm25_scores([RankIndex(books)], "mercy")[0]
+    # Title (3) over author (2) over description (1)
+    assert scores[2] > scores[1] > scores[0] > 0
+    assert [book["id"] for book in Catalog(books).query("mercy", ranked=True)] == [3, 2, 1]
+
+
+def test_ranked_results_come_best_first():
+    books = make_books(300)
+    catalog = Catalog(books)
+    scores = brute_scores(books, "prayer mercy")
+    expected = sorted((row for row, score in enumerate(scores) if score),
+                      key=lambda row: (-round(scores[row] / SCORE_TOLERANCE), row))
+    assert [book["id"] for book in catalog.query("prayer mercy", ranked=True)] == [books[row]["id"] for row in expected]
+
+
+def full_sort(rows, scores, order):
+    return rows[np.lexsort((order, -np.round(scores / SCORE_TOLERANCE)))]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_top_rows_is_a_prefix_of_the_full_sort(seed):
+    rng = np.random.default_rng(seed)
+    size = 500
+    rows = rng.permutation(size).astype(np.int32)
+    # Few distinct scores, so ties are common; noise below the tolerance must not split them
+    scores = rng.integers(0, 6, size) * 0.5 + rng.uniform(-1, 1, size) * SCORE_TOLERANCE / 10
+    order = rng.permutation(size)
+    expected = full_sort(rows, scores, order)
+    for count in (1, 7, 50, 137, size - 1, size, size + 10):
+        assert top_rows(rows, scores, order, count).tolist() == expected[:count].tolist(), count
+
+
+def test_ties_keep_catalog_order():
+    rows = np.array([10, 11, 12, 13])
+    scores = np.array([1.0 + SCORE_TOLERANCE / 10, 2.0, 1.0, 2.0])
+    order = np.array([3, 2, 1, 0])
+    assert top_rows(rows, scores, order, 4).tolist() == [13, 11, 12, 10]
@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+from islamic_library import repository
+from islamic_library.catalog import Catalog
+from islamic_library.ingest import ingest
+from islamic_library.repository import SQLiteCatalog
+
+BOOKS = [
+    {"id": 1, "title": "Été à Médine", "author": "Émile Dermenghem", "category": "Seerah"},
+    {"id": 2, "title": "STRAẞE", "author": "Ünal", "category": "Other"},
+    {"id": 3, "title": "Sahih Al-Bukhari", "author": "Imam Al-Bukhari", "category": "Hadith"},
+    {"id": 4, "title": "صحيح البخاري", "author": "البخاري", "category": "Hadith"},
+    {"id": 5, "title": "Ṣaḥīḥ Muslim", "author": "Muslim ibn al-Ḥajjāj", "category": "Hadith"},
+    {"id": 6, "title": "Riyad us-Saliheen", "author": "Imam An-Nawawi", "category": "Hadith"},
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    return SQLiteCatalog(str(tmp_path / "catalog.db")).reload(BOOKS)
+
+
+def ids(books):
+    return [book["id"] for book in books]
+
+
+@pytest.mark.parametrize("term", ["é", "É", "ün", "ss", "Médine", "ÉTÉ", "al"])
+def test_short_and_long_terms_fold_like_memory(database, term):
+    assert ids(database.query(term)) == ids(Catalog(BOOKS).query(term))
+
+
+@pytest.mark.parametrize("term", ["Bukhari", "al-Bukhari", "bukhaari", "البخاري", "Ṣaḥīḥ", "sah", "sahih",
+                                  "Saheeh Muslim", "salihin", "nawawi", "a", "ṣ"])
+def test_search_keys_match_like_memory(database, term):
+    assert ids(database.query(term)) == ids(Catalog(BOOKS).query(term))
+
+
+def test_ranked_search_matches_keys(database):
+    assert sorted(ids(database.query("bukhari", ranked=True))) == [3, 4]
+    # Rows only the key finds come after those the term's own spelling finds
+    assert ids(database.query("sahih", ranked=True))[-2:] == [4, 5]
+
+
+def test_search_keys_are_recomputed_when_the_analysis_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.db")
+    version = SQLiteCatalog(path).reload(BOOKS).version
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE books SET key_title = '', key_author = ''")
+    monkeypatch.setattr(repository, "ANALYSIS_VERSION", repository.ANALYSIS_VERSION + 1)
+    catalog = SQLiteCatalog(path)
+    assert ids(catalog.query("البخاري")) == [3, 4]
+    assert catalog.version == version + 1
+
+
+def test_old_schema_is_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as connection:
+        connection.executescript("""
+            CREATE TABLE books (row INTEGER PRIMARY KEY, id INTEGER, title TEXT, author TEXT,
+                                category TEXT, description TEXT, fingerprint TEXT NOT NULL,
+                                record TEXT NOT NULL);
+            CREATE VIRTUAL TABLE books_fts USING fts5(title, author, description,
+                                                      content='books', content_rowid='row',
+                                                      tokenize='trigram');
+            CREATE TABLE book_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, row INTEGER NOT NULL,
+                                       op TEXT NOT NULL);
+            INSERT INTO books (id, title, author, fingerprint, record)
+            VALUES (1, 'Ete', 'A', 'f', '{"id": 1, "title": "Ete", "author": "A"}'),
+                   (1, 'Été', 'A', 'f', '{"id": 1, "title": "Été", "author": "A"}');
+        """)
+    catalog = SQLiteCatalog(path)
+    assert ids(catalog.query("é")) == [1]
+    assert ids(catalog.query("été")) == [1]
+    # The duplicate left by an earlier append ingest is gone; the latest copy stays
+    assert [book["title"] for book in catalog.query()] == ["Été"]
+    assert catalog.last_change() == 1
+
+
+def test_appending_a_book_again_updates_it(database):
+    last_change = database.last_change()
+    books = [{**BOOKS[2], "title": "Sahih Bukhari Complete"},
+             {"id": 7, "title": "Al-Muwatta", "author": "Imam Malik", "category": "Fiqh"}]
+    assert ingest(books, database) == (2, 0)
+    assert ids(database.query()) == [1, 2, 3, 4, 5, 6, 7]
+    assert ids(database.query("complete")) == [3]
+    assert ids(database.query("muwatta")) == [7]
+    assert database.last_change() == last_change + 2
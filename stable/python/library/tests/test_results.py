@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+
+import pytest
+from dash import html
+
+from islamic_library.results import (_SEQUENCE, DiskStore, MemoryStore, ResultCache, SharedStore, open_result_cache,
+                                     private_directory)
+
+RESULT = ([html.Div([html.H5("Sahih Al-Bukhari"), "Imam Al-Bukhari"], className="card")], "Showing 1–1 of 1 books",
+          1, 1)
+
+
+def test_memory_cache_touches_no_files(tmp_path):
+    cache = open_result_cache("app", backend="memory", path=str(tmp_path / "results"))
+    key = cache.key(("test", 1), "grid", "")
+    cache.get_or_compute(key, lambda: RESULT)
+    cache._write_counts()
+    assert not (tmp_path / "results").exists()
+    assert cache.get_or_compute(key, lambda: None) == RESULT
+
+
+@pytest.mark.parametrize("backend", ["disk", "shared"])
+def test_shared_results_are_read_back_as_json(tmp_path, backend):
+    cache = open_result_cache("app", backend=backend, path=str(tmp_path / "results"))
+    key = cache.key(("test", 1), "grid", "")
+    cache.get_or_compute(key, lambda: RESULT)
+    cards, count, page, pages = cache.store.get(key)
+    # Components come back as the JSON Dash sends for them
+    assert cards == [{"type": "Div", "namespace": "dash_html_components", "props": {
+        "children": [{"type": "H5", "namespace": "dash_html_components", "props": {"children": "Sahih Al-Bukhari"}},
+                     "Imam Al-Bukhari"],
+        "className": "card"}}]
+    assert (count, page, pages) == RESULT[1:]
+
+
+def test_each_app_gets_a_private_directory(tmp_path):
+    first = open_result_cache("first", backend="disk", path=str(tmp_path / "results"))
+    second = open_result_cache("second", backend="disk", path=str(tmp_path / "results"))
+    assert first.stats_dir != second.stats_dir
+    for path in (tmp_path / "results", first.stats_dir):
+        assert os.stat(path).st_mode & 0o777 == 0o700
+
+
+def test_directories_others_can_write_are_refused(tmp_path):
+    path = tmp_path / "results"
+    path.mkdir(mode=0o777)
+    os.chmod(path, 0o777)
+    with pytest.raises(PermissionError):
+        private_directory(str(path))
+    with pytest.raises(PermissionError):
+        open_result_cache("app", backend="shared", path=str(path))
+
+
+def test_links_in_place_of_the_shared_file_are_not_followed(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.write_bytes(b"")
+    os.symlink(target, tmp_path / "results.shm")
+    with pytest.raises(OSError):
+        SharedStore(str(tmp_path / "results.shm"), slots=4, slot_bytes=1024)
+
+
+def test_disk_store_keeps_the_newest_results(tmp_path):
+    store = DiskStore(str(tmp_path / "results.db"), maxsize=8)
+    for number in range(20):
+        store.put(bytes([number]) * 16, [number])
+    assert store.get(bytes([19]) * 16) == [19]
+    assert store.stats()["size"] <= 8 + 8 // 8
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def run_together(cache, key, compute, count=10):
+    # ``count`` threads asking for ``key`` at once; what each got, or raised
+    outcomes = [None] * count
+
+    def ask(number):
+        try:
+            outcomes[number] = cache.get_or_compute(key, compute)
+        except Exception as error:
+            outcomes[number] = error
+
+    threads = [threading.Thread(target=ask, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache(MemoryStore())
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return RESULT
+
+    threads, outcomes = run_together(cache, b"k" * 16, compute)
+    # Every thread but the one computing waits for it
+    wait_for(lambda: cache.coalesced == 9)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1 and outcomes == [RESULT] * 10
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 9, 0)
+    assert cache.get_or_compute(b"k" * 16, lambda: None) == RESULT and cache.hits == 1
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_waiters_get_the_error_of_a_failed_computation():
+    cache = ResultCache(MemoryStore())
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise RuntimeError("catalog unavailable")
+
+    threads, outcomes = run_together(cache, b"k" * 16, compute)
+    wait_for(lambda: cache.coalesced == 9)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    # Nothing was stored and nothing is left in flight: the next lookup computes again
+    assert cache.stats()["in_flight"] == 0
+    assert cache.get_or_compute(b"k" * 16, lambda: RESULT) == RESULT and cache.misses == 2
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return SharedStore(str(tmp_path / "results.shm"), slots=4, slot_bytes=1024)
+
+
+def test_shared_slots_written_midway_read_as_missing(shared):
+    key = b"a" * 16
+    shared.put(key, [1, 2, 3])
+    sequence = _SEQUENCE.unpack_from(shared._map, 0)[0]
+    assert sequence % 2 == 0 and shared.get(key) == [1, 2, 3]
+    # A writer midway (or one that died there) leaves the number odd
+    _SEQUENCE.pack_into(shared._map, shared._slot(key), sequence + 1)
+    assert shared.get(key) is None
+    shared.put(key, [4])
+    assert shared.get(key) == [4] and _SEQUENCE.unpack_from(shared._map, shared._slot(key))[0] % 2 == 0
+    # Another key hashing to the slot takes it over
+    other = (int.from_bytes(key[:8], "little") + 4).to_bytes(8, "little") + b"b" * 8
+    shared.put(other, [5])
+    assert shared.get(key) is None and shared.get(other) == [5]
+
+
+def test_results_too_large_for_a_slot_are_not_shared(shared):
+    shared.put(b"a" * 16, "x" * 2000)
+    assert shared.get(b"a" * 16) is None and shared.stats()["too_large"] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_readers_never_see_a_torn_result(tmp_path):
+    path = str(tmp_path / "results.shm")
+    key = b"k" * 16
+    # Results of different lengths, each checkable on its own
+    values = [[number] * (20 + 30 * number) for number in range(8)]
+    SharedStore(path, slots=1, slot_bytes=4096).put(key, values[0])
+    pid = os.fork()
+    if pid == 0:
+        try:
+            writer = SharedStore(path, slots=1, slot_bytes=4096)
+            deadline = time.monotonic() + 0.5
+            number = 0
+            while time.monotonic() < deadline:
+                number += 1
+                writer.put(key, values[number % len(values)])
+        finally:
+            os._exit(0)
+    reader = SharedStore(path, slots=1, slot_bytes=4096)
+    seen = set()
+    while not os.waitpid(pid, os.WNOHANG)[0]:
+        value = reader.get(key)
+        if value is not None:
+            assert value in values
+            seen.add(value[0])
+    assert len(seen) > 1
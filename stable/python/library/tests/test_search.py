@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from islamic_library.analysis import search_key
+from islamic_library.catalog import Catalog
+from islamic_library.search import fold
+
+TITLES = ["Sahih Al-Bukhari", "صحيح البخاري", "Ṣaḥīḥ Muslim", "Riyad us-Saliheen", "Été à Médine", "STRAẞE",
+          "The Noble Qur'an", "القرآن الكريم", "Tafsir Ibn Kathir", "Al-Muwatta", "Fortress of the Muslim"]
+AUTHORS = ["Imam Al-Bukhari", "Imam An-Nawawi", "Ibn Kathir", "Imam Malik", "Émile Dermenghem", "Saeed Al-Qahtani"]
+CATEGORIES = ["Hadith", "Quran", "Seerah", None]
+
+
+def make_books(count, seed=3, start=1):
+    rng = random.Random(seed)
+    return [{"id": number, "title": f"{rng.choice(TITLES)} {rng.choice(['', 'Vol. 2', 'Abridged'])}".strip(),
+             "author": rng.choice(AUTHORS), "category": rng.choice(CATEGORIES)}
+            for number in range(start, start + count)]
+
+
+def brute_force(books, term):
+    # What a search promises: the folded term inside a field, or the term's
+    # search key starting at a word of the field's key
+    key = search_key(term)
+
+    def matches(value):
+        return fold(term) in fold(value) or bool(key) and f" {key}" in f" {search_key(value)}"
+
+    return [book["id"] for book in books if any(matches(book[field]) for field in ("title", "author"))]
+
+
+def search_terms(books, count, seed=5):
+    rng = random.Random(seed)
+    terms = ["bukhari", "البخاري", "quran", "koran", "é", "ss", "al", "ibn kat", "nawawi", "zzz"]
+    for _ in range(count):
+        text = rng.choice([book[rng.choice(("title", "author"))] for book in books])
+        start = rng.randrange(len(text))
+        terms.append(text[start:start + rng.randint(1, 8)])
+    return terms
+
+
+@pytest.fixture(autouse=True)
+def exact_matches_only(monkeypatch):
+    monkeypatch.setattr("islamic_library.catalog.use_fuzzy", lambda: False)
+
+
+def ids(catalog, term):
+    return [book["id"] for book in catalog.query(term)]
+
+
+def test_search_matches_brute_force():
+    books = make_books(300)
+    catalog = Catalog(books)
+    for term in search_terms(books, 200):
+        assert ids(catalog, term) == brute_force(books, term), term
+
+
+def test_search_over_segments_matches_brute_force():
+    # Deltas add index segments and mask replaced and deleted rows
+    books = make_books(200)
+    catalog = Catalog(books, order=[book["id"] for book in books])
+    changed = {book["id"]: book for book in make_books(40, seed=9, start=181)}
+    catalog.apply(changed, deletes=[3, 50, 99])
+    live = {book["id"]: book for book in books if book["id"] not in (3, 50, 99)}
+    live.update(changed)
+    expected = [live[number] for number in sorted(live)]
+    for term in search_terms(expected, 200):
+        assert ids(catalog, term) == brute_force(expected, term), term
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from islamic_library.catalog import Catalog, CatalogState
+from islamic_library.repository import SQLiteCatalog, open_catalog
+from islamic_library.snapshot import read_snapshot, write_snapshot
+from islamic_library.watcher import stop_watchers
+
+BOOKS = [{"id": number, "title": f"Book {number}", "author": "Author", "category": "Hadith"}
+         for number in range(1, 21)]
+
+
+@pytest.fixture(autouse=True)
+def no_watchers():
+    yield
+    stop_watchers()
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    books = BOOKS + [{"id": 21, "title": "صحيح البخاري", "author": "البخاري", "category": "Hadith",
+                      "tags": ["sahih", "hadith"]},
+                     {"id": 22, "title": "Été à Médine", "author": "Émile Dermenghem", "category": None}]
+    catalog = Catalog(books)
+    # Deltas are compacted into one segment on the way out
+    catalog.apply({30: dict(BOOKS[0], id=30, title="Riyad us-Saliheen")}, deletes=[2])
+    write_snapshot(catalog.state, path, source="test")
+
+    state = read_snapshot(path, ("title", "author"), source="test")
+    restored = Catalog.from_state(state, "test")
+    assert state.version == catalog.version
+    # Records come back from JSON, with their lists as lists rather than tuples
+    assert json.dumps([dict(book) for book in restored.query()]) == json.dumps([dict(book) for book in catalog.query()])
+    for term in ["book 1", "bukhari", "البخاري", "medine", "saliheen"]:
+        assert [book["id"] for book in restored.query(term)] == [book["id"] for book in catalog.query(term)]
+    assert restored.value_counts("category") == catalog.value_counts("category")
+    assert restored.query("hadith", "Hadith").card_keys() == catalog.query("hadith", "Hadith").card_keys()
+
+
+def test_snapshot_of_another_source_is_not_used(tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    write_snapshot(CatalogState(BOOKS, 1, ("title", "author")), path, source="test")
+    assert read_snapshot(path, ("title", "author"), source="other") is None
+    assert read_snapshot(path, ("title",), source="test") is None
+    assert read_snapshot(str(tmp_path / "missing.snapshot"), ("title", "author"), source="test") is None
+
+
+def replace_database(path, books, reloads=1):
+    # A new file at the same path, such as one restored from a backup
+    os.remove(path)
+    catalog = SQLiteCatalog(path)
+    for _ in range(reloads):
+        catalog.reload(books)
+    return catalog
+
+
+def test_snapshot_of_a_replaced_database_is_not_used(tmp_path):
+    path, snapshot = str(tmp_path / "catalog.db"), str(tmp_path / "catalog.snapshot")
+    SQLiteCatalog(path).reload(BOOKS)
+    assert len(open_catalog([], database=path, in_memory=True, snapshot=snapshot)) == 20
+
+    # The new database's change log is past the snapshot's version
+    replaced = replace_database(path, BOOKS[:5], reloads=6)
+    assert replaced.last_change() >= 1
+    assert len(open_catalog([], database=path, in_memory=True, snapshot=snapshot)) == 5
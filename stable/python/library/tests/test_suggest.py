@@ -0,0 +1,86 @@
+import random
+import re
+import tracemalloc
+
+import dash
+import pytest
+from dash import html
+
+from islamic_library import suggest
+from islamic_library.catalog import Catalog
+from islamic_library.search import fold
+from islamic_library.suggest import SUGGEST_MAX, SuggestIndex, popularity, register_suggest_route
+
+WORDS = ["sahih", "al-bukhari", "muslim", "tafsir", "ibn", "kathir", "riyad", "us-saliheen", "nawawi", "النووي",
+         "fiqh", "sunnah", "the", "garden", "gardens"]
+
+
+def make_books(count, seed=3):
+    rng = random.Random(seed)
+    return [{"id": number, "title": " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 4))),
+             "author": f"Author {rng.randint(1, 40)}", "rating": rng.choice([None, 3.5, 4.8, 5])}
+            for number in range(1, count + 1)]
+
+
+def brute_complete(books, prefix, limit):
+    # Phrases with a word starting with ``prefix``, most popular first
+    weights = {}
+    for book in books:
+        for field in ("title", "author"):
+            weights[book[field]] = weights.get(book[field], 0) + popularity(book)
+    prefix = " ".join(fold(prefix).split())
+    found = [phrase for phrase in weights if any(fold(phrase)[match.start():].startswith(prefix)
+                                                 for match in re.finditer(r"(?<!\w)\w", fold(phrase)))]
+    return sorted(found, key=lambda phrase: (-weights[phrase], phrase))[:limit]
+
+
+@pytest.mark.parametrize("cache_range", [0, 4096])
+def test_completions_match_a_brute_force_search(monkeypatch, cache_range):
+    monkeypatch.setattr(suggest, "CACHE_RANGE", cache_range)
+    books = make_books(500)
+    index = SuggestIndex(books)
+    prefixes = ["s", "sa", "SAH", "al", "al-b", "bukh", "ibn k", "ibn  kathir", "gardens", "author 1", "author 12",
+                "نو", "ال", "the gar", "z", "sahih al-bukhari muslim"]
+    for prefix in prefixes:
+        for limit in (1, 8, SUGGEST_MAX):
+            assert index.complete(prefix, limit) == brute_complete(books, prefix, limit), (prefix, limit)
+            # Answers kept for large ranges are the same as fresh ones
+            assert index.complete(prefix, limit) == brute_complete(books, prefix, limit), (prefix, limit)
+    assert index.complete("   ") == [] and index.complete("") == []
+
+
+def test_nbytes_counts_the_memory_the_index_holds():
+    def books():
+        # Strings made as they are read, so only those the index keeps stay
+        # allocated; enough of them that the interpreter's free lists are noise
+        for number, book in enumerate(make_books(20000)):
+            yield {"title": f"{book['title']} {number}", "author": f"{book['author']}", "rating": book["rating"]}
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        index = SuggestIndex(books())
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert 0.9 * held <= index.nbytes <= 1.1 * held
+
+
+@pytest.fixture
+def client():
+    app = dash.Dash(__name__)
+    app.layout = html.Div()
+    books = [{"id": number, "title": f"Book {number}", "author": "Imam An-Nawawi"} for number in range(1, 101)]
+    suggestions = register_suggest_route(app, Catalog(books), path="/suggest")
+    suggestions.warm()
+    return app.server.test_client()
+
+
+@pytest.mark.parametrize("limit, count", [(None, suggest.SUGGEST_LIMIT), (3, 3), (0, 1), (-5, 1), (1000, SUGGEST_MAX),
+                                          ("many", suggest.SUGGEST_LIMIT)])
+def test_route_limits_are_clamped(client, limit, count):
+    query = {"q": "book"} if limit is None else {"q": "book", "limit": limit}
+    response = client.get("/suggest", query_string=query)
+    assert response.status_code == 200
+    assert len(response.get_json()) == count
+    assert client.get("/suggest", query_string={"q": "nawawi"}).get_json() == ["Imam An-Nawawi"]
@@ -0,0 +1,92 @@
+import importlib
+
+import dash
+import pytest
+from dash import dcc, html
+
+from islamic_library import warmup
+from islamic_library.catalog import Catalog
+from islamic_library.grid import register_book_grid
+from islamic_library.results import MemoryStore, ResultCache
+from islamic_library.suggest import Suggestions
+
+BOOKS = [{"id": number, "title": f"Book {number}", "author": "Imam An-Nawawi",
+          "category": ["Hadith", "Fiqh"][number % 2]} for number in range(1, 41)]
+
+
+class IdRenderer:
+    cache = None
+    renders = 0
+
+    def render(self, books, keys=None):
+        self.renders += 1
+        return [book["id"] for book in books]
+
+
+class Worker:
+    # The parts of a gunicorn worker the hook uses
+    def __init__(self):
+        self.notified = 0
+        self.messages = []
+        self.log = self
+
+    def notify(self):
+        self.notified += 1
+
+    def info(self, message, *args):
+        self.messages.append(message % args)
+
+
+@pytest.fixture
+def hooks(monkeypatch):
+    # Importing the settings with preloading on would turn the GC off here
+    monkeypatch.setenv("PRELOAD_APP", "0")
+    return importlib.import_module("islamic_library.gunicorn_conf")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(warmup, "_warmups", [])
+    app = dash.Dash(__name__)
+    app.layout = html.Div([
+        dcc.Store(id="search-query"),
+        dcc.Dropdown(id="category-select"),
+        dcc.Dropdown(id="page-size-select"),
+        html.Div(id="books-grid"),
+        html.Div(id="books-count"),
+        html.Div(id="books-pagination")
+    ])
+    catalog = Catalog(BOOKS, source="test")
+    renderer = IdRenderer()
+    monkeypatch.setattr("islamic_library.grid.open_result_cache", lambda namespace: ResultCache(MemoryStore()))
+    grid = register_book_grid(app, catalog, renderer, mode="paged")
+    suggestions = Suggestions(catalog)
+    warmup.register_warmup(app, catalog, suggestions)
+    return app, catalog, grid, suggestions
+
+
+def test_post_worker_init_fills_the_caches(hooks, app):
+    app, catalog, grid, suggestions = app
+    for item in warmup._warmups:
+        item.queries = ["", "book 1"]
+    worker = Worker()
+
+    hooks.post_worker_init(worker)
+
+    # Two queries in each of "All", "Fiqh" and "Hadith", rendered once each
+    assert grid.results.misses == 6 and grid.renderer.renders == 6
+    assert grid.results.store.stats()["size"] == 6
+    assert grid.page("book 1", "Hadith", 1, None)[1] == "Showing 1–5 of 5 books"
+    assert grid.results.hits == 1 and grid.renderer.renders == 6
+    # The category facet and the suggestions were built before any request
+    assert "category" in catalog.state.facets._bitmaps
+    assert suggestions.complete("boo")[:1] == ["Book 1"]
+    assert worker.notified >= 6
+    assert len(worker.messages) == 1 and "6 requests, 0 errors, 0 skipped" in worker.messages[0]
+
+
+def test_warmup_can_be_turned_off(hooks, app, monkeypatch):
+    _, _, grid, _ = app
+    monkeypatch.setattr(warmup, "WARMUP", False)
+    hooks.post_worker_init(Worker())
+    assert grid.results.misses == 0
@@ -0,0 +1,58 @@
+import json
+import sqlite3
+
+import pytest
+
+from islamic_library.catalog import Catalog
+from islamic_library.repository import INSERT_BOOK, SQLiteCatalog, book_row, mirror_state
+from islamic_library.watcher import CatalogWatcher
+
+BOOKS = [{"id": number, "title": f"Book {number}", "author": "Author", "category": "Hadith"}
+         for number in range(1, 11)]
+
+
+@pytest.fixture
+def database(tmp_path):
+    return SQLiteCatalog(str(tmp_path / "catalog.db")).reload(BOOKS)
+
+
+@pytest.fixture
+def watcher(database):
+    catalog = Catalog.from_state(mirror_state(database, database.search_fields), database.generation[0])
+    return CatalogWatcher(catalog, database, interval=0)
+
+
+def contents(catalog):
+    return [dict(book) for book in catalog.query()]
+
+
+def test_changes_are_applied_as_deltas(database, watcher):
+    assert watcher.poll() == 0
+    with sqlite3.connect(database.path) as connection:
+        connection.execute(INSERT_BOOK, book_row({"id": 11, "title": "Tafsir Ibn Kathir", "category": "Quran"}))
+        connection.execute("UPDATE books SET record = ? WHERE id = 2",
+                           (json.dumps({"id": 2, "title": "Sahih Muslim", "category": "Hadith"}),))
+        connection.execute("DELETE FROM books WHERE id IN (3, 4)")
+        # Changed, then deleted: only the last change of a row counts
+        connection.execute("UPDATE books SET title = 'Gone' WHERE id = 5")
+        connection.execute("DELETE FROM books WHERE id = 5")
+
+    assert watcher.poll() == 6
+    assert watcher.deltas == 1 and watcher.reloads == 0
+    assert contents(watcher.catalog) == contents(database)
+    assert [book["id"] for book in watcher.catalog.query("muslim")] == [2]
+    assert watcher.catalog.version == database.last_change()
+    assert watcher.catalog.value_counts("category") == {"Hadith": 7, "Quran": 1}
+
+
+def test_a_replaced_catalog_is_reloaded(database, watcher):
+    database.reload(BOOKS[:3])
+    assert watcher.poll() == 1
+    assert watcher.reloads == 1
+    assert contents(watcher.catalog) == contents(database)
+
+
+def test_an_unchanged_file_is_not_read(database, watcher, monkeypatch):
+    watcher.poll()
+    monkeypatch.setattr(database, "changes_since", lambda seq: pytest.fail("read the change log"))
+    assert watcher.poll() == 0